@@ -0,0 +1,48 @@
+import asyncio
+import hmac
+import threading
+
+from fastapi import APIRouter, Header, HTTPException, Query
+from fastapi.responses import PlainTextResponse
+
+from app.core.config import get_settings
+from app.core.profiler import (
+    MAX_PROFILE_SECONDS,
+    MAX_SAMPLE_HZ,
+    ProfilerBusyError,
+    render_collapsed,
+    sample_stacks,
+)
+
+router = APIRouter()
+
+
+def require_admin(token: str | None) -> None:
+    expected = get_settings().ADMIN_TOKEN
+    # Disabled unless a token is configured; don't reveal the route exists
+    if not expected:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not token or not hmac.compare_digest(token, expected):
+        raise HTTPException(status_code=403, detail="Forbidden")
+
+
+@router.get("/admin/profile", response_class=PlainTextResponse)
+async def profile_worker(
+    seconds: float = Query(10.0, gt=0, le=MAX_PROFILE_SECONDS),
+    hz: int = Query(100, ge=1, le=MAX_SAMPLE_HZ),
+    all_threads: bool = Query(False, description="Also sample worker threads (to_thread pool)"),
+    x_admin_token: str | None = Header(None),
+):
+    """Sample this worker for `seconds` and return collapsed stacks
+    (flamegraph.pl / speedscope input). By default only the event-loop
+    thread is sampled."""
+    require_admin(x_admin_token)
+    thread_ids = None if all_threads else {threading.get_ident()}
+    try:
+        stacks, samples = await asyncio.to_thread(sample_stacks, seconds, hz, thread_ids)
+    except ProfilerBusyError:
+        raise HTTPException(status_code=409, detail="A profile is already running")
+    return PlainTextResponse(
+        render_collapsed(stacks),
+        headers={"X-Profile-Samples": str(samples)},
+    )
@@ -1,13 +1,30 @@
+import asyncio
 import json
 import logging
+import time
+from dataclasses import dataclass
 from datetime import date, timedelta
+from typing import AsyncIterator, Awaitable, Callable
 from uuid import UUID
 
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect
-from openai import AsyncOpenAI
 
+from app.core.admission import (
+    MAX_QUEUED_MESSAGES,
+    admission,
+    admission_wait_seconds_total,
+    messages_total,
+    rate_limited_total,
+)
+from app.core.cache import invalidate_companion
 from app.core.config import get_settings
-from app.core.supabase import get_supabase_client
+from app.core.deadline import TurnDeadline, fallbacks_total
+from app.core.metrics import counter, gauge, histogram
+from app.core.openai_gateway import approx_tokens, get_openai_gateway
+from app.core.session_recorder import start_recording
+from app.core.session_state import claim_state, read_state, write_state
+from app.core.supabase import get_supabase_client, rpc_seconds
+from app.core.router import DEFAULT_INTENT, INTENT_CONFIG, RouterResult
 from app.core.prompts import (
     SYSTEM_PROMPT_TEMPLATE,
     MBTI_PROFILES,
@@ -21,21 +38,64 @@ from app.core.prompts import (
     NAMING_EXTRACT_PROMPT,
     NAMING_INTENT_PROMPT,
 )
-from app.services.llm_engine import LLMEngine
+from app.services.companion_actor import CompanionActor, companion_registry
+from app.services.post_turn import (
+    CHECK_DONE,
+    CHECK_NOT_YET,
+    CHECK_RETRY,
+    CheckOutcome,
+    PostTurnScheduler,
+)
+from app.services.hedging import hedge_threshold, hedged_reply
+from app.services.llm_engine import get_llm_engine
+from app.services.speculation import (
+    SPECULATION_MISS,
+    SPECULATION_SKIPPED,
+    SpeculativeReply,
+    parse_keep_intents,
+    speculations_total,
+)
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter()
-settings = get_settings()
-openai_client = AsyncOpenAI(api_key=settings.OPENAI_API_KEY)
 
 EMBED_MODEL = "text-embedding-3-small"
-llm_engine = LLMEngine()
+# Classifier/extractor calls spent on a naming turn, on top of its text
+NAMING_TURN_TOKENS = 150
+
+turns_interrupted_total = counter(
+    "chat_turns_interrupted_total",
+    "Turns whose reply was cut short, by reason (barge_in, disconnect)",
+    ("reason",),
+)
+turns_total = counter(
+    "chat_turns_total",
+    "Replies generated, by routed intent and model",
+    ("intent", "model"),
+)
+ttft_seconds = histogram(
+    "chat_ttft_seconds",
+    "Time from receiving a message to the first streamed token, by model",
+    ("model",),
+)
+stream_seconds = histogram(
+    "chat_stream_seconds",
+    "Duration of the streamed reply from first to last token, by model",
+    ("model",),
+)
+persist_seconds = histogram(
+    "chat_persist_seconds",
+    "Chat_Logs insert latency, by sender",
+    ("sender",),
+)
+active_websockets = gauge("chat_active_websockets", "Open chat WebSockets")
 
 
 async def get_embedding(text: str) -> list[float]:
     """Generate embedding vector for the given text."""
-    response = await openai_client.embeddings.create(
+    response = await get_openai_gateway().embed(
+        "chat.embedding",
         model=EMBED_MODEL,
         input=text,
     )
@@ -79,17 +139,19 @@ async def search_relevant_logs(
     """Find top-k relevant past chat logs via cosine similarity (Supabase RPC)."""
     try:
         sb = get_supabase_client()
-        result = sb.rpc(
-            "match_chat_logs",
-            {
-                "query_embedding": query_embedding,
-                "target_companion_id": companion_id,
-                "match_count": top_k,
-            },
-        ).execute()
+        with rpc_seconds.time(rpc="match_chat_logs"):
+            result = await asyncio.to_thread(sb.rpc(
+                "match_chat_logs",
+                {
+                    "query_embedding": query_embedding,
+                    "target_companion_id": companion_id,
+                    "match_count": top_k,
+                },
+            ).execute)
         return result.data or []
     except Exception as e:
         logger.warning("RAG search failed (skipping): %s", e)
+        fallbacks_total.inc(kind="rag_v1_to_none")
         return []
 
 
@@ -99,17 +161,20 @@ async def search_relevant_logs_v2(
     """Recency-weighted semantic search via match_chat_logs_v2."""
     try:
         sb = get_supabase_client()
-        result = sb.rpc(
-            "match_chat_logs_v2",
-            {
-                "query_embedding": query_embedding,
-                "target_companion_id": companion_id,
-                "match_count": top_k,
-            },
-        ).execute()
+        # In a thread so the turn deadline can abandon a slow RPC
+        with rpc_seconds.time(rpc="match_chat_logs_v2"):
+            result = await asyncio.to_thread(sb.rpc(
+                "match_chat_logs_v2",
+                {
+                    "query_embedding": query_embedding,
+                    "target_companion_id": companion_id,
+                    "match_count": top_k,
+                },
+            ).execute)
         return result.data or []
     except Exception as e:
         logger.warning("RAG v2 search failed, falling back to v1: %s", e)
+        fallbacks_total.inc(kind="rag_v2_to_v1")
         return await search_relevant_logs(companion_id, query_embedding, top_k)
 
 
@@ -117,13 +182,14 @@ def get_recent_logs(companion_id: str, count: int = 6) -> list[dict]:
     """Fetch most recent messages for conversational continuity."""
     try:
         sb = get_supabase_client()
-        result = sb.rpc(
-            "get_recent_chat_logs",
-            {
-                "target_companion_id": companion_id,
-                "msg_count": count,
-            },
-        ).execute()
+        with rpc_seconds.time(rpc="get_recent_chat_logs"):
+            result = sb.rpc(
+                "get_recent_chat_logs",
+                {
+                    "target_companion_id": companion_id,
+                    "msg_count": count,
+                },
+            ).execute()
         # Results come newest-first; reverse to chronological order
         logs = result.data or []
         logs.reverse()
@@ -138,14 +204,15 @@ def get_recent_emotions(companion_id: str, days: int = 3) -> list[dict]:
     try:
         sb = get_supabase_client()
         start_date = str(date.today() - timedelta(days=days))
-        result = (
-            sb.table("Daily_Emotions")
-            .select("date, primary_emotion, color_hex, summary_text")
-            .eq("companion_id", companion_id)
-            .gte("date", start_date)
-            .order("date", desc=True)
-            .execute()
-        )
+        with rpc_seconds.time(rpc="recent_emotions"):
+            result = (
+                sb.table("Daily_Emotions")
+                .select("date, primary_emotion, color_hex, summary_text")
+                .eq("companion_id", companion_id)
+                .gte("date", start_date)
+                .order("date", desc=True)
+                .execute()
+            )
         return result.data or []
     except Exception as e:
         logger.warning("Emotions fetch failed: %s", e)
@@ -154,8 +221,8 @@ def get_recent_emotions(companion_id: str, days: int = 3) -> list[dict]:
 
 def save_chat_log(
     companion_id: str, sender: str, message: str, embedding: list[float] | None = None
-) -> None:
-    """Persist a chat message to Supabase."""
+) -> int | None:
+    """Persist a chat message to Supabase. Returns its log_id (None if the insert failed)."""
     try:
         sb = get_supabase_client()
         row = {
@@ -165,16 +232,43 @@ def save_chat_log(
         }
         if embedding:
             row["embedding"] = embedding
-        sb.table("Chat_Logs").insert(row).execute()
+        with persist_seconds.time(sender=sender):
+            result = sb.table("Chat_Logs").insert(row).execute()
+        return result.data[0]["log_id"] if result.data else None
     except Exception as e:
         logger.warning("Failed to save chat log: %s", e)
+        return None
+
+
+# Embeddings that outran the turn deadline, still finishing in the background
+_backfills: set[asyncio.Task] = set()
+
+
+def backfill_embedding(log_id: int, embedding: asyncio.Future) -> None:
+    """Attach an embedding to its already-saved message once it finishes, so
+    an overrun doesn't leave the message out of semantic search for good."""
+    async def attach() -> None:
+        try:
+            vector = await embedding
+            sb = get_supabase_client()
+            await asyncio.to_thread(
+                sb.table("Chat_Logs").update({"embedding": vector}).eq("log_id", log_id).execute
+            )
+        except Exception as e:
+            logger.warning("Embedding backfill for log %s failed: %s", log_id, e)
+
+    task = asyncio.create_task(attach())
+    _backfills.add(task)
+    task.add_done_callback(_backfills.discard)
 
 
 # ── Naming ceremony state ──
-# Tracks companions that have been asked to be named (awaiting user's name input)
-_naming_awaiting: set[str] = set()
-# Tracks companions that have already been prompted (so we don't re-ask)
-_naming_prompted: set[str] = set()
+# Shared across workers, keyed by companion_id. Absent → not prompted yet;
+# "awaiting" → asked to be named (awaiting user's name input);
+# "prompted" → ceremony over (so we don't re-ask)
+NAMING_SCOPE = "naming"
+NAMING_AWAITING = "awaiting"
+NAMING_PROMPTED = "prompted"
 
 
 async def check_naming_sentiment(companion_id: str) -> float:
@@ -196,7 +290,8 @@ async def check_naming_sentiment(companion_id: str) -> float:
         lines = [f"{'User' if l['sender'] == 'USER' else 'AI'}: {l['message']}" for l in logs]
         prompt = NAMING_SENTIMENT_PROMPT.format(recent_messages="\n".join(lines))
 
-        response = await openai_client.chat.completions.create(
+        response = await get_openai_gateway().chat(
+            "chat.classify",
             model="gpt-4o-mini",
             messages=[{"role": "user", "content": prompt}],
             max_tokens=30,
@@ -215,7 +310,8 @@ async def classify_naming_intent(message: str) -> dict:
     Returns {"intent": "user_intro"|"ai_naming"|"none", "name": str|None}"""
     try:
         prompt = NAMING_INTENT_PROMPT.format(message=message)
-        response = await openai_client.chat.completions.create(
+        response = await get_openai_gateway().chat(
+            "chat.classify",
             model="gpt-4o-mini",
             messages=[{"role": "user", "content": prompt}],
             max_tokens=50,
@@ -238,7 +334,8 @@ async def extract_name_from_message(message: str) -> str | None:
     """Extract a name from the user's message using GPT."""
     try:
         prompt = NAMING_EXTRACT_PROMPT.format(message=message)
-        response = await openai_client.chat.completions.create(
+        response = await get_openai_gateway().chat(
+            "chat.classify",
             model="gpt-4o-mini",
             messages=[{"role": "user", "content": prompt}],
             max_tokens=30,
@@ -262,62 +359,95 @@ async def apply_ai_naming(companion_id: str, companion: dict, name: str) -> dict
     sb.table("Companions").update(
         {"name": name}
     ).eq("companion_id", companion_id).execute()
+    invalidate_companion(companion_id, companion.get("user_id"))
 
     companion["name"] = name
-    _naming_awaiting.discard(companion_id)
-    _naming_prompted.add(companion_id)
+    await write_state(NAMING_SCOPE, companion_id, NAMING_PROMPTED)
 
     confirmation = NAMING_CONFIRM_TEMPLATE.format(name=name)
     logger.info("AI named for %s: %s", companion_id, name)
     return {"name": name, "confirmation": confirmation}
 
 
-async def check_naming_event(companion_id: str, companion: dict) -> str | None:
+async def check_naming_event(companion_id: str, companion: dict, ai_count: int) -> CheckOutcome:
     """Check if it's time for the naming ceremony (10+ AI turns, positive sentiment).
-    Returns the naming prompt message if triggered, None otherwise."""
-    # Skip if already named or already prompted
+    The outcome carries the naming prompt if triggered; publish_naming_prompt
+    claims the ceremony."""
+    # Done if already named or already prompted
     if companion.get("name", "") != "???":
-        return None
-    if companion_id in _naming_prompted:
-        return None
+        return CheckOutcome(CHECK_DONE)
+    if await read_state(NAMING_SCOPE, companion_id) is not None:
+        return CheckOutcome(CHECK_DONE)
 
-    ai_count = get_chat_count(companion_id)
     if ai_count < 10:
-        return None
+        return CheckOutcome(CHECK_NOT_YET)
 
     # Check sentiment
     sentiment = await check_naming_sentiment(companion_id)
     logger.info("Naming sentiment for %s: %.2f", companion_id, sentiment)
     if sentiment < 0.7:
-        return None
+        return CheckOutcome(CHECK_RETRY)
 
-    _naming_prompted.add(companion_id)
-    _naming_awaiting.add(companion_id)
-    return NAMING_PROMPT_MESSAGE
+    return CheckOutcome(CHECK_DONE, {"type": "naming_prompt", "content": NAMING_PROMPT_MESSAGE})
+
+
+async def publish_naming_prompt(actor: CompanionActor, companion_id: str, event: dict) -> None:
+    """Ask the user to name the companion. The ceremony is AWAITING only while
+    the prompt is actually delivered: if no socket receives it or the publish
+    is cancelled, the claim is rolled back so the user's next message isn't
+    taken as a name."""
+    # Only one connection/worker gets to ask
+    claim = asyncio.ensure_future(claim_state(NAMING_SCOPE, companion_id, None, NAMING_AWAITING))
+    try:
+        if not await asyncio.shield(claim):
+            return
+        delivered = await actor.broadcast(event)
+        if not delivered:
+            raise RuntimeError("no socket received the naming prompt")
+    except BaseException:
+        if await claim:
+            await claim_state(NAMING_SCOPE, companion_id, NAMING_AWAITING, None)
+        raise
+
+    # Save the naming prompt as AI message
+    try:
+        naming_embedding = await get_embedding(event["content"])
+        save_chat_log(companion_id, "AI", event["content"], naming_embedding)
+    except Exception:
+        pass
 
 
 async def process_naming(companion_id: str, companion: dict, user_message: str) -> dict | None:
     """Process a naming response from the user.
     Returns {name, confirmation} if successful, None otherwise."""
-    if companion_id not in _naming_awaiting:
+    # Only an unnamed companion can be awaiting a name: skip the store read
+    if companion.get("name", "") != "???":
+        return None
+    if await read_state(NAMING_SCOPE, companion_id) != NAMING_AWAITING:
         return None
 
     extracted_name = await extract_name_from_message(user_message)
     if not extracted_name:
         return None
 
+    # Claim the ceremony so a concurrent answer elsewhere can't also apply
+    if not await claim_state(NAMING_SCOPE, companion_id, NAMING_AWAITING, NAMING_PROMPTED):
+        return None
+
     # Update DB
     try:
         sb = get_supabase_client()
         sb.table("Companions").update(
             {"name": extracted_name}
         ).eq("companion_id", companion_id).execute()
+        invalidate_companion(companion_id, companion.get("user_id"))
     except Exception as e:
         logger.error("Failed to update companion name: %s", e)
+        # Give the ceremony back so the next answer can retry
+        await claim_state(NAMING_SCOPE, companion_id, NAMING_PROMPTED, NAMING_AWAITING)
         return None
 
     companion["name"] = extracted_name
-    _naming_awaiting.discard(companion_id)
 
     confirmation = NAMING_CONFIRM_TEMPLATE.format(name=extracted_name)
     logger.info("Companion %s named: %s", companion_id, extracted_name)
@@ -365,28 +495,28 @@ def get_chat_history_for_discovery(companion_id: str, limit: int = 60) -> str:
         return ""
 
 
-async def discover_personality(companion_id: str, companion: dict) -> str | None:
+async def discover_personality(companion_id: str, companion: dict, ai_count: int) -> CheckOutcome:
     """Analyze chat history and discover MBTI personality after 50+ turns.
-    Returns announcement message if discovered, None otherwise."""
+    The outcome carries the announcement if discovered."""
     tone_style = companion.get("tone_style", "")
 
-    # Already discovered MBTI — skip
+    # Already discovered MBTI — done
     if tone_style in MBTI_PROFILES:
-        return None
+        return CheckOutcome(CHECK_DONE)
 
-    # Not yet at 50 AI turns — skip
-    ai_count = get_chat_count(companion_id)
+    # Not yet at 50 AI turns
     if ai_count < 50:
-        return None
+        return CheckOutcome(CHECK_NOT_YET)
 
     # Fetch chat history for analysis
     chat_history = get_chat_history_for_discovery(companion_id)
     if not chat_history:
-        return None
+        return CheckOutcome(CHECK_NOT_YET)
 
     try:
         prompt = MBTI_DISCOVERY_PROMPT.format(chat_history=chat_history)
-        response = await openai_client.chat.completions.create(
+        response = await get_openai_gateway().chat(
+            "chat.discovery",
             model="gpt-4o-mini",
             messages=[{"role": "user", "content": prompt}],
             max_tokens=200,
@@ -399,24 +529,25 @@ async def discover_personality(companion_id: str, companion: dict) -> str | None
 
         if discovered_mbti not in MBTI_PROFILES:
             logger.warning("Invalid MBTI discovered: %s", discovered_mbti)
-            return None
+            return CheckOutcome(CHECK_RETRY)
 
         # Update companion's tone_style in DB
         sb = get_supabase_client()
         sb.table("Companions").update(
             {"tone_style": discovered_mbti}
         ).eq("companion_id", companion_id).execute()
+        invalidate_companion(companion_id, companion.get("user_id"))
 
         # Update local companion dict so subsequent messages use the new profile
         companion["tone_style"] = discovered_mbti
 
         announcement = result.get("announcement", f"대화하다 보니 저는 어느새 {discovered_mbti}가 된 것 같아요.")
         logger.info("MBTI discovered for %s: %s", companion_id, discovered_mbti)
-        return announcement
+        return CheckOutcome(CHECK_DONE, {"type": "announcement", "content": announcement})
 
     except Exception as e:
         logger.error("MBTI discovery failed: %s", e, exc_info=True)
-        return None
+        return CheckOutcome(CHECK_RETRY)
 
 
 def build_system_prompt(
@@ -502,32 +633,381 @@ def build_system_prompt(
     return prompt
 
 
-@router.websocket("/ws/{companion_id}")
-async def chat_websocket(websocket: WebSocket, companion_id: UUID):
-    await websocket.accept()
+@dataclass
+class TurnState:
+    """What the connection knows about its in-flight turn."""
+    streaming: bool = False             # generating (buffered or sent): cancellable
+    partial: str = ""
+    intent: str | None = None
+    interrupted: str | None = None      # reason, once the turn should stop
+
+
+async def handle_turn(
+    websocket: WebSocket,
+    actor: CompanionActor,
+    user_message: str,
+    user_name: str,
+    state: TurnState,
+) -> int:
+    """Run one chat turn (steps 1.5-9). Returns its approximate LLM token cost.
+
+    Once a reply is being generated (state.streaming, set before speculative
+    or hedged replies start buffering) the turn may be cancelled by barge-in
+    or disconnect; state.partial then holds what was sent. Stages before it
+    run under the turn deadline and degrade when they overrun.
+    """
+    companion_id = actor.companion_id
+    companion = actor.companion
+    deadline = TurnDeadline(get_settings().TURN_DEADLINE_SECONDS)
+
+    # 1.5. Check if user is responding to naming ceremony
+    naming_result = await deadline.run(
+        "naming", process_naming(companion_id, companion, user_message)
+    )
+    if naming_result:
+        # Save user message
+        user_embedding = await get_embedding(user_message)
+        save_chat_log(companion_id, "USER", user_message, user_embedding)
+
+        # Send name_reveal first for frontend header animation (all tabs)
+        await actor.broadcast({
+            "type": "name_reveal",
+            "content": naming_result["name"],
+        })
+
+        # Send the confirmation as AI message
+        confirmation = naming_result["confirmation"]
+        await websocket.send_json({"type": "stream", "content": confirmation})
+        await websocket.send_json({
+            "type": "end",
+            "content": confirmation,
+            "intent": "naming",
+        })
+
+        # Save AI confirmation
+        ai_embedding = await get_embedding(confirmation)
+        save_chat_log(companion_id, "AI", confirmation, ai_embedding)
+        return approx_tokens(user_message + confirmation) + NAMING_TURN_TOKENS
+
+    # 1.6. Unified naming intent classification
+    # Single GPT call to determine: user_intro / ai_naming / none.
+    # Steady state (companion named, user name known): nothing to act on, skip
+    if companion.get("name", "") != "???" and user_name:
+        naming_intent = {"intent": "none", "name": None}
+    else:
+        naming_intent = await deadline.run(
+            "naming", classify_naming_intent(user_message), {"intent": "none", "name": None}
+        )
 
-    # Load companion profile
-    companion = get_companion(str(companion_id))
-    if not companion:
-        await websocket.send_json({"error": "Companion not found"})
-        await websocket.close()
-        return
+    if naming_intent["intent"] == "ai_naming" and naming_intent["name"]:
+        # User is naming the AI companion
+        if companion.get("name", "") == "???":
+            result = await apply_ai_naming(
+                companion_id, companion, naming_intent["name"]
+            )
+            # Save user message
+            user_embedding = await get_embedding(user_message)
+            save_chat_log(companion_id, "USER", user_message, user_embedding)
+
+            # Send name_reveal for frontend animation (all tabs)
+            await actor.broadcast({
+                "type": "name_reveal",
+                "content": result["name"],
+            })
+
+            # Send confirmation as AI message
+            confirmation = result["confirmation"]
+            await websocket.send_json({"type": "stream", "content": confirmation})
+            await websocket.send_json({
+                "type": "end",
+                "content": confirmation,
+                "intent": "naming",
+            })
+
+            # Save AI confirmation
+            ai_embedding = await get_embedding(confirmation)
+            save_chat_log(companion_id, "AI", confirmation, ai_embedding)
+            return approx_tokens(user_message + confirmation) + NAMING_TURN_TOKENS
+
+    elif naming_intent["intent"] == "user_intro" and naming_intent["name"]:
+        # User is introducing themselves
+        if not user_name:
+            user_name = naming_intent["name"]
+            await websocket.send_json({
+                "type": "user_name_set",
+                "content": user_name,
+            })
+
+    # 2. Embed user message (over budget → no semantic memories this turn;
+    # the embedding keeps running and is backfilled onto the saved row)
+    embedding = asyncio.ensure_future(get_embedding(user_message))
+    try:
+        user_embedding = await deadline.run("embedding", asyncio.shield(embedding))
+    except BaseException:
+        embedding.cancel()
+        raise
+
+    # 3. Save user message with embedding
+    log_id = save_chat_log(companion_id, "USER", user_message, user_embedding)
+    if user_embedding is None:
+        if log_id is not None:
+            backfill_embedding(log_id, embedding)
+        else:
+            embedding.cancel()
+
+    # 4-5. Smart routing (model + context depth) and hybrid retrieval
+    # (semantic + emotions; recent comes from the engine) run concurrently
+    async def load_memories() -> list[dict]:
+        if not user_embedding:
+            return []
+        return await deadline.run(
+            "memories", search_relevant_logs_v2(companion_id, user_embedding), []
+        )
 
-    # Look up user tier for smart routing
-    user_tier = get_subscription_plan(companion.get("user_id", ""))
+    def load_emotions():
+        return deadline.run_sync(
+            "emotions", get_recent_emotions, companion_id,
+            fallback=actor.recent_emotions or [],
+        )
 
-    # Send greeting on first connection if no prior messages exist
-    first_turn_count = get_chat_count(str(companion_id))
-    if first_turn_count == 0:
-        greeting = NAMING_GREETING
-        await websocket.send_json({"type": "greeting", "content": greeting})
-        # Save greeting as AI message
-        try:
-            greeting_embedding = await get_embedding(greeting)
-            save_chat_log(str(companion_id), "AI", greeting, greeting_embedding)
-        except Exception as e:
-            logger.warning("Failed to save greeting: %s", e)
+    tone_style = companion.get("tone_style", "empathetic")
+    if tone_style in MBTI_PROFILES:
+        profile = MBTI_PROFILES[tone_style]
+    else:
+        profile = STYLE_PROFILES.get(tone_style, STYLE_PROFILES["empathetic"])
+
+    def open_reply(site: str, model: str, system_prompt: str):
+        # Model from smart router, params per MBTI
+        return get_openai_gateway().chat_stream(
+            site,
+            model=model,
+            messages=[
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": user_message},
+            ],
+            max_tokens=profile.get("max_tokens", 120),
+            temperature=profile.get("temperature", 0.8),
+        )
 
+    speculative = hedged = stream = None
+    try:
+        if get_settings().SPECULATIVE_GENERATION and actor.user_tier == "SOULMATE":
+            recent_logs, router_result, semantic_logs, emotions, speculative = await route_with_speculation(
+                actor, user_message, user_name, deadline, load_memories(), load_emotions(), open_reply, state
+            )
+        else:
+            (recent_logs, router_result), semantic_logs, emotions = await asyncio.gather(
+                get_llm_engine().generate_response(
+                    user_message, actor.user_tier, companion_id, deadline=deadline
+                ),
+                load_memories(),
+                load_emotions(),
+            )
+        actor.recent_emotions = emotions
+
+        # Client left before generation: don't pay for a reply nobody reads
+        if state.interrupted:
+            return approx_tokens(user_message)
+
+        # 6-7. Build system prompt with 3-source context and stream the reply
+        # (a kept speculative reply already has both). From here on a
+        # barge-in cancels the turn, closing the upstream stream (see finally)
+        state.streaming = True
+        state.intent = router_result.intent
+        if speculative is not None:
+            model, system_prompt = speculative.model, speculative.system_prompt
+            contents = speculative.contents()
+        else:
+            model = router_result.model
+            system_prompt = build_system_prompt(
+                companion, semantic_logs, recent_logs, emotions, user_name
+            )
+            threshold = hedge_threshold(router_result.intent)
+            if threshold is not None:
+                hedged = await hedged_reply(
+                    open_reply, router_result.intent, model, system_prompt, threshold,
+                    approx_tokens(system_prompt + user_message),
+                )
+                model, contents = hedged.model, hedged.contents()
+            else:
+                stream = await open_reply("chat.stream", model, system_prompt)
+                contents = stream_contents(stream)
+
+        turns_total.inc(intent=router_result.intent, model=model)
+        first_token_at = None
+        async for content in contents:
+            if first_token_at is None:
+                first_token_at = time.monotonic()
+                ttft_seconds.observe(first_token_at - deadline.started, model=model)
+            state.partial += content
+            await websocket.send_json({"type": "stream", "content": content})
+        state.streaming = False
+        if first_token_at is not None:
+            stream_seconds.observe(time.monotonic() - first_token_at, model=model)
+        full_response = state.partial
+    finally:
+        for reply in (speculative, hedged):
+            if reply is not None:
+                await reply.close()
+        # Releases the limiter slot if the turn stopped before the stream ended
+        if stream is not None:
+            await stream.aclose()
+
+    # 8. Signal stream end
+    await websocket.send_json({
+        "type": "end",
+        "content": full_response,
+        "intent": router_result.intent,
+        "emotion_color": emotions[0]["color_hex"] if emotions else None,
+    })
+
+    # 9. Save AI response with embedding
+    ai_embedding = await get_embedding(full_response)
+    save_chat_log(companion_id, "AI", full_response, ai_embedding)
+
+    return approx_tokens(system_prompt + user_message + full_response)
+
+
+async def stream_contents(stream) -> AsyncIterator[str]:
+    async for chunk in stream:
+        content = chunk.choices[0].delta.content
+        if content:
+            yield content
+
+
+async def route_with_speculation(
+    actor: CompanionActor,
+    user_message: str,
+    user_name: str,
+    deadline: TurnDeadline,
+    memories: Awaitable[list[dict]],
+    emotions: Awaitable[list[dict]],
+    open_reply: Callable,
+    state: TurnState,
+) -> tuple[list[dict], RouterResult, list[dict], list[dict], SpeculativeReply | None]:
+    """Steps 4-5 for a routed turn under SPECULATIVE_GENERATION: routing
+    runs alongside default-intent context, and if the router is still
+    deciding once that context is ready, a default-model reply starts on
+    it (see services/speculation.py).
+
+    Returns (recent_logs, router_result, semantic_logs, emotions,
+    speculative reply if it answers the turn, else None).
+    """
+    engine = get_llm_engine()
+    default = INTENT_CONFIG[DEFAULT_INTENT]
+    route = asyncio.ensure_future(engine.route(user_message, actor.user_tier, deadline))
+    try:
+        recent_logs, semantic_logs, emotion_rows = await asyncio.gather(
+            deadline.run(
+                "recent_history",
+                engine.get_recent_chat_history(actor.companion_id, limit=default["k"]),
+                [],
+            ),
+            memories,
+            emotions,
+        )
+    except BaseException:
+        route.cancel()
+        raise
+
+    speculative = None
+    if route.done():
+        speculations_total.inc(outcome=SPECULATION_SKIPPED)
+    else:
+        system_prompt = build_system_prompt(
+            actor.companion, semantic_logs, recent_logs, emotion_rows, user_name
+        )
+        # Paid generation starts: a barge-in may cancel the turn from here
+        state.streaming = True
+        speculative = SpeculativeReply(
+            lambda: open_reply("chat.speculative", default["model"], system_prompt),
+            model=default["model"],
+            system_prompt=system_prompt,
+            prompt_tokens=approx_tokens(system_prompt + user_message),
+        )
+
+    try:
+        router_result = await route
+    except BaseException:
+        if speculative is not None:
+            await speculative.discard()
+        raise
+    if speculative is not None:
+        keep_intents = parse_keep_intents(get_settings().SPECULATIVE_KEEP_INTENTS)
+        if speculative.resolve(router_result, keep_intents) == SPECULATION_MISS:
+            await speculative.discard()
+            speculative = None
+
+    # Generating with the routed model: give it the routed history depth
+    if speculative is None and router_result.k != default["k"]:
+        recent_logs = await deadline.run(
+            "recent_history",
+            engine.get_recent_chat_history(actor.companion_id, limit=router_result.k),
+            [],
+        )
+    return recent_logs, router_result, semantic_logs, emotion_rows, speculative
+
+
+def start_post_turn_scheduler(actor: CompanionActor) -> PostTurnScheduler:
+    """Naming ceremony and MBTI discovery, off the turn path; results go to
+    every attached socket between turns."""
+    companion_id = actor.companion_id
+    settings = get_settings()
+
+    async def publish(outcome: CheckOutcome) -> None:
+        # Wait for the reply in progress so the event lands between turns
+        async with actor.turn_lock:
+            if outcome.event["type"] == "naming_prompt":
+                await publish_naming_prompt(actor, companion_id, outcome.event)
+            else:
+                await actor.broadcast(outcome.event)
+
+    scheduler = PostTurnScheduler(
+        publish,
+        cadence_turns=settings.POST_TURN_CADENCE_TURNS,
+        max_backoff_turns=settings.POST_TURN_MAX_BACKOFF_TURNS,
+    )
+    # 10. Naming ceremony (after 10 AI turns, positive sentiment)
+    scheduler.add(
+        "naming", lambda: check_naming_event(companion_id, actor.companion, actor.ai_turns or 0)
+    )
+    # 11. MBTI personality discovery (after 50 AI turns)
+    scheduler.add(
+        "mbti", lambda: discover_personality(companion_id, actor.companion, actor.ai_turns or 0)
+    )
+    return scheduler
+
+
+class ChatConnection:
+    """One WebSocket's receive side and its in-flight turn."""
+
+    def __init__(self, websocket: WebSocket, tier: str):
+        self.websocket = websocket
+        self.tier = tier
+        self.queue: asyncio.Queue = asyncio.Queue()
+        self.disconnected = False
+        self.turn: asyncio.Task | None = None
+        self.turn_state: TurnState | None = None
+
+    def interrupt(self, reason: str) -> None:
+        """Stop the in-flight reply. A streaming turn is cancelled at once;
+        an earlier stage is told not to start generating (disconnect only)."""
+        state = self.turn_state
+        if self.turn is None or state is None or self.turn.done():
+            return
+        if state.streaming:
+            state.streaming = False
+            state.interrupted = reason
+            self.turn.cancel()
+        elif reason == "disconnect":
+            state.interrupted = reason
+
+
+async def read_messages(conn: ChatConnection) -> None:
+    """Receive messages into the connection's queue; shed beyond its bound.
+    A new message barges in on a streaming reply. Puts None when the
+    client disconnects."""
+    websocket, queue, tier = conn.websocket, conn.queue, conn.tier
     try:
         while True:
             # 1. Receive user message
@@ -540,166 +1020,178 @@ async def chat_websocket(websocket: WebSocket, companion_id: UUID):
                 user_message = data
                 user_name = ""
 
-            try:
-                # 1.5. Check if user is responding to naming ceremony
-                naming_result = await process_naming(str(companion_id), companion, user_message)
-                if naming_result:
-                    # Save user message
-                    user_embedding = await get_embedding(user_message)
-                    save_chat_log(str(companion_id), "USER", user_message, user_embedding)
-
-                    # Send name_reveal first for frontend header animation
-                    await websocket.send_json({
-                        "type": "name_reveal",
-                        "content": naming_result["name"],
-                    })
-
-                    # Send the confirmation as AI message
-                    confirmation = naming_result["confirmation"]
-                    await websocket.send_json({"type": "stream", "content": confirmation})
-                    await websocket.send_json({
-                        "type": "end",
-                        "content": confirmation,
-                        "intent": "naming",
-                    })
-
-                    # Save AI confirmation
-                    ai_embedding = await get_embedding(confirmation)
-                    save_chat_log(str(companion_id), "AI", confirmation, ai_embedding)
-                    continue
-
-                # 1.6. Unified naming intent classification
-                # Single GPT call to determine: user_intro / ai_naming / none
-                naming_intent = await classify_naming_intent(user_message)
-
-                if naming_intent["intent"] == "ai_naming" and naming_intent["name"]:
-                    # User is naming the AI companion
-                    if companion.get("name", "") == "???":
-                        result = await apply_ai_naming(
-                            str(companion_id), companion, naming_intent["name"]
-                        )
-                        # Save user message
-                        user_embedding = await get_embedding(user_message)
-                        save_chat_log(str(companion_id), "USER", user_message, user_embedding)
-
-                        # Send name_reveal for frontend animation
-                        await websocket.send_json({
-                            "type": "name_reveal",
-                            "content": result["name"],
-                        })
-
-                        # Send confirmation as AI message
-                        confirmation = result["confirmation"]
-                        await websocket.send_json({"type": "stream", "content": confirmation})
-                        await websocket.send_json({
-                            "type": "end",
-                            "content": confirmation,
-                            "intent": "naming",
-                        })
-
-                        # Save AI confirmation
-                        ai_embedding = await get_embedding(confirmation)
-                        save_chat_log(str(companion_id), "AI", confirmation, ai_embedding)
-                        continue
-
-                elif naming_intent["intent"] == "user_intro" and naming_intent["name"]:
-                    # User is introducing themselves
-                    if not user_name:
-                        user_name = naming_intent["name"]
-                        await websocket.send_json({
-                            "type": "user_name_set",
-                            "content": user_name,
-                        })
-
-                # 2. Embed user message
-                user_embedding = await get_embedding(user_message)
-
-                # 3. Save user message with embedding
-                save_chat_log(str(companion_id), "USER", user_message, user_embedding)
-
-                # 4. Smart routing: decide model + context depth
-                target_llm, recent_logs, router_result = await llm_engine.generate_response(
-                    user_message, user_tier, str(companion_id)
-                )
-                model = router_result.model
+            if queue.qsize() >= MAX_QUEUED_MESSAGES:
+                messages_total.inc(tier=tier, outcome="shed")
+                rate_limited_total.inc(tier=tier, reason="queue_full")
+                await websocket.send_json({
+                    "type": "rate_limited",
+                    "reason": "queue_full",
+                    "dropped": True,
+                    "content": user_message,
+                })
+                continue
 
-                # 5. Hybrid retrieval: semantic + emotions (recent already from engine)
-                semantic_logs = await search_relevant_logs_v2(
-                    str(companion_id), user_embedding
-                )
-                emotions = get_recent_emotions(str(companion_id))
+            messages_total.inc(tier=tier, outcome="queued" if queue.qsize() else "accepted")
+            queue.put_nowait((user_message, user_name))
+            conn.interrupt("barge_in")
+    except WebSocketDisconnect:
+        pass
+    finally:
+        conn.disconnected = True
+        conn.interrupt("disconnect")
+        queue.put_nowait(None)
 
-                # 6. Build system prompt with 3-source context + get generation params
-                system_prompt = build_system_prompt(
-                    companion, semantic_logs, recent_logs, emotions, user_name
-                )
-                tone_style = companion.get("tone_style", "empathetic")
-                if tone_style in MBTI_PROFILES:
-                    profile = MBTI_PROFILES[tone_style]
-                else:
-                    profile = STYLE_PROFILES.get(tone_style, STYLE_PROFILES["empathetic"])
-
-                # 7. Stream AI response (model from smart router, params per MBTI)
-                stream = await openai_client.chat.completions.create(
-                    model=model,
-                    messages=[
-                        {"role": "system", "content": system_prompt},
-                        {"role": "user", "content": user_message},
-                    ],
-                    max_tokens=profile.get("max_tokens", 120),
-                    temperature=profile.get("temperature", 0.8),
-                    stream=True,
-                )
 
-                full_response = ""
-                async for chunk in stream:
-                    delta = chunk.choices[0].delta
-                    if delta.content:
-                        full_response += delta.content
-                        await websocket.send_json(
-                            {"type": "stream", "content": delta.content}
-                        )
+async def wait_for_admission(websocket: WebSocket, user_id: str, tier: str) -> None:
+    """Hold the turn until the user's buckets allow it, telling the client why."""
+    delay, reason = admission.turn_delay(user_id, tier)
+    if delay <= 0:
+        return
+    rate_limited_total.inc(tier=tier, reason=reason)
+    admission_wait_seconds_total.inc(delay, tier=tier)
+    await websocket.send_json({
+        "type": "rate_limited",
+        "reason": reason,
+        "dropped": False,
+        "retry_after": round(delay, 1),
+    })
+    await asyncio.sleep(delay)
+
+
+async def run_turn(
+    conn: ChatConnection,
+    actor: CompanionActor,
+    user_id: str,
+    user_message: str,
+    user_name: str,
+    state: TurnState,
+) -> None:
+    await wait_for_admission(conn.websocket, user_id, conn.tier)
 
-                # 8. Signal stream end
-                await websocket.send_json({
-                    "type": "end",
-                    "content": full_response,
-                    "intent": router_result.intent,
-                    "emotion_color": emotions[0]["color_hex"] if emotions else None,
-                })
+    # Turns on the same companion are serialized across connections
+    async with actor.turn_lock:
+        tokens = await handle_turn(conn.websocket, actor, user_message, user_name, state)
+        actor.ai_turns = (actor.ai_turns or 0) + 1
+    admission.charge_tokens(user_id, conn.tier, tokens)
+
+    # 10-11. Post-turn checks run in the background when due, once per companion
+    actor.scheduler.on_turn(actor.ai_turns)
+
+
+async def save_interrupted_reply(conn: ChatConnection, actor: CompanionActor, state: TurnState) -> None:
+    """Persist the part of a reply that was streamed before the interruption."""
+    turns_interrupted_total.inc(reason=state.interrupted or "unknown")
+    if not state.partial:
+        return
+    if not conn.disconnected:
+        # Close the bubble on the client before the next reply starts
+        await conn.websocket.send_json({
+            "type": "end",
+            "content": state.partial,
+            "intent": state.intent,
+            "interrupted": True,
+        })
+    try:
+        ai_embedding = await get_embedding(state.partial)
+        save_chat_log(actor.companion_id, "AI", state.partial, ai_embedding)
+    except Exception as e:
+        logger.warning("Failed to save interrupted reply: %s", e)
+
+
+@router.websocket("/ws/{companion_id}")
+async def chat_websocket(websocket: WebSocket, companion_id: UUID):
+    await websocket.accept()
+    active_websockets.inc()
+    try:
+        await serve_chat(websocket, companion_id)
+    finally:
+        active_websockets.dec()
+
+
+async def serve_chat(websocket: WebSocket, companion_id: UUID) -> None:
+
+    # Join the companion's actor: profile is loaded once and shared by
+    # every connection (tab/device) on this companion in this process
+    actor = await companion_registry.attach(str(companion_id), websocket, get_companion)
+    if not actor:
+        await websocket.send_json({"error": "Companion not found"})
+        await websocket.close()
+        return
+    companion = actor.companion
+    reader = None
+    recording = None
 
-                # 9. Save AI response with embedding
-                ai_embedding = await get_embedding(full_response)
-                save_chat_log(str(companion_id), "AI", full_response, ai_embedding)
-
-                # 10. Check for naming ceremony (after 10 AI turns, positive sentiment)
-                naming_msg = await check_naming_event(str(companion_id), companion)
-                if naming_msg:
-                    await websocket.send_json({
-                        "type": "naming_prompt",
-                        "content": naming_msg,
-                    })
-                    # Save the naming prompt as AI message
-                    try:
-                        naming_embedding = await get_embedding(naming_msg)
-                        save_chat_log(str(companion_id), "AI", naming_msg, naming_embedding)
-                    except Exception:
-                        pass
-
-                # 11. Check for MBTI personality discovery (after 50 AI turns)
-                announcement = await discover_personality(str(companion_id), companion)
-                if announcement:
-                    await websocket.send_json({
-                        "type": "announcement",
-                        "content": announcement,
-                    })
+    try:
+        # Look up user tier for smart routing and admission limits
+        if actor.user_tier is None:
+            actor.user_tier = get_subscription_plan(companion.get("user_id", ""))
+        user_id = companion.get("user_id", "")
+
+        # Replay fixture capture (only with SESSION_RECORD_DIR set)
+        recording = await start_recording(websocket, str(companion_id), companion, actor.user_tier)
+
+        if actor.scheduler is None:
+            actor.scheduler = start_post_turn_scheduler(actor)
+
+        # Send greeting on first connection if no prior messages exist;
+        # the exact count is taken once, later turns are counted in the actor
+        async with actor.turn_lock:
+            if actor.ai_turns is None:
+                actor.ai_turns = get_chat_count(str(companion_id))
+            if actor.ai_turns == 0:
+                actor.ai_turns = 1
+                greeting = NAMING_GREETING
+                await websocket.send_json({"type": "greeting", "content": greeting})
+                # Save greeting as AI message
+                try:
+                    greeting_embedding = await get_embedding(greeting)
+                    save_chat_log(str(companion_id), "AI", greeting, greeting_embedding)
+                except Exception as e:
+                    logger.warning("Failed to save greeting: %s", e)
+
+        # Receiving runs alongside turns: a flood is queued/shed, and a new
+        # message or a disconnect can cut the streaming reply short
+        conn = ChatConnection(websocket, actor.user_tier)
+        reader = asyncio.create_task(read_messages(conn))
 
+        while True:
+            item = await conn.queue.get()
+            # Messages still queued when the client left have nobody to
+            # answer: don't pay for their turns
+            if item is None or conn.disconnected:
+                break
+            user_message, user_name = item
+
+            state = TurnState()
+            conn.turn_state = state
+            conn.turn = asyncio.create_task(
+                run_turn(conn, actor, user_id, user_message, user_name, state)
+            )
+            try:
+                await conn.turn
+            except asyncio.CancelledError:
+                if asyncio.current_task().cancelling():
+                    raise
+                # Barge-in or disconnect: upstream stream is closed, keep what was said
+                admission.charge_tokens(user_id, conn.tier, approx_tokens(state.partial))
+                await save_interrupted_reply(conn, actor, state)
             except Exception as e:
+                if conn.disconnected or isinstance(e, WebSocketDisconnect):
+                    break
                 logger.error("Chat processing error: %s", e, exc_info=True)
                 # Send error as "end" so the frontend always shows a message
                 await websocket.send_json(
                     {"type": "end", "content": "죄송해요, 잠시 문제가 생겼어요. 다시 말씀해 주시겠어요?"}
                 )
+            finally:
+                conn.turn = None
+                conn.turn_state = None
 
     except WebSocketDisconnect:
         pass
+    finally:
+        if reader is not None:
+            reader.cancel()
+        await companion_registry.detach(actor, websocket)
+        if recording is not None:
+            await recording.finish()
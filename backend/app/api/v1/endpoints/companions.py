@@ -1,22 +1,60 @@
+from datetime import date, datetime
+from typing import Optional
 from uuid import UUID
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Query, Request
 from pydantic import BaseModel, Field
 
+from app.core.cache import get_cache, invalidate_user_companions
+from app.core.conditional import (
+    conditional_response,
+    decode_cursor,
+    encode_cursor,
+    parse_fields,
+    render_json,
+)
 from app.core.supabase import get_supabase_client
 
 router = APIRouter()
 
+MONTH_PATTERN = r"^\d{4}-(0[1-9]|1[0-2])$"
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 500
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+# Columns selectable via `fields=`
+COMPANION_FIELDS = (
+    "companion_id", "user_id", "name", "relationship_type", "tone_style",
+    "summary", "active_traits", "timezone", "created_at",
+)
+EMOTION_FIELDS = (
+    "date", "companion_id", "primary_emotion", "color_hex", "summary_text",
+    "key_quote", "created_at",
+)
+INVENTORY_FIELDS = (
+    "item_id", "user_id", "item_type", "image_url", "image_variants",
+    "metadata", "acquired_at",
+)
+
 
 class CompanionCreate(BaseModel):
     user_id: UUID
     name: str = Field(..., min_length=1, max_length=50)
     relationship_type: str = Field(default="friend", max_length=50)
     tone_style: str = Field(default="warm and caring", max_length=50)
+    timezone: str = Field(default="UTC", max_length=64)
 
 
 @router.post("/companions")
 def create_companion(payload: CompanionCreate):
+    try:
+        ZoneInfo(payload.timezone)
+    except (ZoneInfoNotFoundError, ValueError):
+        # ValueError: not a valid key at all (e.g. a path)
+        raise HTTPException(status_code=400, detail="Unknown timezone")
+
     sb = get_supabase_client()
     result = (
         sb.table("Companions")
@@ -25,48 +63,195 @@ def create_companion(payload: CompanionCreate):
             "name": payload.name,
             "relationship_type": payload.relationship_type,
             "tone_style": payload.tone_style,
+            "timezone": payload.timezone,
         })
         .execute()
     )
+    invalidate_user_companions(str(payload.user_id))
     return result.data[0]
 
 
-@router.get("/companions/{companion_id}")
-def get_companion(companion_id: UUID):
+def fetch_companion(companion_id: str, fields: str | None = None) -> dict | None:
     sb = get_supabase_client()
     result = (
         sb.table("Companions")
-        .select("*")
-        .eq("companion_id", str(companion_id))
+        .select(parse_fields(fields, COMPANION_FIELDS))
+        .eq("companion_id", companion_id)
         .maybe_single()
         .execute()
     )
-    if not result.data:
-        raise HTTPException(status_code=404, detail="Companion not found")
-    return result.data
+    return result.data if result else None
 
 
-@router.get("/emotions/{companion_id}")
-def get_emotions(companion_id: UUID):
+def fetch_user_companions(user_id: str, limit: int) -> list[dict]:
+    """A user's companions without the heavy summary/active_traits columns."""
     sb = get_supabase_client()
     result = (
-        sb.table("Daily_Emotions")
-        .select("*")
-        .eq("companion_id", str(companion_id))
-        .order("date", desc=True)
+        sb.table("Companions")
+        .select(", ".join(c for c in COMPANION_FIELDS if c not in ("summary", "active_traits")))
+        .eq("user_id", user_id)
+        .order("created_at")
+        .limit(limit)
         .execute()
     )
     return result.data or []
 
 
-@router.get("/inventory/{user_id}")
-def get_inventory(user_id: UUID):
+def fetch_emotions_page(
+    companion_id: str,
+    start: date | None = None,
+    end: date | None = None,
+    limit: int = DEFAULT_PAGE_SIZE,
+    cursor: str | None = None,
+    fields: str | None = None,
+) -> tuple[list[dict], str | None]:
+    """One keyset page of daily emotions, newest first. Returns (rows, next_cursor)."""
     sb = get_supabase_client()
-    result = (
+    query = (
+        sb.table("Daily_Emotions")
+        .select(parse_fields(fields, EMOTION_FIELDS, required=("date",)))
+        .eq("companion_id", companion_id)
+    )
+    if start:
+        query = query.gte("date", str(start))
+    if end:
+        query = query.lte("date", str(end))
+    if cursor:
+        after = decode_cursor(cursor, {"date": date.fromisoformat})
+        query = query.lt("date", after["date"].isoformat())
+    result = query.order("date", desc=True).limit(limit + 1).execute()
+
+    rows = result.data or []
+    if len(rows) > limit:
+        rows = rows[:limit]
+        return rows, encode_cursor({"date": rows[-1]["date"]})
+    return rows, None
+
+
+def fetch_monthly_emotions(
+    companion_id: str, start: str | None = None, end: str | None = None
+) -> list[dict]:
+    sb = get_supabase_client()
+    query = (
+        sb.table("Monthly_Emotions")
+        .select("month, emotion_counts, color_counts, dominant_emotion, dominant_color, day_count, updated_at")
+        .eq("companion_id", companion_id)
+    )
+    if start:
+        query = query.gte("month", f"{start}-01")
+    if end:
+        query = query.lte("month", f"{end}-01")
+    result = query.order("month", desc=True).execute()
+    return result.data or []
+
+
+def fetch_inventory_page(
+    user_id: str,
+    limit: int = DEFAULT_PAGE_SIZE,
+    cursor: str | None = None,
+    fields: str | None = None,
+) -> tuple[list[dict], str | None]:
+    """One keyset page of inventory items, newest first. Returns (rows, next_cursor)."""
+    sb = get_supabase_client()
+    query = (
         sb.table("User_Inventory")
-        .select("*")
-        .eq("user_id", str(user_id))
-        .order("acquired_at", desc=True)
+        .select(parse_fields(fields, INVENTORY_FIELDS, required=("item_id", "acquired_at")))
+        .eq("user_id", user_id)
+    )
+    if cursor:
+        after = decode_cursor(cursor, {"acquired_at": datetime.fromisoformat, "item_id": UUID})
+        acquired_at = after["acquired_at"].isoformat()
+        query = query.or_(
+            f'acquired_at.lt."{acquired_at}",'
+            f'and(acquired_at.eq."{acquired_at}",item_id.lt.{after["item_id"]})'
+        )
+    result = (
+        query.order("acquired_at", desc=True)
+        .order("item_id", desc=True)
+        .limit(limit + 1)
         .execute()
     )
-    return result.data or []
+
+    rows = result.data or []
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        return rows, encode_cursor({"acquired_at": last["acquired_at"], "item_id": last["item_id"]})
+    return rows, None
+
+
+def _render_page(rows: list[dict], next_cursor: str | None) -> tuple[bytes, str, dict]:
+    body, etag = render_json(rows)
+    headers = {NEXT_CURSOR_HEADER: next_cursor} if next_cursor else {}
+    return body, etag, headers
+
+
+@router.get("/companions/{companion_id}")
+def get_companion(request: Request, companion_id: UUID, fields: Optional[str] = None):
+    def load():
+        companion = fetch_companion(str(companion_id), fields)
+        if not companion:
+            raise HTTPException(status_code=404, detail="Companion not found")
+        return render_json(companion)
+
+    body, etag = get_cache().get_or_load("companion", str(companion_id), f"fields={fields}", load)
+    return conditional_response(request, body, etag)
+
+
+@router.get("/emotions/{companion_id}")
+def get_emotions(
+    request: Request,
+    companion_id: UUID,
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+):
+    """Daily emotions, newest first, optionally limited to [start, end].
+
+    Keyset-paginated on date: pass the X-Next-Cursor header of one page as
+    `cursor` to get the next.
+    """
+    body, etag, headers = get_cache().get_or_load(
+        "emotions",
+        str(companion_id),
+        f"daily|{start}|{end}|{limit}|{cursor}|{fields}",
+        lambda: _render_page(*fetch_emotions_page(str(companion_id), start, end, limit, cursor, fields)),
+    )
+    return conditional_response(request, body, etag, headers)
+
+
+@router.get("/emotions/{companion_id}/monthly")
+def get_monthly_emotions(
+    request: Request,
+    companion_id: UUID,
+    start: Optional[str] = Query(None, pattern=MONTH_PATTERN),
+    end: Optional[str] = Query(None, pattern=MONTH_PATTERN),
+):
+    """Monthly rollups (emotion/color counts, dominant values, day count), newest first."""
+    body, etag = get_cache().get_or_load(
+        "emotions",
+        str(companion_id),
+        f"monthly|{start}|{end}",
+        lambda: render_json(fetch_monthly_emotions(str(companion_id), start, end)),
+    )
+    return conditional_response(request, body, etag)
+
+
+@router.get("/inventory/{user_id}")
+def get_inventory(
+    request: Request,
+    user_id: UUID,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+):
+    """Inventory items, newest first, keyset-paginated on (acquired_at, item_id)."""
+    body, etag, headers = get_cache().get_or_load(
+        "inventory",
+        str(user_id),
+        f"{limit}|{cursor}|{fields}",
+        lambda: _render_page(*fetch_inventory_page(str(user_id), limit, cursor, fields)),
+    )
+    return conditional_response(request, body, etag, headers)
@@ -0,0 +1,82 @@
+import asyncio
+from datetime import date, timedelta
+from typing import Optional
+from uuid import UUID
+
+from fastapi import APIRouter, Query, Request
+
+from app.api.v1.endpoints.companions import (
+    MONTH_PATTERN,
+    fetch_emotions_page,
+    fetch_inventory_page,
+    fetch_user_companions,
+)
+from app.core.cache import get_cache
+from app.core.conditional import conditional_json
+
+router = APIRouter()
+
+# Bounded response: one calendar month per companion, one gem page
+MAX_DASHBOARD_COMPANIONS = 10
+DASHBOARD_INVENTORY_LIMIT = 24
+
+
+def month_range(month: str) -> tuple[date, date]:
+    year, mon = (int(part) for part in month.split("-"))
+    start = date(year, mon, 1)
+    end = (start + timedelta(days=32)).replace(day=1) - timedelta(days=1)
+    return start, end
+
+
+@router.get("/dashboard/{user_id}")
+async def get_dashboard(
+    request: Request,
+    user_id: UUID,
+    month: Optional[str] = Query(None, pattern=MONTH_PATTERN),
+    inventory_limit: int = Query(DASHBOARD_INVENTORY_LIMIT, ge=1, le=100),
+):
+    """Home/log screen data in one round trip.
+
+    Fans out concurrently to the user's companions (each with one month of
+    daily emotions) and the first inventory page. Reads go through the same
+    response cache as the individual endpoints.
+    """
+    cache = get_cache()
+    start, end = month_range(month or date.today().strftime("%Y-%m"))
+
+    def load_companions():
+        return cache.get_or_load(
+            "user_companions", str(user_id), "dashboard",
+            lambda: fetch_user_companions(str(user_id), MAX_DASHBOARD_COMPANIONS),
+        )
+
+    def load_emotions(companion_id: str):
+        return cache.get_or_load(
+            "emotions", companion_id, f"dashboard|{start}|{end}",
+            lambda: fetch_emotions_page(companion_id, start, end, limit=31)[0],
+        )
+
+    def load_inventory():
+        return cache.get_or_load(
+            "inventory", str(user_id), f"dashboard|{inventory_limit}",
+            lambda: fetch_inventory_page(str(user_id), limit=inventory_limit),
+        )
+
+    async def load_companions_with_emotions():
+        companions = await asyncio.to_thread(load_companions)
+        emotions = await asyncio.gather(*(
+            asyncio.to_thread(load_emotions, c["companion_id"]) for c in companions
+        ))
+        return [{**c, "emotions": e} for c, e in zip(companions, emotions)]
+
+    companions, (inventory, inventory_cursor) = await asyncio.gather(
+        load_companions_with_emotions(),
+        asyncio.to_thread(load_inventory),
+    )
+
+    return conditional_json(request, {
+        "companions": companions,
+        "inventory": inventory,
+        "inventory_next_cursor": inventory_cursor,
+        "month": f"{start:%Y-%m}",
+    })
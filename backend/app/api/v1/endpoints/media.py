@@ -0,0 +1,26 @@
+import os
+
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import FileResponse
+
+from app.core.blob_store import LocalBlobStore, get_blob_store
+
+router = APIRouter()
+
+# Blob keys are content-addressed, so a URL's bytes never change
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+
+@router.get("/media/{key:path}")
+def get_media(key: str):
+    """Serve a blob from the local blob store (stand-in for a CDN)."""
+    store = get_blob_store()
+    if not isinstance(store, LocalBlobStore):
+        raise HTTPException(status_code=404, detail="Media is not served locally")
+    try:
+        path = store.path(key)
+    except ValueError:
+        raise HTTPException(status_code=404, detail="Not found")
+    if not os.path.exists(path):
+        raise HTTPException(status_code=404, detail="Not found")
+    return FileResponse(path, headers={"Cache-Control": IMMUTABLE_CACHE_CONTROL})
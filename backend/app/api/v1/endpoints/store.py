@@ -1,20 +1,37 @@
+import asyncio
+import logging
+from functools import lru_cache
+from typing import Optional
 from uuid import UUID
 
 from fastapi import APIRouter, HTTPException
-from pydantic import BaseModel
-from openai import AsyncOpenAI
+from pydantic import BaseModel, Field
 
+from app.core.cache import invalidate_inventory
 from app.core.config import get_settings
 from app.core.supabase import get_supabase_client
+from app.services.crystallizer import (
+    consume_staged_gem,
+    current_month,
+    generate_dalle_prompt,
+    generate_gem_image,
+    get_monthly_emotions,
+    get_monthly_rollup,
+    get_staged_gem,
+    rollup_fingerprint,
+)
+from app.services.gem_images import persist_gem_image
+from app.services.job_queue import Job, JobQueue, QueueFullError, job_store
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
-settings = get_settings()
-openai_client = AsyncOpenAI(api_key=settings.OPENAI_API_KEY)
 
 
 class CrystallizeRequest(BaseModel):
     companion_id: UUID
     user_id: UUID
+    month: Optional[str] = Field(None, pattern=r"^\d{4}-(0[1-9]|1[0-2])$")
 
 
 class CrystallizeResponse(BaseModel):
@@ -24,89 +41,18 @@ class CrystallizeResponse(BaseModel):
     color_hex: str
 
 
-def get_monthly_emotions(companion_id: str) -> list[dict]:
-    """Fetch this month's daily emotions for the companion."""
-    sb = get_supabase_client()
-    from datetime import date
-    today = date.today()
-    month_start = today.replace(day=1)
-
-    result = (
-        sb.table("Daily_Emotions")
-        .select("*")
-        .eq("companion_id", companion_id)
-        .gte("date", str(month_start))
-        .lte("date", str(today))
-        .order("date")
-        .execute()
-    )
-    return result.data or []
-
-
-async def generate_dalle_prompt(emotions: list[dict]) -> tuple[str, str, str]:
-    """Use gpt-4o to craft a DALL-E prompt from the monthly emotion summary.
-
-    Returns (dalle_prompt, dominant_emotion, dominant_color).
-    """
-    summary_lines = []
-    color_counts: dict[str, int] = {}
-    emotion_counts: dict[str, int] = {}
-
-    for e in emotions:
-        summary_lines.append(
-            f"{e['date']}: {e.get('primary_emotion', '?')} ({e.get('color_hex', '#808080')}) - {e.get('summary_text', '')}"
-        )
-        color = e.get("color_hex", "#808080")
-        emotion = e.get("primary_emotion", "neutral")
-        color_counts[color] = color_counts.get(color, 0) + 1
-        emotion_counts[emotion] = emotion_counts.get(emotion, 0) + 1
-
-    dominant_color = max(color_counts, key=color_counts.get) if color_counts else "#808080"
-    dominant_emotion = max(emotion_counts, key=emotion_counts.get) if emotion_counts else "neutral"
-    summary_text = "\n".join(summary_lines)
-
-    response = await openai_client.chat.completions.create(
-        model="gpt-4o",
-        messages=[
-            {
-                "role": "system",
-                "content": (
-                    "You are a creative art director. Given an emotional summary of a month, "
-                    "craft a single DALL-E image prompt for a magical gemstone that represents "
-                    "these emotions. Output ONLY the prompt text, nothing else."
-                ),
-            },
-            {
-                "role": "user",
-                "content": (
-                    f"Monthly emotional data:\n{summary_text}\n\n"
-                    f"Dominant color: {dominant_color}\n"
-                    f"Dominant emotion: {dominant_emotion}\n\n"
-                    "Create a prompt for: A high-end 3D render of a jewelry gem. "
-                    f"The core color is {dominant_color}. It should feel {dominant_emotion}. "
-                    "Magical, glowing, cinematic lighting."
-                ),
-            },
-        ],
-    )
-
-    dalle_prompt = response.choices[0].message.content.strip()
-    return dalle_prompt, dominant_emotion, dominant_color
-
-
-async def generate_gem_image(dalle_prompt: str) -> str:
-    """Call DALL-E 3 to generate the gem image. Returns the image URL."""
-    response = await openai_client.images.generate(
-        model="dall-e-3",
-        prompt=dalle_prompt,
-        size="1024x1024",
-        quality="hd",
-        n=1,
-    )
-    return response.data[0].url
+class CrystallizeJobResponse(BaseModel):
+    job_id: str
+    status: str       # "queued" | "running" | "done" | "failed"
+    stage: str        # current step, e.g. "prompt" | "image" | "saving"
+    month: str
+    result: Optional[CrystallizeResponse] = None
+    error: Optional[str] = None
 
 
-def save_to_inventory(user_id: str, image_url: str, metadata: dict) -> str:
+def save_to_inventory(
+    user_id: str, image_url: str, metadata: dict, image_variants: dict | None = None
+) -> str:
     """Save the generated gem to User_Inventory. Returns the item_id."""
     sb = get_supabase_client()
     result = (
@@ -115,40 +61,78 @@ def save_to_inventory(user_id: str, image_url: str, metadata: dict) -> str:
             "user_id": user_id,
             "item_type": "MEMORY_GEM",
             "image_url": image_url,
+            "image_variants": image_variants,
             "metadata": metadata,
         })
         .execute()
     )
+    invalidate_inventory(user_id)
     return result.data[0]["item_id"]
 
 
-@router.post("/store/crystallize", response_model=CrystallizeResponse)
-async def crystallize(request: CrystallizeRequest):
-    """Generate a Memory Gem from this month's emotional analysis."""
-    emotions = get_monthly_emotions(str(request.companion_id))
-    if not emotions:
-        raise HTTPException(
-            status_code=400,
-            detail="No emotional data found for this month. Chat more first!",
-        )
+async def run_crystallize_job(job: Job) -> CrystallizeResponse:
+    """Worker body: prompt → image → inventory, reporting progress via job.stage.
 
-    # 1. Generate DALL-E prompt via gpt-4o
-    dalle_prompt, emotion, color = await generate_dalle_prompt(emotions)
+    A pre-crystallized result from the month-end batch (Gem_Staging) is
+    reused when its fingerprint still matches the month's rollup; only
+    the missing pieces are generated. It is then marked consumed, so it
+    backs exactly one gem.
+    """
+    companion_id = job.payload["companion_id"]
+    user_id = job.payload["user_id"]
+    month = job.payload["month"]
+    rollup = job.payload["rollup"]
 
-    # 2. Generate gem image via DALL-E 3
-    image_url = await generate_gem_image(dalle_prompt)
+    staged = await asyncio.to_thread(get_staged_gem, companion_id, month)
+    if staged and (staged.get("consumed_at") or staged["fingerprint"] != rollup_fingerprint(rollup)):
+        # Already made into a gem, or new daily data arrived since the
+        # batch ran (stale)
+        staged = None
 
-    # 3. Save to inventory
-    item_id = save_to_inventory(
-        str(request.user_id),
+    # 1. Generate DALL-E prompt via gpt-4o
+    if staged:
+        dalle_prompt = staged["dalle_prompt"]
+        emotion, color = staged["dominant_emotion"], staged["dominant_color"]
+    else:
+        await job.set_stage("emotions")
+        emotions = await asyncio.to_thread(get_monthly_emotions, companion_id, month)
+        await job.set_stage("prompt")
+        dalle_prompt, emotion, color = await generate_dalle_prompt(emotions, rollup)
+
+    if staged and staged.get("image_url"):
+        image_url = staged["image_url"]
+        image_variants = staged.get("image_variants")
+    else:
+        # 2. Generate gem image via DALL-E 3
+        await job.set_stage("image")
+        image_url = await generate_gem_image(dalle_prompt)
+
+        # 3. Persist the temporary DALL-E image + gallery variants
+        await job.set_stage("storing")
+        image_variants = await persist_gem_image(image_url)
+        if image_variants:
+            image_url = image_variants["original"]
+
+    # 4. Save to inventory
+    await job.set_stage("saving")
+    item_id = await asyncio.to_thread(
+        save_to_inventory,
+        user_id,
         image_url,
         {
             "emotion": emotion,
             "color_hex": color,
             "dalle_prompt": dalle_prompt,
-            "source_days": len(emotions),
+            "source_days": rollup["day_count"],
+            "month": month,
         },
+        image_variants,
     )
+    if staged:
+        try:
+            await asyncio.to_thread(consume_staged_gem, companion_id, month)
+        except Exception as e:
+            logger.warning("Failed to mark staged gem %s/%s consumed: %s", companion_id, month, e)
 
     return CrystallizeResponse(
         item_id=item_id,
@@ -156,3 +140,70 @@ async def crystallize(request: CrystallizeRequest):
         emotion=emotion,
         color_hex=color,
     )
+
+
+@lru_cache()
+def get_crystallize_queue() -> JobQueue:
+    settings = get_settings()
+    return JobQueue(
+        run_crystallize_job,
+        name="crystallize",
+        max_workers=settings.CRYSTALLIZE_WORKERS,
+        max_pending=settings.CRYSTALLIZE_MAX_PENDING,
+        store=job_store("crystallize"),
+    )
+
+
+def _job_response(job: Job) -> CrystallizeJobResponse:
+    return CrystallizeJobResponse(
+        job_id=job.job_id,
+        status=job.status,
+        stage=job.stage,
+        month=job.payload["month"],
+        result=job.result,
+        error=job.error,
+    )
+
+
+@router.post("/store/crystallize", response_model=CrystallizeJobResponse, status_code=202)
+async def crystallize(request: CrystallizeRequest):
+    """Queue a Memory Gem generation for a month's emotional analysis.
+
+    Returns a job immediately; poll GET /store/crystallize/{job_id} for the result.
+    Repeated requests for the same (companion, month) return the same job.
+    """
+    month = request.month or current_month()
+    key = (str(request.companion_id), month)
+
+    existing = await get_crystallize_queue().find(key)
+    if existing:
+        return _job_response(existing)
+
+    rollup = await asyncio.to_thread(
+        get_monthly_rollup, str(request.companion_id), month
+    )
+    if not rollup or not rollup["day_count"]:
+        raise HTTPException(
+            status_code=400,
+            detail="No emotional data found for this month. Chat more first!",
+        )
+
+    try:
+        job = await get_crystallize_queue().submit(key, {
+            "companion_id": str(request.companion_id),
+            "user_id": str(request.user_id),
+            "month": month,
+            "rollup": rollup,
+        })
+    except QueueFullError:
+        raise HTTPException(status_code=503, detail="Crystallization is busy. Try again shortly.")
+    return _job_response(job)
+
+
+@router.get("/store/crystallize/{job_id}", response_model=CrystallizeJobResponse)
+async def get_crystallize_job(job_id: str):
+    """Report the progress or result of a crystallization job."""
+    job = await get_crystallize_queue().get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return _job_response(job)
@@ -1,9 +1,12 @@
 from fastapi import APIRouter
 
-from app.api.v1.endpoints import chat, companions, store
+from app.api.v1.endpoints import admin, chat, companions, dashboard, media, store
 
 router = APIRouter()
 
 router.include_router(chat.router, tags=["chat"])
 router.include_router(companions.router, tags=["companions"])
+router.include_router(dashboard.router, tags=["dashboard"])
 router.include_router(store.router, tags=["store"])
+router.include_router(media.router, tags=["media"])
+router.include_router(admin.router, tags=["admin"])
@@ -0,0 +1,138 @@
+"""
+Admission control for chat turns: per-user token buckets by tier.
+
+Each user gets two buckets shared by all of their connections in this
+process: messages per minute and LLM tokens per minute. A turn first
+takes one message token, waiting for a refill if needed; the token
+bucket may go into debt after an expensive turn and then delays the
+user's next turn until it is paid back. Connections queue a bounded
+number of messages and shed the rest (see chat_websocket).
+"""
+
+import time
+from dataclasses import dataclass
+
+from app.core.metrics import counter
+
+
+# ── Tier limits ──
+@dataclass(frozen=True)
+class TierLimits:
+    messages_per_minute: float
+    message_burst: int
+    tokens_per_minute: float
+
+
+TIER_LIMITS: dict[str, TierLimits] = {
+    "FREE": TierLimits(messages_per_minute=10, message_burst=5, tokens_per_minute=8_000),
+    "SOULMATE": TierLimits(messages_per_minute=30, message_burst=10, tokens_per_minute=40_000),
+}
+DEFAULT_TIER = "FREE"
+
+# Per-connection queue of received-but-unprocessed messages; beyond it, shed
+MAX_QUEUED_MESSAGES = 3
+
+# Idle buckets are dropped once this many users are tracked
+MAX_TRACKED_USERS = 10_000
+
+messages_total = counter(
+    "chat_messages_total",
+    "Chat messages received, by tier and admission outcome",
+    ("tier", "outcome"),
+)
+rate_limited_total = counter(
+    "chat_rate_limited_total",
+    "rate_limited frames sent, by tier and reason",
+    ("tier", "reason"),
+)
+admission_wait_seconds_total = counter(
+    "chat_admission_wait_seconds_total",
+    "Time turns spent waiting for a bucket refill",
+    ("tier",),
+)
+
+
+class TokenBucket:
+    def __init__(self, rate_per_minute: float, capacity: float):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = capacity
+        self.level = capacity
+        self.updated = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def reserve(self, amount: float = 1) -> float:
+        """Take `amount` now (possibly into debt); return seconds to wait
+        until the reservation is covered."""
+        self._refill()
+        self.level -= amount
+        return max(0.0, -self.level / self.rate)
+
+    def debt_delay(self) -> float:
+        """Seconds until the bucket is out of debt (0 if not in debt)."""
+        self._refill()
+        return max(0.0, -self.level / self.rate)
+
+    def charge(self, amount: float) -> None:
+        self._refill()
+        self.level -= amount
+
+    @property
+    def full(self) -> bool:
+        self._refill()
+        return self.level >= self.capacity
+
+
+@dataclass
+class UserBuckets:
+    messages: TokenBucket
+    tokens: TokenBucket
+
+
+class AdmissionController:
+    def __init__(self):
+        self._users: dict[str, UserBuckets] = {}
+
+    @staticmethod
+    def limits(tier: str) -> TierLimits:
+        return TIER_LIMITS.get(tier, TIER_LIMITS[DEFAULT_TIER])
+
+    def buckets(self, user_id: str, tier: str) -> UserBuckets:
+        buckets = self._users.get(user_id)
+        if buckets is None:
+            if len(self._users) >= MAX_TRACKED_USERS:
+                self._prune()
+            limits = self.limits(tier)
+            buckets = UserBuckets(
+                messages=TokenBucket(limits.messages_per_minute, limits.message_burst),
+                # One minute's worth of tokens as burst
+                tokens=TokenBucket(limits.tokens_per_minute, limits.tokens_per_minute),
+            )
+            self._users[user_id] = buckets
+        return buckets
+
+    def _prune(self) -> None:
+        """Forget users whose buckets have fully refilled (no state to keep)."""
+        for user_id in [u for u, b in self._users.items() if b.messages.full and b.tokens.full]:
+            del self._users[user_id]
+
+    def turn_delay(self, user_id: str, tier: str) -> tuple[float, str | None]:
+        """Reserve one message for a turn. Returns (seconds to wait, reason)."""
+        buckets = self.buckets(user_id, tier)
+        token_wait = buckets.tokens.debt_delay()
+        message_wait = buckets.messages.reserve(1)
+        if token_wait >= message_wait and token_wait > 0:
+            return token_wait, "tokens"
+        if message_wait > 0:
+            return message_wait, "messages"
+        return 0.0, None
+
+    def charge_tokens(self, user_id: str, tier: str, tokens: int) -> None:
+        """Charge a finished turn's LLM tokens (prompt + completion)."""
+        self.buckets(user_id, tier).tokens.charge(tokens)
+
+
+admission = AdmissionController()
@@ -0,0 +1,67 @@
+"""
+Pluggable blob storage for generated media.
+
+Blobs are content-addressed (the key contains the SHA-256 of the bytes),
+so a stored object never changes and its URL can be cached forever.
+The local filesystem backend stands in for an object store / CDN.
+"""
+
+import os
+import re
+from abc import ABC, abstractmethod
+from functools import lru_cache
+
+from app.core.config import get_settings
+
+# Keys look like "gems/<sha256>.png" or "gems/<sha256>_256.webp"
+BLOB_KEY_PATTERN = re.compile(r"^[a-z]+/[0-9a-f]{64}(_\d+)?\.[a-z0-9]+$")
+
+
+class BlobStore(ABC):
+    @abstractmethod
+    def exists(self, key: str) -> bool:
+        ...
+
+    @abstractmethod
+    def put(self, key: str, data: bytes, content_type: str) -> None:
+        ...
+
+    @abstractmethod
+    def url(self, key: str) -> str:
+        """Public, immutable URL for a stored blob."""
+
+
+class LocalBlobStore(BlobStore):
+    """Stores blobs under a local directory, served by the /media endpoint."""
+
+    def __init__(self, root: str, base_url: str):
+        self.root = os.path.abspath(root)
+        self.base_url = base_url.rstrip("/")
+
+    def path(self, key: str) -> str:
+        if not BLOB_KEY_PATTERN.match(key):
+            raise ValueError(f"Invalid blob key: {key}")
+        return os.path.join(self.root, key)
+
+    def exists(self, key: str) -> bool:
+        return os.path.exists(self.path(key))
+
+    def put(self, key: str, data: bytes, content_type: str) -> None:
+        path = self.path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Write-then-rename so readers never see a partial file
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    def url(self, key: str) -> str:
+        return f"{self.base_url}/{key}"
+
+
+@lru_cache()
+def get_blob_store() -> BlobStore:
+    settings = get_settings()
+    if settings.BLOB_BACKEND == "local":
+        return LocalBlobStore(settings.BLOB_LOCAL_DIR, settings.MEDIA_BASE_URL)
+    raise ValueError(f"Unknown BLOB_BACKEND: {settings.BLOB_BACKEND}")
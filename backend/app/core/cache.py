@@ -0,0 +1,183 @@
+"""
+Read-through response cache with write-triggered invalidation.
+
+Entries are keyed per resource ("companion", "emotions", "inventory", ...) and
+id, plus a variant string for query parameters. Every resource has a
+generation counter; writers call `invalidate(resource, id)` to bump it,
+which orphans all cached variants at once. A reader that loaded from the
+database while an invalidation happened stores its result under the old
+generation, so it can never resurrect stale data.
+
+A generation that isn't stored (never bumped, or evicted) is given a new,
+never-used value on first read rather than read as 0, so losing a
+generation only costs misses: entries cached under it can't match again.
+
+Bodies are always cached in process (an LRU with TTL). Where generations
+live decides who can invalidate them:
+
+  * "local": in process too, so only writes from this worker invalidate;
+    for single-process development.
+  * "supabase": in Postgres (migration 009), so a write on any worker or in
+    the cron invalidates every worker's copies. Workers re-read a
+    generation at most every CACHE_GENERATION_TTL_SECONDS, which bounds
+    how long a body (and its ETag) can outlive an invalidation elsewhere.
+    If the generation can't be read the cache is bypassed, never trusted.
+"""
+
+import itertools
+import logging
+import threading
+from abc import ABC, abstractmethod
+from functools import lru_cache
+from typing import Any, Callable
+
+from cachetools import TTLCache
+
+from app.core.config import get_settings
+from app.core.supabase import get_supabase_client
+
+logger = logging.getLogger(__name__)
+
+MISSING = object()
+
+
+class CacheBackend(ABC):
+    @abstractmethod
+    def get(self, key: str) -> Any:
+        """Return the cached value or MISSING."""
+
+    @abstractmethod
+    def set(self, key: str, value: Any) -> None:
+        ...
+
+    @abstractmethod
+    def generation(self, key: str) -> int:
+        """Current value of a generation key, set to a new, never-reused value
+        if it has none."""
+
+    @abstractmethod
+    def bump(self, key: str) -> int:
+        """Atomically set a generation key to a new, never-reused value."""
+
+
+class LocalCacheBackend(CacheBackend):
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        self._entries = TTLCache(maxsize=max_entries, ttl=ttl_seconds)
+        # Generations outlive the entries cached under them; one that is
+        # evicted anyway comes back as a fresh value (see generation())
+        self._generations = TTLCache(maxsize=max_entries, ttl=ttl_seconds * 2)
+        self._counter = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Any:
+        with self._lock:
+            return self._entries.get(key, MISSING)
+
+    def set(self, key: str, value: Any) -> None:
+        with self._lock:
+            self._entries[key] = value
+
+    def generation(self, key: str) -> int:
+        with self._lock:
+            if key not in self._generations:
+                self._generations[key] = next(self._counter)
+            return self._generations[key]
+
+    def bump(self, key: str) -> int:
+        with self._lock:
+            self._generations[key] = next(self._counter)
+            return self._generations[key]
+
+
+class SupabaseCacheBackend(LocalCacheBackend):
+    """Bodies in process, generations shared through Postgres (migration 009)."""
+
+    def __init__(self, max_entries: int, ttl_seconds: float, generation_ttl_seconds: float):
+        super().__init__(max_entries, ttl_seconds)
+        # Local copies of shared generations, trusted for generation_ttl_seconds
+        self._generations = TTLCache(maxsize=max_entries, ttl=generation_ttl_seconds)
+
+    def _remember(self, key: str, generation: int) -> int:
+        with self._lock:
+            self._generations[key] = generation
+        return generation
+
+    def generation(self, key: str) -> int:
+        with self._lock:
+            if key in self._generations:
+                return self._generations[key]
+        result = get_supabase_client().rpc("cache_generation", {"p_key": key}).execute()
+        return self._remember(key, int(result.data))
+
+    def bump(self, key: str) -> int:
+        result = get_supabase_client().rpc("bump_cache_generation", {"p_key": key}).execute()
+        return self._remember(key, int(result.data))
+
+
+class ResourceCache:
+    def __init__(self, backend: CacheBackend):
+        self.backend = backend
+
+    @staticmethod
+    def _generation_key(resource: str, resource_id: str) -> str:
+        return f"gen:{resource}:{resource_id}"
+
+    def get_or_load(
+        self, resource: str, resource_id: str, variant: str, loader: Callable[[], Any]
+    ) -> Any:
+        try:
+            generation = self.backend.generation(self._generation_key(resource, resource_id))
+        except Exception as e:
+            # Can't tell whether a cached body is current: serve from the source
+            logger.warning("Cache generation for %s:%s unavailable: %s", resource, resource_id, e)
+            return loader()
+        key = f"{resource}:{resource_id}:g{generation}:{variant}"
+        value = self.backend.get(key)
+        if value is MISSING:
+            value = loader()
+            self.backend.set(key, value)
+        return value
+
+    def invalidate(self, resource: str, resource_id: str) -> None:
+        # The write already happened; a failed bump must not fail the request
+        try:
+            self.backend.bump(self._generation_key(resource, str(resource_id)))
+        except Exception as e:
+            logger.error("Cache invalidation for %s:%s failed: %s", resource, resource_id, e)
+
+
+@lru_cache()
+def get_cache() -> ResourceCache:
+    settings = get_settings()
+    if settings.CACHE_BACKEND == "supabase":
+        backend = SupabaseCacheBackend(
+            settings.CACHE_MAX_ENTRIES, settings.CACHE_TTL_SECONDS, settings.CACHE_GENERATION_TTL_SECONDS
+        )
+    elif settings.CACHE_BACKEND == "local":
+        backend = LocalCacheBackend(settings.CACHE_MAX_ENTRIES, settings.CACHE_TTL_SECONDS)
+    else:
+        raise ValueError(f"Unknown CACHE_BACKEND: {settings.CACHE_BACKEND}")
+    return ResourceCache(backend)
+
+
+def invalidate_companion(companion_id: str, user_id: str | None = None) -> None:
+    """Companions row changed (name, MBTI, summary). Pass the owner's user_id
+    when a column of their companion list changed (name, tone_style)."""
+    get_cache().invalidate("companion", companion_id)
+    if user_id:
+        invalidate_user_companions(user_id)
+
+
+def invalidate_user_companions(user_id: str) -> None:
+    """A companion was added for the user, or one of theirs renamed."""
+    get_cache().invalidate("user_companions", user_id)
+
+
+def invalidate_emotions(companion_id: str) -> None:
+    """Daily_Emotions / Monthly_Emotions changed for the companion."""
+    get_cache().invalidate("emotions", companion_id)
+
+
+def invalidate_inventory(user_id: str) -> None:
+    """User_Inventory changed for the user."""
+    get_cache().invalidate("inventory", user_id)
@@ -0,0 +1,96 @@
+"""
+Helpers for cheap REST reads: keyset cursors, field projection and
+conditional GET (strong ETag → 304 Not Modified).
+"""
+
+import base64
+import hashlib
+import json
+from typing import Any, Callable
+
+from fastapi import HTTPException, Request, Response
+
+# Clients must revalidate, but may reuse their copy when the ETag still matches
+REVALIDATE_CACHE_CONTROL = "private, no-cache"
+
+
+def encode_cursor(values: dict) -> str:
+    """Opaque keyset cursor: URL-safe base64 of the last row's sort key."""
+    raw = json.dumps(values, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, parsers: dict[str, Callable[[str], Any]]) -> dict:
+    """Decode a cursor into typed values, one parser per key (e.g.
+    date.fromisoformat). Cursors reach raw PostgREST filters, so anything
+    that doesn't parse is rejected with 400."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded))
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if not isinstance(values, dict) or set(values) != set(parsers):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if not all(isinstance(value, str) for value in values.values()):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    try:
+        return {key: parse(values[key]) for key, parse in parsers.items()}
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def parse_fields(fields: str | None, allowed: tuple[str, ...], required: tuple[str, ...] = ()) -> str:
+    """Turn a `fields=a,b` parameter into a PostgREST select list.
+
+    Unknown fields are rejected; sort-key columns in `required` are always
+    included so cursors can be built from the page.
+    """
+    if not fields:
+        return "*"
+    requested = [f.strip() for f in fields.split(",") if f.strip()]
+    unknown = [f for f in requested if f not in allowed]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+    columns = list(dict.fromkeys([*required, *requested]))
+    return ", ".join(columns)
+
+
+def compute_etag(body: bytes) -> str:
+    """Strong ETag over the exact response bytes.
+
+    The body carries each row's key and timestamps, so any row change —
+    and any change in projection or page bounds — yields a new tag.
+    """
+    return '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    candidates = [tag.strip().removeprefix("W/") for tag in header.split(",")]
+    return etag in candidates
+
+
+def render_json(payload) -> tuple[bytes, str]:
+    """Serialize a payload once; returns (body, etag) ready to cache."""
+    body = json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode()
+    return body, compute_etag(body)
+
+
+def conditional_response(
+    request: Request, body: bytes, etag: str, headers: dict | None = None
+) -> Response:
+    """Send a pre-rendered body, or 304 if the client already has this ETag."""
+    response_headers = {"ETag": etag, "Cache-Control": REVALIDATE_CACHE_CONTROL, **(headers or {})}
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers=response_headers)
+    return Response(content=body, media_type="application/json", headers=response_headers)
+
+
+def conditional_json(request: Request, payload, headers: dict | None = None) -> Response:
+    """Serialize payload with a strong ETag, or answer 304 if the client already has it."""
+    body, etag = render_json(payload)
+    return conditional_response(request, body, etag, headers)
@@ -4,9 +4,91 @@ from functools import lru_cache
 
 class Settings(BaseSettings):
     OPENAI_API_KEY: str
+    # Override for proxies / local fakes; None = api.openai.com
+    OPENAI_BASE_URL: str | None = None
+    # Shared HTTP/2 pool for every OpenAI call site
+    OPENAI_MAX_CONNECTIONS: int = 100
+    OPENAI_MAX_KEEPALIVE: int = 20
+    # Adaptive (AIMD) in-flight limit per model: starting point and ceiling
+    OPENAI_INITIAL_CONCURRENCY: int = 8
+    OPENAI_MAX_CONCURRENCY: int = 64
     SUPABASE_URL: str
     SUPABASE_SERVICE_ROLE_KEY: str
 
+    # Daily analysis cron: length of each rolling per-timezone slice
+    ANALYSIS_SLICE_MINUTES: int = 15
+    # After downtime, catch up on missed slices going back at most this far
+    ANALYSIS_MAX_CATCHUP_DAYS: int = 3
+    # Attempts per failed companion day (retries back off from one slice)
+    ANALYSIS_MAX_ATTEMPTS: int = 5
+
+    # Crystallization job queue: concurrent image generations / max queued jobs
+    CRYSTALLIZE_WORKERS: int = 2
+    CRYSTALLIZE_MAX_PENDING: int = 100
+    # Where background job state lives: "supabase" (migration 011) so any
+    # worker can answer a status poll and dedupe a submission; "memory" =
+    # in process (single-process development)
+    JOB_STORE_BACKEND: str = "supabase"
+
+    # Blob storage for generated media ("local" = filesystem stand-in)
+    BLOB_BACKEND: str = "local"
+    BLOB_LOCAL_DIR: str = "media"
+    MEDIA_BASE_URL: str = "http://localhost:8000/api/v1/media"
+
+    # Read-through response cache: "supabase" = bodies in process, generations
+    # shared in Postgres (migration 009) so invalidations reach every worker
+    # and the cron; "local" = all in process (single-process development)
+    CACHE_BACKEND: str = "supabase"
+    CACHE_TTL_SECONDS: float = 300
+    CACHE_MAX_ENTRIES: int = 10000
+    # How long a worker trusts a shared generation before re-reading it: the
+    # longest it can serve a body (or a 304) another process invalidated
+    CACHE_GENERATION_TTL_SECONDS: float = 1.0
+
+    # Budget from turn start to first streamed token; slow stages degrade
+    TURN_DEADLINE_SECONDS: float = 3.0
+
+    # Background naming/MBTI checks: run every N turns, back off up to M turns
+    POST_TURN_CADENCE_TURNS: int = 3
+    POST_TURN_MAX_BACKOFF_TURNS: int = 48
+
+    # Per-companion conversational state shared across workers ("supabase" | "memory")
+    SESSION_STATE_BACKEND: str = "supabase"
+
+    # Intent classifier: "langchain" (prompt | ChatOpenAI | JSON parser) or
+    # "native" (one structured-output call with a compact prompt)
+    ROUTER_BACKEND: str = "langchain"
+
+    # Routed turns: start a default-model reply on default context while the
+    # router decides, and keep it if the router agrees
+    SPECULATIVE_GENERATION: bool = False
+    # Intents whose speculative reply is kept even when the router picks
+    # another model (comma-separated; empty = always discard on a mismatch)
+    SPECULATIVE_KEEP_INTENTS: str = ""
+
+    # Hedged replies: per-intent first-token thresholds ("intent=seconds,...";
+    # unlisted intents are never hedged, empty = off) after which the same
+    # prompt is also sent to HEDGE_MODEL and the first stream to start wins
+    HEDGE_FIRST_TOKEN_SECONDS: str = ""
+    HEDGE_MODEL: str = "gpt-4o-mini"
+    # At most this share of the last HEDGE_WINDOW_TURNS eligible turns may hedge
+    HEDGE_MAX_RATE: float = 0.1
+    HEDGE_WINDOW_TURNS: int = 200
+
+    # Event-loop watchdog: log the loop thread's stack when blocked this long
+    LOOP_MONITOR_ENABLED: bool = True
+    LOOP_LAG_THRESHOLD_SECONDS: float = 0.25
+
+    # Shared secret for /admin endpoints (X-Admin-Token); unset = admin disabled
+    ADMIN_TOKEN: str | None = None
+
+    # Record chat WebSocket sessions as replay fixtures into this directory (off if unset)
+    SESSION_RECORD_DIR: str | None = None
+
+    # Import the OpenAI/LangChain/Supabase SDKs in a background thread once the
+    # worker is up, so the first chat turn doesn't pay for them
+    PRELOAD_SDKS: bool = True
+
     class Config:
         env_file = ".env"
 
@@ -0,0 +1,86 @@
+"""
+Per-turn latency deadline with per-stage soft budgets.
+
+Everything before the reply starts streaming (naming classifier,
+embedding, router, recent history, semantic memories, emotions) runs
+under one turn deadline. Each stage gets the smaller of its own budget
+and what is left of the deadline; a stage that overruns is abandoned and
+its fallback is used instead (no memories, cached emotions, default
+intent...). Degradations are counted per stage, so time-to-first-token is
+bounded by the deadline rather than by the slowest dependency.
+"""
+
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable
+
+from app.core.metrics import counter, histogram
+
+logger = logging.getLogger(__name__)
+
+# Seconds; a stage never gets more than what is left of the turn deadline
+STAGE_BUDGETS: dict[str, float] = {
+    "naming": 1.5,
+    "embedding": 1.5,
+    "router": 1.2,
+    "recent_history": 0.8,
+    "memories": 1.0,
+    "emotions": 0.5,
+}
+DEFAULT_STAGE_BUDGET = 1.0
+
+degradations_total = counter(
+    "chat_turn_degradations_total",
+    "Turn stages abandoned for overrunning their budget, by stage",
+    ("stage",),
+)
+fallbacks_total = counter(
+    "chat_fallbacks_total",
+    "Turn dependencies that failed over to a fallback, by kind",
+    ("kind",),
+)
+stage_seconds = histogram(
+    "chat_stage_seconds",
+    "Pre-stream turn stage latency, by stage and outcome (ok / degraded)",
+    ("stage", "outcome"),
+)
+
+
+class TurnDeadline:
+    def __init__(self, total_seconds: float):
+        self.total = total_seconds
+        self.started = time.monotonic()
+        self.expires = self.started + total_seconds
+        self.degraded: list[str] = []
+
+    def remaining(self) -> float:
+        return max(0.0, self.expires - time.monotonic())
+
+    def budget(self, stage: str) -> float:
+        return min(STAGE_BUDGETS.get(stage, DEFAULT_STAGE_BUDGET), self.remaining())
+
+    def degrade(self, stage: str) -> None:
+        self.degraded.append(stage)
+        degradations_total.inc(stage=stage)
+        logger.info(
+            "Turn stage %s over budget at %.2fs, degrading",
+            stage, time.monotonic() - self.started,
+        )
+
+    async def run(self, stage: str, awaitable: Awaitable, fallback: Any = None) -> Any:
+        """Await a stage within its budget; on overrun cancel it and return fallback."""
+        started = time.perf_counter()
+        try:
+            result = await asyncio.wait_for(awaitable, self.budget(stage))
+        except asyncio.TimeoutError:
+            stage_seconds.observe(time.perf_counter() - started, stage=stage, outcome="degraded")
+            self.degrade(stage)
+            return fallback
+        stage_seconds.observe(time.perf_counter() - started, stage=stage, outcome="ok")
+        return result
+
+    async def run_sync(self, stage: str, fn: Callable, *args, fallback: Any = None) -> Any:
+        """Blocking stage (sync Supabase call) in a worker thread. On overrun
+        the thread finishes in the background and its result is dropped."""
+        return await self.run(stage, asyncio.to_thread(fn, *args), fallback)
@@ -0,0 +1,84 @@
+"""
+Event-loop lag monitor.
+
+A heartbeat task on the loop wakes every `interval` seconds and records
+how late it woke up (loop lag). A watchdog thread checks the heartbeat;
+when the loop has not ticked for longer than `threshold`, something is
+running synchronously on it (a Supabase `.execute()`, a big json.loads,
+prompt building...) and the loop thread's current stack is logged, once
+per stall, so the offending call shows up in the logs.
+"""
+
+import asyncio
+import logging
+import sys
+import threading
+import time
+import traceback
+
+from app.core.metrics import counter, histogram
+
+logger = logging.getLogger(__name__)
+
+loop_lag_seconds = histogram(
+    "event_loop_lag_seconds",
+    "How late the event-loop heartbeat woke up",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0),
+)
+loop_stalls_total = counter(
+    "event_loop_stalls_total",
+    "Times the event loop was blocked longer than the stall threshold",
+)
+
+
+class LoopLagMonitor:
+    def __init__(self, threshold: float = 0.25, interval: float = 0.05):
+        self.threshold = threshold
+        self.interval = interval
+        self._last_tick = time.monotonic()
+        self._loop_thread_id: int | None = None
+        self._heartbeat: asyncio.Task | None = None
+        self._watchdog: threading.Thread | None = None
+        self._stop = threading.Event()
+
+    def start(self) -> None:
+        """Start monitoring the running loop (call from inside it)."""
+        self._loop_thread_id = threading.get_ident()
+        self._last_tick = time.monotonic()
+        self._stop.clear()
+        self._heartbeat = asyncio.create_task(self._beat())
+        self._watchdog = threading.Thread(target=self._watch, daemon=True, name="loop-watchdog")
+        self._watchdog.start()
+
+    async def stop(self) -> None:
+        self._stop.set()
+        if self._heartbeat is not None:
+            self._heartbeat.cancel()
+            try:
+                await self._heartbeat
+            except asyncio.CancelledError:
+                pass
+
+    async def _beat(self) -> None:
+        while True:
+            expected = time.monotonic() + self.interval
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            loop_lag_seconds.observe(max(0.0, now - expected))
+            self._last_tick = now
+
+    def _watch(self) -> None:
+        stalled_since = None
+        while not self._stop.wait(self.threshold / 2):
+            last_tick = self._last_tick
+            blocked = time.monotonic() - last_tick
+            if blocked < self.threshold:
+                stalled_since = None
+                continue
+            if stalled_since == last_tick:
+                continue  # already reported this stall
+            stalled_since = last_tick
+            loop_stalls_total.inc()
+            frame = sys._current_frames().get(self._loop_thread_id)
+            stack = "".join(traceback.format_stack(frame)) if frame else "<no frame>"
+            logger.warning("Event loop blocked for %.0f ms; loop thread stack:\n%s", blocked * 1000, stack)
@@ -0,0 +1,210 @@
+"""
+In-process metrics: labeled counters, gauges and histograms, rendered in
+the Prometheus text format by GET /metrics.
+
+Metrics are registered once at import time by the module that owns them
+and are safe to update from the event loop and worker threads; an update
+is a dict lookup and an add under a lock, cheap enough to stay on in
+production. State owned elsewhere (gateway usage, limiter) is exported
+through collectors evaluated at scrape time.
+"""
+
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Iterable
+
+_registry: dict[str, "Metric"] = {}
+_registry_lock = threading.Lock()
+
+# (name, kind, help, [(labels, value), ...]) produced at scrape time
+CollectedMetric = tuple[str, str, str, list[tuple[dict, float]]]
+_collectors: list[Callable[[], Iterable[CollectedMetric]]] = []
+
+# Seconds; covers sub-10ms RPCs up to slow image generations
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+class Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, help_text: str, labels: tuple[str, ...] = ()):
+        self.name = name
+        self.help = help_text
+        self.labels = labels
+        self._values: dict[tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels: dict) -> tuple[str, ...]:
+        if set(labels) != set(self.labels):
+            raise ValueError(f"{self.name} expects labels {self.labels}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labels)
+
+    def samples(self) -> dict[tuple[str, ...], float]:
+        with self._lock:
+            return dict(self._values)
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def set(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels) -> None:
+        self.inc(-amount, **labels)
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, labels: tuple[str, ...] = (), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help_text, labels)
+        self.buckets = tuple(buckets)
+        # labels -> [per-bucket counts..., +Inf count, sum]
+        self._series: dict[tuple[str, ...], list[float]] = {}
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * (len(self.buckets) + 2)
+            series[index] += 1
+            series[-1] += value
+
+    @contextmanager
+    def time(self, **labels):
+        """Observe the duration of the block (works across awaits)."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def series(self) -> dict[tuple[str, ...], list[float]]:
+        with self._lock:
+            return {key: list(values) for key, values in self._series.items()}
+
+
+def _register(metric_cls, name: str, help_text: str, labels: tuple[str, ...], **kwargs):
+    with _registry_lock:
+        existing = _registry.get(name)
+        if existing is not None:
+            if not isinstance(existing, metric_cls) or existing.labels != labels:
+                raise ValueError(f"Metric {name} already registered differently")
+            return existing
+        metric = metric_cls(name, help_text, labels, **kwargs)
+        _registry[name] = metric
+        return metric
+
+
+def counter(name: str, help_text: str, labels: tuple[str, ...] = ()) -> Counter:
+    return _register(Counter, name, help_text, labels)
+
+
+def gauge(name: str, help_text: str, labels: tuple[str, ...] = ()) -> Gauge:
+    return _register(Gauge, name, help_text, labels)
+
+
+def histogram(
+    name: str, help_text: str, labels: tuple[str, ...] = (), buckets=DEFAULT_BUCKETS
+) -> Histogram:
+    return _register(Histogram, name, help_text, labels, buckets=buckets)
+
+
+def register_collector(collector: Callable[[], Iterable[CollectedMetric]]) -> None:
+    _collectors.append(collector)
+
+
+def registered_metrics() -> list[Metric]:
+    with _registry_lock:
+        return list(_registry.values())
+
+
+# ── Prometheus text exposition ──
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Iterable[str], values: Iterable[str], extra: str = "") -> str:
+    parts = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+
+def render_prometheus() -> str:
+    lines: list[str] = []
+    for metric in sorted(registered_metrics(), key=lambda m: m.name):
+        lines.append(f"# HELP {metric.name} {metric.help}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        if isinstance(metric, Histogram):
+            for key, series in sorted(metric.series().items()):
+                cumulative = 0
+                for bound, count in zip((*metric.buckets, float("inf")), series[:-1]):
+                    cumulative += count
+                    le = 'le="' + _format(bound) + '"'
+                    lines.append(f"{metric.name}_bucket{_labels(metric.labels, key, le)} {cumulative}")
+                lines.append(f"{metric.name}_sum{_labels(metric.labels, key)} {_format(series[-1])}")
+                lines.append(f"{metric.name}_count{_labels(metric.labels, key)} {cumulative}")
+        else:
+            for key, value in sorted(metric.samples().items()):
+                lines.append(f"{metric.name}{_labels(metric.labels, key)} {_format(value)}")
+
+    for collector in list(_collectors):
+        for name, kind, help_text, samples in collector():
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, value in samples:
+                lines.append(f"{name}{_labels(labels.keys(), labels.values())} {_format(value)}")
+    return "\n".join(lines) + "\n"
+
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def start_metrics_server(port: int) -> ThreadingHTTPServer:
+    """Serve /metrics from a daemon thread, for processes without the API
+    (the cron)."""
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            body = render_prometheus().encode()
+            self.send_response(200)
+            self.send_header("Content-Type", PROMETHEUS_CONTENT_TYPE)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("0.0.0.0", port), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True, name="metrics-server").start()
+    return server
@@ -0,0 +1,454 @@
+"""
+OpenAI gateway — the one way this service talks to OpenAI.
+
+Chat, the smart router, the store and the cron all share a single
+AsyncOpenAI client on one pooled HTTP/2 connection, so TLS sessions and
+connections are reused across call sites. Each call names its call site,
+which picks the timeout, retry budget and upstream priority and is the
+key for usage accounting.
+
+Every request passes the per-model adaptive limiter (core/rate_limiter.py)
+and feeds it the x-ratelimit-* headers and 429s it sees. The SDK's own
+retries are disabled; `_with_retry` retries connection errors, timeouts,
+429s and 5xx with exponential backoff and full jitter, honoring
+Retry-After when the server sends one.
+
+The openai SDK and LangChain are imported when the gateway is first
+built, not when this module is imported: they are the bulk of a worker's
+boot time and most processes importing this module only need its
+helpers until the first call.
+"""
+
+import asyncio
+import logging
+import random
+import threading
+import time
+from collections import defaultdict
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import TYPE_CHECKING, Any, Awaitable, Callable
+
+import httpx
+
+from app.core.config import get_settings
+from app.core.metrics import histogram, register_collector
+from app.core.rate_limiter import (
+    PRIORITY_CRON,
+    PRIORITY_INTERACTIVE,
+    PRIORITY_STORE,
+    ModelLimiter,
+    UpstreamBusyError,
+    UpstreamLimiter,
+)
+from app.core.session_recorder import RecordingTransport
+
+if TYPE_CHECKING:
+    from langchain_openai import ChatOpenAI
+
+logger = logging.getLogger(__name__)
+
+
+# ── Call-site policies ──
+@dataclass(frozen=True)
+class CallPolicy:
+    timeout: float          # seconds, whole request (stream: until first byte / between reads)
+    max_retries: int
+    priority: int = PRIORITY_INTERACTIVE
+
+
+CALL_POLICIES: dict[str, CallPolicy] = {
+    # Interactive chat: fail fast, the user is waiting
+    "chat.stream": CallPolicy(timeout=30.0, max_retries=1),
+    "chat.speculative": CallPolicy(timeout=30.0, max_retries=0),
+    "chat.hedge": CallPolicy(timeout=30.0, max_retries=0),
+    "chat.embedding": CallPolicy(timeout=10.0, max_retries=2),
+    "chat.classify": CallPolicy(timeout=8.0, max_retries=1),
+    "chat.discovery": CallPolicy(timeout=20.0, max_retries=1),
+    "router.classify": CallPolicy(timeout=5.0, max_retries=1),
+    # Store: user is polling a job, images are slow
+    "store.prompt": CallPolicy(timeout=30.0, max_retries=2, priority=PRIORITY_STORE),
+    "store.image": CallPolicy(timeout=120.0, max_retries=2, priority=PRIORITY_STORE),
+    # Cron: nobody is waiting, be patient
+    "cron.analysis": CallPolicy(timeout=60.0, max_retries=4, priority=PRIORITY_CRON),
+    "cron.summary": CallPolicy(timeout=60.0, max_retries=4, priority=PRIORITY_CRON),
+}
+DEFAULT_POLICY = CallPolicy(timeout=30.0, max_retries=2)
+
+RETRY_BASE_SECONDS = 0.5
+RETRY_MAX_SECONDS = 8.0
+
+request_seconds = histogram(
+    "openai_request_seconds",
+    "OpenAI request latency until the response (or first stream byte), by call site",
+    ("site",),
+)
+
+
+@lru_cache()
+def retryable_errors() -> tuple[type[Exception], ...]:
+    import openai
+
+    return (
+        openai.APIConnectionError,   # includes APITimeoutError
+        openai.RateLimitError,
+        openai.InternalServerError,
+    )
+
+
+# ── Usage accounting ──
+@dataclass
+class SiteUsage:
+    calls: int = 0
+    errors: int = 0
+    retries: int = 0
+    shed: int = 0
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    images: int = 0
+    latency_seconds: float = 0.0
+
+
+@dataclass
+class UsageLedger:
+    sites: dict[str, SiteUsage] = field(default_factory=lambda: defaultdict(SiteUsage))
+    _lock: threading.Lock = field(default_factory=threading.Lock)
+
+    def record(self, site: str, **deltas) -> None:
+        with self._lock:
+            usage = self.sites[site]
+            for name, delta in deltas.items():
+                setattr(usage, name, getattr(usage, name) + delta)
+
+    def record_tokens(self, site: str, usage) -> None:
+        if usage is None:
+            return
+        self.record(
+            site,
+            prompt_tokens=getattr(usage, "prompt_tokens", 0) or 0,
+            completion_tokens=getattr(usage, "completion_tokens", 0) or 0,
+        )
+
+    def snapshot(self) -> dict[str, dict]:
+        with self._lock:
+            return {site: vars(usage).copy() for site, usage in self.sites.items()}
+
+
+def approx_tokens(text: str) -> int:
+    # ~3 characters per token across Korean/English
+    return len(text) // 3
+
+
+def estimate_tokens(kwargs: dict) -> int:
+    """Rough token cost of a request for the limiter's token budget."""
+    text = kwargs.get("input") or ""
+    if isinstance(text, list):
+        text = " ".join(map(str, text))
+    for message in kwargs.get("messages") or []:
+        content = message.get("content")
+        text += content if isinstance(content, str) else ""
+    # Prompt plus the completion budget
+    return approx_tokens(text) + (kwargs.get("max_tokens") or 0)
+
+
+def _retry_after(error: Exception) -> float | None:
+    response = getattr(error, "response", None)
+    retry_after = response.headers.get("retry-after") if response is not None else None
+    try:
+        return float(retry_after) if retry_after else None
+    except ValueError:
+        return None
+
+
+def _retry_delay(attempt: int, error: Exception) -> float:
+    retry_after = _retry_after(error)
+    if retry_after is not None:
+        return min(retry_after, RETRY_MAX_SECONDS)
+    return random.uniform(0, min(RETRY_MAX_SECONDS, RETRY_BASE_SECONDS * 2 ** attempt))
+
+
+def _feedback(limiter: ModelLimiter, error: Exception) -> None:
+    import openai
+
+    if isinstance(error, openai.RateLimitError):
+        limiter.observe_headers(error.response.headers)
+        limiter.on_rate_limited(_retry_after(error))
+
+
+class ChatStream:
+    """An open streaming completion holding its model's limiter slot.
+
+    Iterating yields the chunks that carry choices and records usage from
+    the final one. The slot is released and the response closed when the
+    stream ends, fails or is aclose()d, whether or not iteration started,
+    so a stream that is opened and dropped can't leak the slot.
+    """
+
+    def __init__(self, usage: UsageLedger, site: str, stream, limiter: ModelLimiter):
+        self._usage = usage
+        self._site = site
+        self._stream = stream
+        self._limiter = limiter
+        self._closed = False
+
+    def __aiter__(self) -> "ChatStream":
+        return self
+
+    async def __anext__(self):
+        if self._closed:
+            raise StopAsyncIteration
+        try:
+            while True:
+                chunk = await self._stream.__anext__()
+                if chunk.usage is not None:
+                    self._usage.record_tokens(self._site, chunk.usage)
+                if chunk.choices:
+                    return chunk
+        except BaseException:
+            # End of stream included
+            await self.aclose()
+            raise
+
+    async def aclose(self) -> None:
+        if self._closed:
+            return
+        self._closed = True
+        self._limiter.release()
+        await self._stream.close()
+
+
+class OpenAIGateway:
+    def __init__(
+        self,
+        api_key: str,
+        base_url: str | None = None,
+        max_connections: int = 100,
+        max_keepalive: int = 20,
+        initial_concurrency: int = 8,
+        max_concurrency: int = 64,
+        record_sessions: bool = False,
+    ):
+        from openai import AsyncOpenAI
+
+        self.api_key = api_key
+        self.base_url = base_url
+        transport: httpx.AsyncBaseTransport = httpx.AsyncHTTPTransport(
+            http2=True,
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_keepalive,
+                keepalive_expiry=60.0,
+            ),
+        )
+        if record_sessions:
+            transport = RecordingTransport(transport)
+        self.http_client = httpx.AsyncClient(
+            transport=transport,
+            timeout=httpx.Timeout(DEFAULT_POLICY.timeout, connect=5.0),
+        )
+        self.client = AsyncOpenAI(
+            api_key=api_key,
+            base_url=base_url,
+            http_client=self.http_client,
+            max_retries=0,
+        )
+        self.usage = UsageLedger()
+        self.limiter = UpstreamLimiter(initial_concurrency, max_concurrency)
+
+    @staticmethod
+    def policy(site: str) -> CallPolicy:
+        return CALL_POLICIES.get(site, DEFAULT_POLICY)
+
+    async def _with_retry(
+        self, site: str, kwargs: dict, call: Callable[[float], Awaitable[Any]], hold: bool = False
+    ) -> Any:
+        """Send through the model's limiter, retrying transient failures.
+
+        `call(timeout)` returns a raw SDK response. With hold=True the
+        limiter slot stays taken and is returned for the caller to release
+        (streams); otherwise it is released as soon as the response arrives.
+        """
+        policy = self.policy(site)
+        limiter = self.limiter.for_model(kwargs.get("model", ""))
+        tokens = estimate_tokens(kwargs)
+        started = time.perf_counter()
+        attempt = 0
+        while True:
+            try:
+                await limiter.acquire(policy.priority, tokens)
+            except UpstreamBusyError:
+                self.usage.record(site, calls=1, errors=1, shed=1)
+                raise
+            try:
+                raw = await call(policy.timeout)
+            except retryable_errors() as e:
+                limiter.release()
+                _feedback(limiter, e)
+                if attempt >= policy.max_retries:
+                    self.usage.record(site, calls=1, errors=1)
+                    raise
+                delay = _retry_delay(attempt, e)
+                logger.info("OpenAI %s failed (%s), retry %d in %.2fs", site, type(e).__name__, attempt + 1, delay)
+                self.usage.record(site, retries=1)
+                attempt += 1
+                await asyncio.sleep(delay)
+                continue
+            except asyncio.CancelledError:
+                # Abandoned by the caller (a losing hedge, a discarded
+                # speculation), not an upstream failure
+                limiter.release()
+                self.usage.record(site, calls=1)
+                raise
+            except BaseException:
+                limiter.release()
+                self.usage.record(site, calls=1, errors=1)
+                raise
+
+            limiter.observe_headers(raw.headers)
+            limiter.on_success()
+            if not hold:
+                limiter.release()
+            elapsed = time.perf_counter() - started
+            self.usage.record(site, calls=1, latency_seconds=elapsed)
+            request_seconds.observe(elapsed, site=site)
+            result = raw.parse()
+            return (result, limiter) if hold else result
+
+    @asynccontextmanager
+    async def slot(self, site: str, model: str, tokens: int = 0):
+        """Limiter admission for calls made outside the gateway's SDK client
+        (LangChain), so they queue and back off with everything else."""
+        policy = self.policy(site)
+        limiter = self.limiter.for_model(model)
+        try:
+            await limiter.acquire(policy.priority, tokens)
+        except UpstreamBusyError:
+            self.usage.record(site, calls=1, errors=1, shed=1)
+            raise
+        started = time.perf_counter()
+        try:
+            yield
+            limiter.on_success()
+            self.usage.record(site, calls=1)
+            request_seconds.observe(time.perf_counter() - started, site=site)
+        except retryable_errors() as e:
+            _feedback(limiter, e)
+            self.usage.record(site, calls=1, errors=1)
+            raise
+        finally:
+            limiter.release()
+
+    # ── Call types ──
+    async def chat(self, site: str, **kwargs):
+        """Non-streaming chat completion."""
+        response = await self._with_retry(
+            site, kwargs,
+            lambda timeout: self.client.chat.completions.with_raw_response.create(timeout=timeout, **kwargs),
+        )
+        self.usage.record_tokens(site, response.usage)
+        return response
+
+    async def chat_stream(self, site: str, **kwargs) -> ChatStream:
+        """Streaming chat completion. Only opening the stream is retried.
+        The limiter slot is held until the returned stream ends or is
+        aclose()d; callers that may stop early must aclose() it."""
+        stream, limiter = await self._with_retry(
+            site, kwargs,
+            lambda timeout: self.client.chat.completions.with_raw_response.create(
+                timeout=timeout,
+                stream=True,
+                stream_options={"include_usage": True},
+                **kwargs,
+            ),
+            hold=True,
+        )
+        return ChatStream(self.usage, site, stream, limiter)
+
+    async def embed(self, site: str, **kwargs):
+        response = await self._with_retry(
+            site, kwargs,
+            lambda timeout: self.client.embeddings.with_raw_response.create(timeout=timeout, **kwargs),
+        )
+        self.usage.record_tokens(site, response.usage)
+        return response
+
+    async def image(self, site: str, **kwargs):
+        response = await self._with_retry(
+            site, kwargs,
+            lambda timeout: self.client.images.with_raw_response.generate(timeout=timeout, **kwargs),
+        )
+        self.usage.record(site, images=len(response.data or []))
+        return response
+
+    async def aclose(self) -> None:
+        """Close the pooled connections (worker shutdown)."""
+        await self.http_client.aclose()
+
+    def langchain_chat(self, site: str, **kwargs) -> "ChatOpenAI":
+        """A LangChain chat model on the shared connection pool and site policy."""
+        from langchain_openai import ChatOpenAI
+
+        policy = self.policy(site)
+        return ChatOpenAI(
+            api_key=self.api_key,
+            base_url=self.base_url,
+            http_async_client=self.http_client,
+            timeout=policy.timeout,
+            max_retries=policy.max_retries,
+            **kwargs,
+        )
+
+
+@lru_cache()
+def get_openai_gateway() -> OpenAIGateway:
+    settings = get_settings()
+    return OpenAIGateway(
+        api_key=settings.OPENAI_API_KEY,
+        base_url=settings.OPENAI_BASE_URL,
+        max_connections=settings.OPENAI_MAX_CONNECTIONS,
+        max_keepalive=settings.OPENAI_MAX_KEEPALIVE,
+        initial_concurrency=settings.OPENAI_INITIAL_CONCURRENCY,
+        max_concurrency=settings.OPENAI_MAX_CONCURRENCY,
+        record_sessions=bool(settings.SESSION_RECORD_DIR),
+    )
+
+
+# ── /metrics export ──
+_USAGE_COUNTERS = {
+    "calls": ("openai_calls_total", "OpenAI calls by call site"),
+    "errors": ("openai_errors_total", "Failed OpenAI calls by call site"),
+    "retries": ("openai_retries_total", "OpenAI retries by call site"),
+    "shed": ("openai_shed_total", "OpenAI calls shed by the limiter, by call site"),
+    "images": ("openai_images_total", "Images generated by call site"),
+}
+_LIMITER_GAUGES = ("limit", "in_flight", "queued", "remaining_requests", "remaining_tokens")
+
+
+def _collect_gateway():
+    # Only export once a gateway exists; scraping must not create one
+    if get_openai_gateway.cache_info().currsize == 0:
+        return
+    gateway = get_openai_gateway()
+    usage = gateway.usage.snapshot()
+    for key, (name, help_text) in _USAGE_COUNTERS.items():
+        yield name, "counter", help_text, [
+            ({"site": site}, values[key]) for site, values in usage.items()
+        ]
+    tokens = []
+    for site, values in usage.items():
+        tokens.append(({"site": site, "direction": "in"}, values["prompt_tokens"]))
+        tokens.append(({"site": site, "direction": "out"}, values["completion_tokens"]))
+    yield "openai_tokens_total", "counter", "OpenAI tokens by call site and direction", tokens
+
+    limiters = gateway.limiter.snapshot()
+    for key in _LIMITER_GAUGES:
+        samples = [
+            ({"model": model}, values[key])
+            for model, values in limiters.items()
+            if values[key] is not None
+        ]
+        yield f"openai_limiter_{key}", "gauge", f"Upstream limiter {key} by model", samples
+
+
+register_collector(_collect_gateway)
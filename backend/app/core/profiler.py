@@ -0,0 +1,91 @@
+"""
+On-demand sampling profiler for a live worker.
+
+Samples the Python stacks of the worker's threads at a fixed rate for a
+bounded time and aggregates them in the collapsed ("folded") format —
+one `frame;frame;frame count` line per distinct stack — which
+flamegraph.pl, speedscope and inferno read directly. Sampling runs in its
+own thread and only reads frames, so the worker keeps serving while it
+is profiled. One profile at a time per process.
+"""
+
+import os
+import sys
+import threading
+import time
+from collections import Counter
+
+MAX_PROFILE_SECONDS = 60.0
+MAX_SAMPLE_HZ = 1000
+
+
+class ProfilerBusyError(Exception):
+    """Raised when a profile is already being captured in this process."""
+
+
+_profile_lock = threading.Lock()
+
+
+# backend/ and stdlib paths are shown relative to their roots
+_BACKEND_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))) + os.sep
+_STDLIB_ROOT = os.path.dirname(os.__file__) + os.sep
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    filename = code.co_filename
+    # Trim install prefixes to keep the graph readable
+    if "site-packages" + os.sep in filename:
+        filename = filename.split("site-packages" + os.sep, 1)[1]
+    elif filename.startswith(_BACKEND_ROOT):
+        filename = filename[len(_BACKEND_ROOT):]
+    elif filename.startswith(_STDLIB_ROOT):
+        filename = filename[len(_STDLIB_ROOT):]
+    return f"{code.co_name} ({filename}:{code.co_firstlineno})"
+
+
+def _collapse(frame) -> str:
+    labels = []
+    while frame is not None:
+        labels.append(_frame_label(frame))
+        frame = frame.f_back
+    return ";".join(reversed(labels))
+
+
+def sample_stacks(
+    seconds: float,
+    hz: int = 100,
+    thread_ids: set[int] | None = None,
+) -> tuple[Counter, int]:
+    """Sample stacks for `seconds` at `hz`. Returns (stack counts, samples taken).
+
+    Only threads in `thread_ids` are sampled (all other threads if None);
+    the sampler's own thread is always skipped.
+    """
+    if not _profile_lock.acquire(blocking=False):
+        raise ProfilerBusyError("A profile is already running")
+    try:
+        seconds = min(max(seconds, 0.1), MAX_PROFILE_SECONDS)
+        period = 1.0 / min(max(hz, 1), MAX_SAMPLE_HZ)
+        own = threading.get_ident()
+        names = {t.ident: t.name for t in threading.enumerate()}
+        stacks: Counter = Counter()
+        samples = 0
+        deadline = time.monotonic() + seconds
+        next_sample = time.monotonic()
+        while next_sample < deadline:
+            for ident, frame in sys._current_frames().items():
+                if ident == own or (thread_ids is not None and ident not in thread_ids):
+                    continue
+                thread = names.get(ident, str(ident))
+                stacks[f"{thread};{_collapse(frame)}"] += 1
+            samples += 1
+            next_sample += period
+            time.sleep(max(0.0, next_sample - time.monotonic()))
+        return stacks, samples
+    finally:
+        _profile_lock.release()
+
+
+def render_collapsed(stacks: Counter) -> str:
+    return "".join(f"{stack} {count}\n" for stack, count in stacks.most_common())
@@ -0,0 +1,242 @@
+"""
+Adaptive upstream limiter for OpenAI, one per model.
+
+Concurrency follows AIMD: each success raises the in-flight limit by
+~1 per window of requests, a 429 halves it. On top of that the limiter
+tracks the account's remaining request/token budget from the
+x-ratelimit-* response headers and pauses admission until the reported
+reset when the budget runs out.
+
+Traffic is prioritized: interactive chat first, then store work, then the
+cron. Lower priorities may only use part of the current limit and of the
+remaining token budget, wait behind higher priorities, and are shed
+(UpstreamBusyError) after their wait budget — so bursts hit the cron and
+store before they hit a user mid-conversation.
+"""
+
+import asyncio
+import heapq
+import itertools
+import re
+import time
+from dataclasses import dataclass, field
+
+PRIORITY_INTERACTIVE = 0
+PRIORITY_STORE = 1
+PRIORITY_CRON = 2
+
+
+@dataclass(frozen=True)
+class PriorityClass:
+    share: float          # fraction of the concurrency limit / token budget usable
+    max_wait: float       # seconds queued before the request is shed
+
+
+PRIORITY_CLASSES = {
+    PRIORITY_INTERACTIVE: PriorityClass(share=1.0, max_wait=10.0),
+    PRIORITY_STORE: PriorityClass(share=0.7, max_wait=60.0),
+    PRIORITY_CRON: PriorityClass(share=0.5, max_wait=300.0),
+}
+
+
+class UpstreamBusyError(Exception):
+    """Request was shed by the limiter instead of being sent upstream."""
+
+
+_DURATION_PART = re.compile(r"(\d+(?:\.\d+)?)(ms|s|m|h)")
+_DURATION_UNITS = {"ms": 0.001, "s": 1.0, "m": 60.0, "h": 3600.0}
+
+
+def parse_reset(value: str | None) -> float | None:
+    """Parse OpenAI reset durations like '20ms', '1s', '6m0s' into seconds."""
+    if not value:
+        return None
+    parts = _DURATION_PART.findall(value)
+    if not parts:
+        return None
+    return sum(float(amount) * _DURATION_UNITS[unit] for amount, unit in parts)
+
+
+def _int_header(headers, name: str) -> int | None:
+    value = headers.get(name)
+    try:
+        return int(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+@dataclass(order=True)
+class _Waiter:
+    priority: int
+    seq: int
+    tokens: int = field(compare=False)
+    future: asyncio.Future = field(compare=False)
+
+
+class ModelLimiter:
+    def __init__(self, initial_limit: float = 8, min_limit: float = 1, max_limit: float = 64):
+        self.limit = float(initial_limit)
+        self.min_limit = float(min_limit)
+        self.max_limit = float(max_limit)
+        self.in_flight = 0
+        # From x-ratelimit-* headers; None until the first response
+        self.remaining_requests: int | None = None
+        self.remaining_tokens: int | None = None
+        self.limit_tokens: int | None = None
+        self.requests_reset_at = 0.0
+        self.tokens_reset_at = 0.0
+        self.blocked_until = 0.0
+        self.shed = 0
+        self.rate_limited = 0
+        self._waiters: list[_Waiter] = []
+        self._seq = itertools.count()
+        self._wake_handle: asyncio.TimerHandle | None = None
+
+    # ── Admission ──
+    def _budget_wait(self, priority: int, tokens: int, now: float) -> float:
+        """Seconds until this request fits the header-reported budget (0 = now)."""
+        if now < self.blocked_until:
+            return self.blocked_until - now
+        share = PRIORITY_CLASSES[priority].share
+        if self.remaining_requests is not None and now < self.requests_reset_at:
+            if self.remaining_requests <= 0:
+                return self.requests_reset_at - now
+        if self.remaining_tokens is not None and now < self.tokens_reset_at:
+            # Lower priorities leave the rest of the budget to interactive traffic
+            reserve = (1 - share) * (self.limit_tokens or self.remaining_tokens)
+            if self.remaining_tokens - reserve < tokens:
+                return self.tokens_reset_at - now
+        return 0.0
+
+    def _fits(self, priority: int, tokens: int, now: float) -> bool:
+        if self.in_flight >= max(1.0, self.limit * PRIORITY_CLASSES[priority].share):
+            return False
+        return self._budget_wait(priority, tokens, now) == 0.0
+
+    def _admit(self, tokens: int) -> None:
+        self.in_flight += 1
+        if self.remaining_requests is not None:
+            self.remaining_requests -= 1
+        if self.remaining_tokens is not None:
+            self.remaining_tokens -= tokens
+
+    async def acquire(self, priority: int, tokens: int) -> None:
+        now = time.monotonic()
+        # Strict priority: only skip the queue if nobody of equal/higher priority waits
+        if not any(w.priority <= priority for w in self._waiters) and self._fits(priority, tokens, now):
+            self._admit(tokens)
+            return
+
+        loop = asyncio.get_running_loop()
+        waiter = _Waiter(priority, next(self._seq), tokens, loop.create_future())
+        heapq.heappush(self._waiters, waiter)
+        self._schedule_wake()
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter.future), PRIORITY_CLASSES[priority].max_wait)
+        except asyncio.TimeoutError:
+            if waiter.future.done() and not waiter.future.cancelled():
+                return      # admitted just as the wait expired
+            self._remove(waiter)
+            self.shed += 1
+            raise UpstreamBusyError(f"upstream busy (priority {priority})")
+        except asyncio.CancelledError:
+            if waiter.future.done() and not waiter.future.cancelled():
+                self.release()
+            else:
+                self._remove(waiter)
+            raise
+
+    def _remove(self, waiter: _Waiter) -> None:
+        if not waiter.future.done():
+            waiter.future.cancel()
+        if waiter in self._waiters:
+            self._waiters.remove(waiter)
+            heapq.heapify(self._waiters)
+        self._wake()
+
+    def release(self) -> None:
+        self.in_flight = max(0, self.in_flight - 1)
+        self._wake()
+
+    def _wake(self) -> None:
+        """Admit queued requests in priority order while they fit."""
+        now = time.monotonic()
+        while self._waiters:
+            head = self._waiters[0]
+            if head.future.done():
+                heapq.heappop(self._waiters)
+                continue
+            if not self._fits(head.priority, head.tokens, now):
+                break
+            heapq.heappop(self._waiters)
+            self._admit(head.tokens)
+            head.future.set_result(None)
+        self._schedule_wake()
+
+    def _schedule_wake(self) -> None:
+        """If the head is waiting on a budget reset (not a slot), wake at the reset."""
+        if self._wake_handle is not None:
+            self._wake_handle.cancel()
+            self._wake_handle = None
+        if not self._waiters:
+            return
+        head = self._waiters[0]
+        delay = self._budget_wait(head.priority, head.tokens, time.monotonic())
+        if delay > 0:
+            self._wake_handle = asyncio.get_running_loop().call_later(delay, self._wake)
+
+    # ── Feedback ──
+    def observe_headers(self, headers) -> None:
+        now = time.monotonic()
+        remaining_requests = _int_header(headers, "x-ratelimit-remaining-requests")
+        remaining_tokens = _int_header(headers, "x-ratelimit-remaining-tokens")
+        limit_tokens = _int_header(headers, "x-ratelimit-limit-tokens")
+        if remaining_requests is not None:
+            self.remaining_requests = remaining_requests
+            self.requests_reset_at = now + (parse_reset(headers.get("x-ratelimit-reset-requests")) or 1.0)
+        if remaining_tokens is not None:
+            self.remaining_tokens = remaining_tokens
+            self.tokens_reset_at = now + (parse_reset(headers.get("x-ratelimit-reset-tokens")) or 1.0)
+        if limit_tokens is not None:
+            self.limit_tokens = limit_tokens
+
+    def on_success(self) -> None:
+        # Additive increase: ~+1 after a full window of successful requests
+        self.limit = min(self.max_limit, self.limit + 1.0 / self.limit)
+        self._wake()
+
+    def on_rate_limited(self, retry_after: float | None = None) -> None:
+        # Multiplicative decrease, and hold everyone until the server's retry-after
+        self.rate_limited += 1
+        self.limit = max(self.min_limit, self.limit / 2)
+        if retry_after:
+            self.blocked_until = max(self.blocked_until, time.monotonic() + retry_after)
+        self._schedule_wake()
+
+    def snapshot(self) -> dict:
+        return {
+            "limit": round(self.limit, 2),
+            "in_flight": self.in_flight,
+            "queued": len(self._waiters),
+            "remaining_requests": self.remaining_requests,
+            "remaining_tokens": self.remaining_tokens,
+            "shed": self.shed,
+            "rate_limited": self.rate_limited,
+        }
+
+
+class UpstreamLimiter:
+    """Per-model limiters, created on first use."""
+
+    def __init__(self, initial_limit: float = 8, max_limit: float = 64):
+        self.initial_limit = initial_limit
+        self.max_limit = max_limit
+        self.models: dict[str, ModelLimiter] = {}
+
+    def for_model(self, model: str) -> ModelLimiter:
+        if model not in self.models:
+            self.models[model] = ModelLimiter(self.initial_limit, max_limit=self.max_limit)
+        return self.models[model]
+
+    def snapshot(self) -> dict[str, dict]:
+        return {model: limiter.snapshot() for model, limiter in self.models.items()}
@@ -3,18 +3,27 @@ Smart Router — Intent-based model & retrieval switching.
 
 Classifies user messages into 4 categories and returns
 the optimal (model, k) pair for each.
+
+Two classifier backends, picked by ROUTER_BACKEND:
+  * "langchain": prompt | ChatOpenAI | JsonOutputParser, with the parser's
+    format instructions in the prompt.
+  * "native": a single gateway chat call in structured-output mode. The
+    intent is a JSON-schema enum, so the prompt only needs the intent
+    definitions, and an out-of-enum reply is treated as a failure.
 """
 
 from __future__ import annotations
 
+import json
 import logging
 from dataclasses import dataclass
 
-from langchain_openai import ChatOpenAI
-from langchain_core.prompts import ChatPromptTemplate
-from langchain_core.output_parsers import JsonOutputParser
 from pydantic import BaseModel, Field
 
+from app.core.config import get_settings
+from app.core.deadline import fallbacks_total
+from app.core.openai_gateway import get_openai_gateway
+
 logger = logging.getLogger(__name__)
 
 # ── Intent → Config mapping ─────────────────────────────────
@@ -28,7 +37,8 @@ INTENT_CONFIG: dict[str, dict] = {
 DEFAULT_INTENT = "casual_chat"
 
 # ── Router LLM (cheapest & fastest) ─────────────────────────
-ROUTER_LLM = ChatOpenAI(model="gpt-4o-mini", temperature=0, max_tokens=50)
+# Built on first use, on the shared OpenAI gateway connection pool
+ROUTER_MODEL = "gpt-4o-mini"
 
 
 # ── Schemas ──────────────────────────────────────────────────
@@ -48,10 +58,7 @@ class RouterResult:
 
 
 # ── Classification prompt ────────────────────────────────────
-_parser = JsonOutputParser(pydantic_object=_RouteSchema)
-
-_prompt = ChatPromptTemplate.from_template(
-    """Classify the user message into exactly one intent.
+_PROMPT_TEMPLATE = """Classify the user message into exactly one intent.
 
 [Intent definitions]
 - deep_emotional : 감정적 깊이가 필요한 대화 (고민, 위로, 진지한 감정 표현, 힘든 이야기)
@@ -63,25 +70,120 @@ _prompt = ChatPromptTemplate.from_template(
 {input}
 
 {format_instructions}"""
-)
 
-_chain = _prompt | ROUTER_LLM | _parser
+_chain = None
+
+
+def langchain_prompt():
+    """The LangChain backend's prompt, format instructions filled in."""
+    from langchain_core.output_parsers import JsonOutputParser
+    from langchain_core.prompts import ChatPromptTemplate
+
+    parser = JsonOutputParser(pydantic_object=_RouteSchema)
+    prompt = ChatPromptTemplate.from_template(_PROMPT_TEMPLATE).partial(
+        format_instructions=parser.get_format_instructions()
+    )
+    return prompt, parser
+
+
+def _get_chain():
+    """prompt | router LLM | JSON parser, built on first use so LangChain
+    is imported by the first classification rather than at boot."""
+    global _chain
+    if _chain is None:
+        prompt, parser = langchain_prompt()
+        router_llm = get_openai_gateway().langchain_chat(
+            "router.classify", model=ROUTER_MODEL, temperature=0, max_tokens=50
+        )
+        _chain = prompt | router_llm | parser
+    return _chain
+
+
+# ── Native structured-output backend ─────────────────────────
+_NATIVE_SYSTEM_PROMPT = """Classify the user's message to a companion chatbot.
+deep_emotional: 고민, 위로, 진지한 감정 표현, 힘든 이야기
+casual_chat: 인사, 잡담, 짧은 리액션
+memory_recall: 과거 대화 참조 ("지난번에", "전에 말했던", "그때", "기억나?")
+simple_question: 단순 질문, 사실 확인
+reason: a few words."""
+
+NATIVE_RESPONSE_FORMAT = {
+    "type": "json_schema",
+    "json_schema": {
+        "name": "route",
+        "strict": True,
+        "schema": {
+            "type": "object",
+            "properties": {
+                "intent": {"type": "string", "enum": list(INTENT_CONFIG)},
+                "reason": {"type": "string"},
+            },
+            "required": ["intent", "reason"],
+            "additionalProperties": False,
+        },
+    },
+}
+
+
+def native_messages(message: str) -> list[dict]:
+    return [
+        {"role": "system", "content": _NATIVE_SYSTEM_PROMPT},
+        {"role": "user", "content": message},
+    ]
+
+
+async def _classify_native(message: str) -> dict:
+    response = await get_openai_gateway().chat(
+        "router.classify",
+        model=ROUTER_MODEL,
+        messages=native_messages(message),
+        max_tokens=40,
+        temperature=0,
+        response_format=NATIVE_RESPONSE_FORMAT,
+    )
+    result = json.loads(response.choices[0].message.content)
+    if result.get("intent") not in INTENT_CONFIG:
+        raise ValueError(f"Router returned unknown intent {result.get('intent')!r}")
+    return result
+
+
+async def _classify_langchain(message: str) -> dict:
+    async with get_openai_gateway().slot("router.classify", ROUTER_MODEL, len(message) // 3 + 50):
+        return await _get_chain().ainvoke({"input": message})
+
+
+ROUTER_BACKENDS = {
+    "langchain": _classify_langchain,
+    "native": _classify_native,
+}
 
 
 # ── Public API ───────────────────────────────────────────────
+def default_route(reason: str) -> RouterResult:
+    """Routing decision for DEFAULT_INTENT, used when classification is unavailable."""
+    cfg = INTENT_CONFIG[DEFAULT_INTENT]
+    return RouterResult(intent=DEFAULT_INTENT, model=cfg["model"], k=cfg["k"], reason=reason)
+
+
+def _router_backend():
+    backend = get_settings().ROUTER_BACKEND
+    if backend not in ROUTER_BACKENDS:
+        raise ValueError(f"Unknown ROUTER_BACKEND: {backend}")
+    return ROUTER_BACKENDS[backend]
+
+
 async def classify_intent(message: str) -> RouterResult:
     """Classify a user message and return the routing decision."""
+    classify = _router_backend()
     try:
-        result = await _chain.ainvoke({
-            "input": message,
-            "format_instructions": _parser.get_format_instructions(),
-        })
+        result = await classify(message)
         intent = result.get("intent", DEFAULT_INTENT)
         if intent not in INTENT_CONFIG:
             intent = DEFAULT_INTENT
         reason = result.get("reason", "")
     except Exception as e:
         logger.warning("Router classification failed, falling back to %s: %s", DEFAULT_INTENT, e)
+        fallbacks_total.inc(kind="router_error")
         intent = DEFAULT_INTENT
         reason = "fallback due to error"
 
@@ -0,0 +1,313 @@
+"""
+Opt-in recorder for chat WebSocket sessions (replay fixtures).
+
+With SESSION_RECORD_DIR set, every chat WebSocket is recorded to one JSON
+file on disconnect: the companion state it started from, every frame in
+both directions, and every upstream OpenAI response the session caused
+(matched to the session through a context variable, so concurrent
+sessions don't mix). bench/replay.py replays these files against the
+pipeline with the upstream mocked from the recording.
+
+Recordings are sanitized: companion/user IDs are never written, emails,
+phone numbers, URLs and key-like tokens are masked, upstream request
+bodies (prompts) are reduced to a matching key, and embeddings are stored
+as their dimension only. Free text is otherwise kept — review a
+recording before committing it as a fixture.
+"""
+
+import asyncio
+import contextvars
+import hashlib
+import json
+import logging
+import os
+import re
+import time
+import uuid
+from datetime import date, datetime, timezone
+
+import httpx
+
+from app.core.config import get_settings
+from app.core.session_state import get_session_store
+from app.core.supabase import get_supabase_client
+
+logger = logging.getLogger(__name__)
+
+FIXTURE_VERSION = 1
+# Most recent messages captured as the session's starting history
+SEED_HISTORY_MESSAGES = 20
+
+_current: contextvars.ContextVar["SessionRecording | None"] = contextvars.ContextVar(
+    "session_recording", default=None
+)
+
+
+# ── Sanitization ──
+_REDACTIONS = [
+    (re.compile(r"https?://\S+"), "<url>"),
+    (re.compile(r"[\w.+-]+@[\w-]+\.[\w.-]+"), "<email>"),
+    (re.compile(r"\b(?:sk|pk|rk)-[A-Za-z0-9_-]{10,}"), "<secret>"),
+    (re.compile(r"\+?\d[\d -]{7,}\d"), "<phone>"),
+]
+
+
+def sanitize_text(text: str) -> str:
+    for pattern, replacement in _REDACTIONS:
+        text = pattern.sub(replacement, text)
+    return text
+
+
+def _sanitize(value):
+    if isinstance(value, str):
+        return sanitize_text(value)
+    if isinstance(value, list):
+        return [_sanitize(v) for v in value]
+    if isinstance(value, dict):
+        return {k: _sanitize(v) for k, v in value.items()}
+    return value
+
+
+def upstream_key(path: str, body: dict) -> str:
+    """Content-free key for matching a replayed upstream request to a
+    recorded one: endpoint, model, stream flag, max_tokens and a short hash
+    of the first message's opening (the prompt template)."""
+    messages = body.get("messages") or []
+    opening = str(messages[0].get("content", ""))[:32] if messages else ""
+    digest = hashlib.sha1(opening.encode()).hexdigest()[:8]
+    return "|".join([
+        path.rsplit("/v1", 1)[-1],
+        str(body.get("model", "")),
+        "stream" if body.get("stream") else "once",
+        str(body.get("max_tokens", "")),
+        digest,
+    ])
+
+
+# ── Recording ──
+class SessionRecording:
+    def __init__(self, directory: str, seed: dict):
+        self.directory = directory
+        self.seed = seed
+        self.started = time.monotonic()
+        self.frames: list[dict] = []
+        self.upstream: list[dict] = []
+
+    def _offset(self) -> float:
+        return round(time.monotonic() - self.started, 4)
+
+    def client_frame(self, text: str) -> None:
+        try:
+            data = json.loads(text)
+        except json.JSONDecodeError:
+            data = text
+        self.frames.append({"t": self._offset(), "dir": "client", "data": _sanitize(data)})
+
+    def server_frame(self, data: dict) -> None:
+        self.frames.append({"t": self._offset(), "dir": "server", "data": _sanitize(data)})
+
+    def upstream_call(self, entry: dict) -> dict:
+        """Add an upstream call in request order; the caller fills in the
+        response fields once the body has been read."""
+        entry["t"] = self._offset()
+        self.upstream.append(entry)
+        return entry
+
+    def to_fixture(self) -> dict:
+        return {
+            "version": FIXTURE_VERSION,
+            "recorded_at": datetime.now(timezone.utc).isoformat(),
+            "seed": self.seed,
+            "frames": self.frames,
+            "upstream": self.upstream,
+        }
+
+    def _write(self) -> str:
+        os.makedirs(self.directory, exist_ok=True)
+        name = f"{datetime.now(timezone.utc):%Y%m%dT%H%M%S}-{uuid.uuid4().hex[:8]}.json"
+        path = os.path.join(self.directory, name)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.to_fixture(), f, ensure_ascii=False, indent=1)
+        return path
+
+    async def finish(self) -> None:
+        try:
+            path = await asyncio.to_thread(self._write)
+            logger.info("Recorded chat session to %s", path)
+        except Exception as e:
+            logger.warning("Failed to write session recording: %s", e)
+
+
+def _load_seed(companion_id: str, companion: dict, tier: str | None) -> dict:
+    """Sanitized starting state of a session, enough to rebuild it in the
+    in-memory Supabase stand-in."""
+    sb = get_supabase_client()
+    ai_turns = (
+        sb.table("Chat_Logs").select("log_id", count="exact")
+        .eq("companion_id", companion_id).eq("sender", "AI").execute()
+    ).count or 0
+    history = (
+        sb.table("Chat_Logs").select("sender, message")
+        .eq("companion_id", companion_id)
+        .order("timestamp", desc=True).limit(SEED_HISTORY_MESSAGES).execute()
+    ).data or []
+    history.reverse()
+    emotions = (
+        sb.table("Daily_Emotions").select("date, primary_emotion, color_hex, summary_text")
+        .eq("companion_id", companion_id)
+        .order("date", desc=True).limit(3).execute()
+    ).data or []
+    today = date.today()
+    return _sanitize({
+        "tier": tier or "FREE",
+        "companion": {
+            key: companion.get(key)
+            for key in ("name", "relationship_type", "tone_style", "summary", "active_traits", "timezone")
+        },
+        "ai_turns": ai_turns,
+        "history": history,
+        "emotions": [
+            {**{k: v for k, v in row.items() if k != "date"},
+             "days_ago": (today - date.fromisoformat(str(row["date"])[:10])).days}
+            for row in emotions
+        ],
+        "naming_state": get_session_store().get("naming", companion_id),
+    })
+
+
+async def start_recording(websocket, companion_id: str, companion: dict, tier: str | None):
+    """Start recording this WebSocket if SESSION_RECORD_DIR is set. Wraps
+    the socket's send/receive and makes the recording current for every
+    task the session starts. Returns the recording (or None)."""
+    directory = get_settings().SESSION_RECORD_DIR
+    if not directory:
+        return None
+    try:
+        seed = await asyncio.to_thread(_load_seed, companion_id, companion, tier)
+    except Exception as e:
+        logger.warning("Not recording session, seed load failed: %s", e)
+        return None
+
+    recording = SessionRecording(directory, seed)
+    send_json, receive_text = websocket.send_json, websocket.receive_text
+
+    async def recorded_send_json(data, *args, **kwargs):
+        recording.server_frame(data)
+        return await send_json(data, *args, **kwargs)
+
+    async def recorded_receive_text():
+        text = await receive_text()
+        recording.client_frame(text)
+        return text
+
+    websocket.send_json = recorded_send_json
+    websocket.receive_text = recorded_receive_text
+    _current.set(recording)
+    return recording
+
+
+# ── Upstream capture ──
+def _parse_sse(raw: bytes) -> tuple[str, int, dict | None]:
+    """(content, content chunks, usage) of a recorded chat completion stream."""
+    content, chunks, usage = [], 0, None
+    for line in raw.decode("utf-8", "replace").splitlines():
+        if not line.startswith("data: ") or line == "data: [DONE]":
+            continue
+        try:
+            event = json.loads(line[6:])
+        except json.JSONDecodeError:
+            continue
+        usage = event.get("usage") or usage
+        for choice in event.get("choices") or []:
+            delta = (choice.get("delta") or {}).get("content")
+            if delta:
+                content.append(delta)
+                chunks += 1
+    return "".join(content), chunks, usage
+
+
+class _TeeStream(httpx.AsyncByteStream):
+    """Passes a response body through while keeping a copy; records on close
+    (also when a barge-in closes the stream early)."""
+
+    def __init__(self, stream: httpx.AsyncByteStream, on_close):
+        self._stream = stream
+        self._on_close = on_close
+        self._buffer = bytearray()
+
+    async def __aiter__(self):
+        async for chunk in self._stream:
+            self._buffer.extend(chunk)
+            yield chunk
+
+    async def aclose(self) -> None:
+        try:
+            await self._stream.aclose()
+        finally:
+            self._on_close(bytes(self._buffer))
+
+
+class RecordingTransport(httpx.AsyncBaseTransport):
+    """httpx transport wrapper that records upstream responses into the
+    current session's recording (requests outside a session pass through)."""
+
+    def __init__(self, transport: httpx.AsyncBaseTransport):
+        self._transport = transport
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        recording = _current.get()
+        if recording is None:
+            return await self._transport.handle_async_request(request)
+
+        try:
+            body = json.loads(request.content or b"{}")
+        except (json.JSONDecodeError, UnicodeDecodeError):
+            body = {}
+        entry = recording.upstream_call({
+            "key": upstream_key(request.url.path, body),
+            "path": request.url.path,
+            "model": body.get("model"),
+            "stream": bool(body.get("stream")),
+        })
+        started = time.monotonic()
+        response = await self._transport.handle_async_request(request)
+        entry["status"] = response.status_code
+        entry["latency_ms"] = round((time.monotonic() - started) * 1000, 1)
+        headers = {
+            name: response.headers[name]
+            for name in ("retry-after", "retry-after-ms")
+            if name in response.headers
+        }
+        if headers:
+            entry["headers"] = headers
+
+        def record(raw: bytes) -> None:
+            if response.status_code >= 400:
+                return
+            if entry["stream"]:
+                content, chunks, usage = _parse_sse(raw)
+                entry.update(content=sanitize_text(content), chunks=chunks, usage=usage)
+            else:
+                try:
+                    data = json.loads(raw)
+                except json.JSONDecodeError:
+                    data = {}
+                if request.url.path.endswith("/embeddings"):
+                    vectors = data.get("data") or [{}]
+                    entry["embedding_dims"] = len(vectors[0].get("embedding") or [])
+                    entry["inputs"] = len(vectors)
+                else:
+                    choices = data.get("choices") or [{}]
+                    entry["content"] = sanitize_text((choices[0].get("message") or {}).get("content") or "")
+                entry["usage"] = data.get("usage")
+
+        return httpx.Response(
+            status_code=response.status_code,
+            headers=response.headers,
+            stream=_TeeStream(response.stream, record),
+            extensions=response.extensions,
+            request=request,
+        )
+
+    async def aclose(self) -> None:
+        await self._transport.aclose()
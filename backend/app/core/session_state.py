@@ -0,0 +1,179 @@
+"""
+Shared per-companion conversational state (e.g. naming ceremony progress).
+
+Values live under a (scope, key) pair, typically (feature, companion_id).
+State must survive a reconnect that lands on another worker or node, so
+the production backend is the database; the in-memory backend is for
+tests and single-process development.
+
+`check_and_set` is the only way to make a state transition that more than
+one connection may race on: it writes only if the current value is still
+`expected` (None = absent) and reports whether it won.
+
+Request handlers go through read_state / write_state / claim_state: they
+run the (blocking) store off the event loop, and treat a failing store
+(missing table, database blip) as holding no state rather than failing
+the chat turn.
+"""
+
+import asyncio
+import logging
+import threading
+from abc import ABC, abstractmethod
+from functools import lru_cache
+from typing import Any
+
+from app.core.config import get_settings
+from app.core.supabase import get_supabase_client
+
+logger = logging.getLogger(__name__)
+
+
+class SessionStateStore(ABC):
+    @abstractmethod
+    def get(self, scope: str, key: str) -> Any | None:
+        """Return the current value, or None if absent."""
+
+    @abstractmethod
+    def set(self, scope: str, key: str, value: Any) -> None:
+        """Unconditionally write a value."""
+
+    @abstractmethod
+    def delete(self, scope: str, key: str) -> None:
+        ...
+
+    @abstractmethod
+    def check_and_set(self, scope: str, key: str, expected: Any | None, value: Any) -> bool:
+        """Atomically write `value` if the current value equals `expected`."""
+
+
+class InMemorySessionStateStore(SessionStateStore):
+    def __init__(self):
+        self._values: dict[tuple[str, str], Any] = {}
+        self._lock = threading.Lock()
+
+    def get(self, scope: str, key: str) -> Any | None:
+        with self._lock:
+            return self._values.get((scope, key))
+
+    def set(self, scope: str, key: str, value: Any) -> None:
+        with self._lock:
+            self._values[(scope, key)] = value
+
+    def delete(self, scope: str, key: str) -> None:
+        with self._lock:
+            self._values.pop((scope, key), None)
+
+    def check_and_set(self, scope: str, key: str, expected: Any | None, value: Any) -> bool:
+        with self._lock:
+            if self._values.get((scope, key)) != expected:
+                return False
+            self._values[(scope, key)] = value
+            return True
+
+
+class SupabaseSessionStateStore(SessionStateStore):
+    """Session_State table (migration 008).
+
+    Compare-and-set is optimistic: creating a key is an insert that loses on
+    the primary key; changing one is an update guarded by the row version
+    read just before, so a concurrent writer makes it match zero rows.
+    """
+
+    TABLE = "Session_State"
+
+    def _read(self, scope: str, key: str) -> dict | None:
+        sb = get_supabase_client()
+        result = (
+            sb.table(self.TABLE)
+            .select("value, version")
+            .eq("scope", scope)
+            .eq("key", key)
+            .maybe_single()
+            .execute()
+        )
+        if not result or not result.data:
+            return None
+        return result.data
+
+    def get(self, scope: str, key: str) -> Any | None:
+        row = self._read(scope, key)
+        return row["value"] if row else None
+
+    def set(self, scope: str, key: str, value: Any) -> None:
+        sb = get_supabase_client()
+        row = self._read(scope, key)
+        sb.table(self.TABLE).upsert(
+            {"scope": scope, "key": key, "value": value,
+             "version": (row["version"] + 1) if row else 1},
+            on_conflict="scope,key",
+        ).execute()
+
+    def delete(self, scope: str, key: str) -> None:
+        sb = get_supabase_client()
+        sb.table(self.TABLE).delete().eq("scope", scope).eq("key", key).execute()
+
+    def check_and_set(self, scope: str, key: str, expected: Any | None, value: Any) -> bool:
+        sb = get_supabase_client()
+        row = self._read(scope, key)
+        current = row["value"] if row else None
+        if current != expected:
+            return False
+
+        if row is None:
+            result = (
+                sb.table(self.TABLE)
+                .upsert(
+                    {"scope": scope, "key": key, "value": value, "version": 1},
+                    on_conflict="scope,key",
+                    ignore_duplicates=True,
+                )
+                .execute()
+            )
+        else:
+            result = (
+                sb.table(self.TABLE)
+                .update({"value": value, "version": row["version"] + 1})
+                .eq("scope", scope)
+                .eq("key", key)
+                .eq("version", row["version"])
+                .execute()
+            )
+        return bool(result.data)
+
+
+@lru_cache()
+def get_session_store() -> SessionStateStore:
+    settings = get_settings()
+    if settings.SESSION_STATE_BACKEND == "supabase":
+        return SupabaseSessionStateStore()
+    if settings.SESSION_STATE_BACKEND == "memory":
+        return InMemorySessionStateStore()
+    raise ValueError(f"Unknown SESSION_STATE_BACKEND: {settings.SESSION_STATE_BACKEND}")
+
+
+# ── Async access for request handlers ──
+async def read_state(scope: str, key: str) -> Any | None:
+    """get() off the event loop; a store failure reads as absent."""
+    try:
+        return await asyncio.to_thread(get_session_store().get, scope, key)
+    except Exception as e:
+        logger.warning("Session state read %s/%s failed: %s", scope, key, e)
+        return None
+
+
+async def write_state(scope: str, key: str, value: Any) -> None:
+    """set() off the event loop; a store failure is logged and dropped."""
+    try:
+        await asyncio.to_thread(get_session_store().set, scope, key, value)
+    except Exception as e:
+        logger.warning("Session state write %s/%s failed: %s", scope, key, e)
+
+
+async def claim_state(scope: str, key: str, expected: Any | None, value: Any) -> bool:
+    """check_and_set() off the event loop; a store failure loses the claim."""
+    try:
+        return await asyncio.to_thread(get_session_store().check_and_set, scope, key, expected, value)
+    except Exception as e:
+        logger.warning("Session state claim %s/%s failed: %s", scope, key, e)
+        return False
@@ -1,7 +1,28 @@
-from supabase import create_client, Client
+from __future__ import annotations
+
+from functools import lru_cache
+from typing import TYPE_CHECKING
+
 from app.core.config import get_settings
+from app.core.metrics import histogram
+
+if TYPE_CHECKING:
+    from supabase import Client
 
+rpc_seconds = histogram(
+    "supabase_rpc_seconds",
+    "Supabase RPC / query latency, by operation",
+    ("rpc",),
+)
 
+
+# One client per process: reuses its HTTP connection pool across requests
+# and threads instead of building a new client (and TLS session) per call.
+# The SDK (with its storage/realtime stack) is imported here, not at module
+# import, so it stays off the worker's boot path.
+@lru_cache()
 def get_supabase_client() -> Client:
+    from supabase import create_client
+
     settings = get_settings()
     return create_client(settings.SUPABASE_URL, settings.SUPABASE_SERVICE_ROLE_KEY)
@@ -1,12 +1,54 @@
 from dotenv import load_dotenv
 load_dotenv()
 
+import asyncio
+import importlib
+import logging
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 
 from app.api.v1.router import router as api_v1_router
+from app.core.config import get_settings
+from app.core.loop_monitor import LoopLagMonitor
+from app.core.metrics import PROMETHEUS_CONTENT_TYPE, render_prometheus
+from app.core.openai_gateway import get_openai_gateway
+
+logger = logging.getLogger(__name__)
+
+# Heavy SDKs the gateway, router and Supabase client import on first use
+PRELOAD_MODULES = ("openai", "langchain_openai", "langchain_core.prompts", "supabase")
+
+
+def preload_sdks() -> None:
+    for name in PRELOAD_MODULES:
+        try:
+            importlib.import_module(name)
+        except Exception as e:
+            logger.warning("Preloading %s failed: %s", name, e)
 
-app = FastAPI(title="If You Tame Me", version="1.0.0")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    settings = get_settings()
+    monitor = None
+    if settings.LOOP_MONITOR_ENABLED:
+        monitor = LoopLagMonitor(threshold=settings.LOOP_LAG_THRESHOLD_SECONDS)
+        monitor.start()
+    # Off the boot path: the worker accepts connections while this runs
+    preload = asyncio.create_task(asyncio.to_thread(preload_sdks)) if settings.PRELOAD_SDKS else None
+    yield
+    if preload is not None:
+        await preload
+    if get_openai_gateway.cache_info().currsize:
+        await get_openai_gateway().aclose()
+    if monitor is not None:
+        await monitor.stop()
+
+
+app = FastAPI(title="If You Tame Me", version="1.0.0", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -14,6 +56,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "X-Next-Cursor"],
 )
 
 app.include_router(api_v1_router, prefix="/api/v1")
@@ -22,3 +65,8 @@ app.include_router(api_v1_router, prefix="/api/v1")
 @app.get("/health")
 async def health_check():
     return {"status": "ok"}
+
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    return PlainTextResponse(render_prometheus(), media_type=PROMETHEUS_CONTENT_TYPE)
@@ -1,13 +1,13 @@
 from app.schemas.companion import CompanionCreate, CompanionUpdate, CompanionResponse
-from app.schemas.chat import ChatLogCreate, ChatLogResponse, ChatMessage, SpeakRequest
-from app.schemas.emotion import DailyEmotionCreate, DailyEmotionResponse
+from app.schemas.chat import ChatLogCreate, ChatLogResponse, ChatMessage
+from app.schemas.emotion import DailyEmotionCreate, DailyEmotionResponse, MonthlyEmotionResponse
 from app.schemas.inventory import InventoryItemCreate, InventoryItemResponse
 from app.schemas.subscription import SubscriptionCreate, SubscriptionUpdate, SubscriptionResponse
 
 __all__ = [
     "CompanionCreate", "CompanionUpdate", "CompanionResponse",
-    "ChatLogCreate", "ChatLogResponse", "ChatMessage", "SpeakRequest",
-    "DailyEmotionCreate", "DailyEmotionResponse",
+    "ChatLogCreate", "ChatLogResponse", "ChatMessage",
+    "DailyEmotionCreate", "DailyEmotionResponse", "MonthlyEmotionResponse",
     "InventoryItemCreate", "InventoryItemResponse",
     "SubscriptionCreate", "SubscriptionUpdate", "SubscriptionResponse",
 ]
@@ -9,6 +9,7 @@ class CompanionCreate(BaseModel):
     name: str = Field(max_length=50)
     relationship_type: Optional[str] = Field(None, max_length=50)
     tone_style: Optional[str] = Field(None, max_length=50)
+    timezone: str = Field("UTC", max_length=64)
 
 
 class CompanionUpdate(BaseModel):
@@ -17,6 +18,7 @@ class CompanionUpdate(BaseModel):
     tone_style: Optional[str] = Field(None, max_length=50)
     summary: Optional[str] = None
     active_traits: Optional[dict] = None
+    timezone: Optional[str] = Field(None, max_length=64)
 
 
 class CompanionResponse(BaseModel):
@@ -27,4 +29,5 @@ class CompanionResponse(BaseModel):
     tone_style: Optional[str] = None
     summary: str = ""
     active_traits: dict = {}
+    timezone: str = "UTC"
     created_at: datetime
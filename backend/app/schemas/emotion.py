@@ -21,3 +21,13 @@ class DailyEmotionResponse(BaseModel):
     summary_text: Optional[str] = None
     key_quote: Optional[str] = None
     created_at: datetime
+
+
+class MonthlyEmotionResponse(BaseModel):
+    month: date
+    emotion_counts: dict[str, int] = {}
+    color_counts: dict[str, int] = {}
+    dominant_emotion: Optional[str] = None
+    dominant_color: Optional[str] = None
+    day_count: int = 0
+    updated_at: datetime
@@ -8,6 +8,7 @@ class InventoryItemCreate(BaseModel):
     user_id: UUID
     item_type: Optional[str] = Field(None, max_length=50)
     image_url: Optional[str] = None
+    image_variants: Optional[dict] = None
     metadata: Optional[dict] = None
 
 
@@ -16,5 +17,6 @@ class InventoryItemResponse(BaseModel):
     user_id: UUID
     item_type: Optional[str] = None
     image_url: Optional[str] = None
+    image_variants: Optional[dict] = None
     metadata: Optional[dict] = None
     acquired_at: datetime
@@ -0,0 +1,98 @@
+"""
+Per-companion actor: one in-process owner of a companion's chat state.
+
+Every WebSocket attached to the same companion (several tabs/devices)
+shares one actor, so the companion row and user tier are loaded once,
+turns are serialized, companion-level events (name reveal, MBTI
+announcement, naming prompt) reach every socket, and expensive post-turn
+checks are scheduled once per companion (services/post_turn.py).
+
+Cross-process consistency is handled by the session-state store; the
+actor only removes duplication inside one worker.
+"""
+
+import asyncio
+import logging
+from typing import Callable
+
+from fastapi import WebSocket
+
+from app.services.post_turn import PostTurnScheduler
+
+logger = logging.getLogger(__name__)
+
+
+class CompanionActor:
+    def __init__(self, companion_id: str, companion: dict):
+        self.companion_id = companion_id
+        # Shared, mutated in place by naming / MBTI discovery
+        self.companion = companion
+        self.user_tier: str | None = None
+        # Last emotions loaded for a turn; fallback when the fetch overruns
+        self.recent_emotions: list[dict] | None = None
+        # AI message count: exact count on first connection, then kept here
+        self.ai_turns: int | None = None
+        self.scheduler: PostTurnScheduler | None = None
+        self.turn_lock = asyncio.Lock()
+        self.sockets: set[WebSocket] = set()
+
+    async def broadcast(self, event: dict) -> int:
+        """Send a companion-level event to every attached socket. Returns how
+        many sockets it reached."""
+        delivered = 0
+        for socket in list(self.sockets):
+            try:
+                await socket.send_json(event)
+                delivered += 1
+            except Exception as e:
+                logger.debug("Dropping socket for %s: %s", self.companion_id, e)
+                self.sockets.discard(socket)
+        return delivered
+
+
+class CompanionRegistry:
+    """Bookkeeping runs on the event loop without awaiting in between, so it
+    needs no lock; the only await is a companion's first load, which is
+    shared by every connection that arrives while it is in flight."""
+
+    def __init__(self):
+        self._actors: dict[str, CompanionActor] = {}
+        self._loading: dict[str, asyncio.Future] = {}
+
+    def get(self, companion_id: str) -> CompanionActor | None:
+        return self._actors.get(companion_id)
+
+    async def attach(
+        self, companion_id: str, websocket: WebSocket, load: Callable[[str], dict | None]
+    ) -> CompanionActor | None:
+        """Join the companion's actor, creating it (one load) if this is the
+        first connection. Returns None if the companion does not exist."""
+        actor = self._actors.get(companion_id)
+        if actor is None:
+            loading = self._loading.get(companion_id)
+            if loading is None:
+                loading = asyncio.ensure_future(asyncio.to_thread(load, companion_id))
+                self._loading[companion_id] = loading
+                loading.add_done_callback(lambda _: self._loading.pop(companion_id, None))
+            # A connection that gives up mustn't cancel the others' load
+            companion = await asyncio.shield(loading)
+            if not companion:
+                return None
+            # The first waiter to resume creates the actor
+            actor = self._actors.get(companion_id)
+            if actor is None:
+                actor = CompanionActor(companion_id, companion)
+                self._actors[companion_id] = actor
+        actor.sockets.add(websocket)
+        return actor
+
+    async def detach(self, actor: CompanionActor, websocket: WebSocket) -> None:
+        """Leave the actor; the last connection out drops the cached state."""
+        actor.sockets.discard(websocket)
+        if not actor.sockets and self._actors.get(actor.companion_id) is actor:
+            del self._actors[actor.companion_id]
+            if actor.scheduler is not None:
+                actor.scheduler.close()
+
+
+companion_registry = CompanionRegistry()
@@ -0,0 +1,175 @@
+"""
+Memory Gem crystallization pipeline.
+
+Shared by the on-demand crystallize job (endpoints/store.py) and the
+off-peak month-end batch (cron/precrystallize.py), which stages prompts
+and images ahead of time in Gem_Staging.
+"""
+
+import hashlib
+import json
+from datetime import date, datetime, timedelta, timezone
+
+from app.core.openai_gateway import get_openai_gateway
+from app.core.supabase import get_supabase_client
+
+
+def current_month() -> str:
+    return date.today().strftime("%Y-%m")
+
+
+def month_bounds(month: str) -> tuple[date, date]:
+    """Return the first and last day of a YYYY-MM month (capped at today)."""
+    year, mon = (int(part) for part in month.split("-"))
+    month_start = date(year, mon, 1)
+    next_month = (month_start + timedelta(days=32)).replace(day=1)
+    return month_start, min(next_month - timedelta(days=1), date.today())
+
+
+def get_monthly_emotions(companion_id: str, month: str | None = None) -> list[dict]:
+    """Fetch a month's daily emotions for the companion (default: this month)."""
+    sb = get_supabase_client()
+    month_start, month_end = month_bounds(month or current_month())
+
+    result = (
+        sb.table("Daily_Emotions")
+        .select("*")
+        .eq("companion_id", companion_id)
+        .gte("date", str(month_start))
+        .lte("date", str(month_end))
+        .order("date")
+        .execute()
+    )
+    return result.data or []
+
+
+def month_start_date(month: str) -> str:
+    """'YYYY-MM' → 'YYYY-MM-01' (Monthly_Emotions.month key)."""
+    return f"{month}-01"
+
+
+def get_monthly_rollup(companion_id: str, month: str | None = None) -> dict | None:
+    """Fetch a month's Monthly_Emotions rollup (counts, dominant values, day count)."""
+    sb = get_supabase_client()
+    result = (
+        sb.table("Monthly_Emotions")
+        .select("*")
+        .eq("companion_id", companion_id)
+        .eq("month", month_start_date(month or current_month()))
+        .maybe_single()
+        .execute()
+    )
+    return result.data if result else None
+
+
+async def generate_dalle_prompt(
+    emotions: list[dict], rollup: dict | None
+) -> tuple[str, str, str]:
+    """Use gpt-4o to craft a DALL-E prompt from the monthly emotion summary.
+
+    Dominant values come from the Monthly_Emotions rollup.
+    Returns (dalle_prompt, dominant_emotion, dominant_color).
+    """
+    rollup = rollup or {}
+    dominant_color = rollup.get("dominant_color") or "#808080"
+    dominant_emotion = rollup.get("dominant_emotion") or "neutral"
+    summary_text = "\n".join(
+        f"{e['date']}: {e.get('primary_emotion', '?')} ({e.get('color_hex', '#808080')}) - {e.get('summary_text', '')}"
+        for e in emotions
+    )
+
+    response = await get_openai_gateway().chat(
+        "store.prompt",
+        model="gpt-4o",
+        messages=[
+            {
+                "role": "system",
+                "content": (
+                    "You are a creative art director. Given an emotional summary of a month, "
+                    "craft a single DALL-E image prompt for a magical gemstone that represents "
+                    "these emotions. Output ONLY the prompt text, nothing else."
+                ),
+            },
+            {
+                "role": "user",
+                "content": (
+                    f"Monthly emotional data:\n{summary_text}\n\n"
+                    f"Dominant color: {dominant_color}\n"
+                    f"Dominant emotion: {dominant_emotion}\n\n"
+                    "Create a prompt for: A high-end 3D render of a jewelry gem. "
+                    f"The core color is {dominant_color}. It should feel {dominant_emotion}. "
+                    "Magical, glowing, cinematic lighting."
+                ),
+            },
+        ],
+    )
+
+    dalle_prompt = response.choices[0].message.content.strip()
+    return dalle_prompt, dominant_emotion, dominant_color
+
+
+async def generate_gem_image(dalle_prompt: str) -> str:
+    """Call DALL-E 3 to generate the gem image. Returns the image URL."""
+    response = await get_openai_gateway().image(
+        "store.image",
+        model="dall-e-3",
+        prompt=dalle_prompt,
+        size="1024x1024",
+        quality="hd",
+        n=1,
+    )
+    return response.data[0].url
+
+
+def rollup_fingerprint(rollup: dict) -> str:
+    """Hash the rollup state a gem is derived from.
+
+    The rollup version is bumped on every daily upsert in the month, so any
+    new or re-analyzed day changes the fingerprint.
+    """
+    source = [
+        str(rollup["month"]),
+        rollup.get("version"),
+        rollup.get("day_count"),
+        rollup.get("emotion_counts"),
+        rollup.get("color_counts"),
+    ]
+    payload = json.dumps(source, ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def get_staged_gem(companion_id: str, month: str) -> dict | None:
+    """Fetch a pre-crystallized result from Gem_Staging, if the batch produced one."""
+    sb = get_supabase_client()
+    result = (
+        sb.table("Gem_Staging")
+        .select("*")
+        .eq("companion_id", companion_id)
+        .eq("month", month)
+        .maybe_single()
+        .execute()
+    )
+    return result.data if result else None
+
+
+def consume_staged_gem(companion_id: str, month: str) -> None:
+    """Mark a staged result as used, so it isn't served for another gem."""
+    sb = get_supabase_client()
+    (
+        sb.table("Gem_Staging")
+        .update({"consumed_at": datetime.now(timezone.utc).isoformat()})
+        .eq("companion_id", companion_id)
+        .eq("month", month)
+        .is_("consumed_at", "null")
+        .execute()
+    )
+
+
+def save_staged_gem(companion_id: str, month: str, staged: dict) -> None:
+    """Upsert a pre-crystallized result into Gem_Staging."""
+    sb = get_supabase_client()
+    sb.table("Gem_Staging").upsert({
+        "companion_id": companion_id,
+        "month": month,
+        **staged,
+    }).execute()
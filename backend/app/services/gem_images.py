@@ -0,0 +1,100 @@
+"""
+Persist generated gem images and pre-render gallery variants.
+
+DALL-E image URLs expire, so each image is downloaded once, stored
+content-addressed in the blob store, and rendered into smaller sizes in
+modern formats. The gallery grid loads a ~256px thumbnail instead of the
+1024×1024 HD original.
+"""
+
+import asyncio
+import hashlib
+import io
+import logging
+
+import httpx
+from PIL import Image
+
+from app.core.blob_store import get_blob_store
+
+logger = logging.getLogger(__name__)
+
+# variant name → longest edge in pixels
+GEM_VARIANT_SIZES = {
+    "thumb": 256,
+    "medium": 512,
+}
+GEM_VARIANT_FORMATS = {
+    "webp": ("WEBP", "image/webp", {"quality": 82, "method": 6}),
+    "avif": ("AVIF", "image/avif", {"quality": 60}),
+}
+
+
+async def download_image(url: str) -> bytes:
+    async with httpx.AsyncClient(timeout=30.0, follow_redirects=True) as client:
+        response = await client.get(url)
+        response.raise_for_status()
+        return response.content
+
+
+def render_variants(original: bytes) -> dict[str, dict[str, bytes]]:
+    """Resize the original into each variant size and encode in each format."""
+    source = Image.open(io.BytesIO(original))
+    source.load()
+    if source.mode not in ("RGB", "RGBA"):
+        source = source.convert("RGBA")
+
+    rendered: dict[str, dict[str, bytes]] = {}
+    for name, edge in GEM_VARIANT_SIZES.items():
+        image = source.copy()
+        image.thumbnail((edge, edge), Image.Resampling.LANCZOS)
+        rendered[name] = {}
+        for ext, (pil_format, _, options) in GEM_VARIANT_FORMATS.items():
+            buf = io.BytesIO()
+            image.save(buf, format=pil_format, **options)
+            rendered[name][ext] = buf.getvalue()
+    return rendered
+
+
+def store_gem_image(original: bytes) -> dict:
+    """Store the original and its variants. Returns the variant URL map.
+
+    Content addressing makes this idempotent: an image already stored is
+    not re-encoded.
+    """
+    store = get_blob_store()
+    digest = hashlib.sha256(original).hexdigest()
+
+    original_key = f"gems/{digest}.png"
+    variants = {"original": store.url(original_key)}
+    variant_keys = {
+        (name, ext): f"gems/{digest}_{edge}.{ext}"
+        for name, edge in GEM_VARIANT_SIZES.items()
+        for ext in GEM_VARIANT_FORMATS
+    }
+
+    if not store.exists(original_key):
+        store.put(original_key, original, "image/png")
+    if not all(store.exists(key) for key in variant_keys.values()):
+        rendered = render_variants(original)
+        for (name, ext), key in variant_keys.items():
+            store.put(key, rendered[name][ext], GEM_VARIANT_FORMATS[ext][1])
+
+    for (name, ext), key in variant_keys.items():
+        variants.setdefault(name, {})[ext] = store.url(key)
+    variants["sha256"] = digest
+    return variants
+
+
+async def persist_gem_image(image_url: str) -> dict | None:
+    """Download a generated image and store it with its variants.
+
+    Returns the variant URL map, or None if persisting failed (the caller
+    then keeps the temporary upstream URL rather than losing the gem).
+    """
+    try:
+        original = await download_image(image_url)
+        return await asyncio.to_thread(store_gem_image, original)
+    except Exception as e:
+        logger.error("Failed to persist gem image: %s", e, exc_info=True)
+        return None
@@ -0,0 +1,152 @@
+"""
+Hedged replies: a backup model when the routed one is slow to start.
+
+A reply's TTFT tail is mostly upstream queueing on the larger models.
+For intents listed in HEDGE_FIRST_TOKEN_SECONDS the turn opens the
+routed model's stream in the background and waits up to the intent's
+threshold for its first token. If none has arrived by then, it opens the
+same prompt on HEDGE_MODEL as well and whichever stream produces a token
+first answers the turn; the other is closed and what it consumed is
+counted as wasted tokens.
+
+Backups are capped at HEDGE_MAX_RATE of the last HEDGE_WINDOW_TURNS
+eligible turns, so an upstream slowdown can't double the spend: past the
+cap the turn simply waits for the routed model (over_budget).
+"""
+
+import asyncio
+from collections import deque
+from functools import lru_cache
+from typing import AsyncIterator, Awaitable, Callable
+
+from app.core.config import get_settings
+from app.core.metrics import counter, gauge
+from app.core.openai_gateway import approx_tokens
+from app.services.reply_stream import BufferedReply
+
+HEDGE_NOT_NEEDED = "not_needed"
+HEDGE_OVER_BUDGET = "over_budget"
+HEDGE_PRIMARY_WON = "primary_won"
+HEDGE_BACKUP_WON = "backup_won"
+
+hedges_total = counter(
+    "chat_hedges_total",
+    "Hedge-eligible turns by outcome (not_needed, over_budget, primary_won, backup_won)",
+    ("intent", "outcome"),
+)
+hedge_rate = gauge(
+    "chat_hedge_rate",
+    "Share of recent hedge-eligible turns that opened a backup stream",
+)
+wasted_tokens_total = counter(
+    "chat_hedge_wasted_tokens_total",
+    "Approximate tokens spent on the losing stream of hedged replies",
+    ("direction",),
+)
+
+
+def parse_thresholds(value: str) -> dict[str, float]:
+    """Parse "deep_emotional=1.5,memory_recall=2" into {intent: seconds}."""
+    thresholds = {}
+    for item in value.split(","):
+        if not item.strip():
+            continue
+        intent, _, seconds = item.partition("=")
+        thresholds[intent.strip()] = float(seconds)
+    return thresholds
+
+
+def hedge_threshold(intent: str) -> float | None:
+    """First-token threshold for this intent, or None if it isn't hedged."""
+    return _thresholds(get_settings().HEDGE_FIRST_TOKEN_SECONDS).get(intent)
+
+
+@lru_cache
+def _thresholds(value: str) -> dict[str, float]:
+    return parse_thresholds(value)
+
+
+class HedgeBudget:
+    """Caps backups at max_rate of the last `window` eligible turns."""
+
+    def __init__(self, max_rate: float, window: int):
+        self.max_rate = max_rate
+        self._recent: deque[bool] = deque(maxlen=window)
+
+    def allow(self) -> bool:
+        # Against the turns actually recorded: a fresh window must not allow
+        # max_rate * window backups in a row
+        return sum(self._recent) < self.max_rate * max(len(self._recent), 1)
+
+    def record(self, hedged: bool) -> None:
+        self._recent.append(hedged)
+        hedge_rate.set(sum(self._recent) / len(self._recent))
+
+
+@lru_cache
+def get_hedge_budget() -> HedgeBudget:
+    settings = get_settings()
+    return HedgeBudget(settings.HEDGE_MAX_RATE, settings.HEDGE_WINDOW_TURNS)
+
+
+async def hedged_reply(
+    open_reply: Callable[[str, str, str], Awaitable[AsyncIterator]],
+    intent: str,
+    model: str,
+    system_prompt: str,
+    threshold: float,
+    prompt_tokens: int,
+) -> BufferedReply:
+    """The reply that answers the turn: the routed model's, or the backup's
+    if it started first. The caller must close() it."""
+    primary = BufferedReply(lambda: open_reply("chat.stream", model, system_prompt), model, system_prompt)
+    backup = None
+    try:
+        budget = get_hedge_budget()
+        if await primary.wait_ready(threshold):
+            budget.record(False)
+            hedges_total.inc(intent=intent, outcome=HEDGE_NOT_NEEDED)
+            return primary
+        if not budget.allow():
+            budget.record(False)
+            hedges_total.inc(intent=intent, outcome=HEDGE_OVER_BUDGET)
+            return primary
+
+        budget.record(True)
+        backup_model = get_settings().HEDGE_MODEL
+        backup = BufferedReply(
+            lambda: open_reply("chat.hedge", backup_model, system_prompt), backup_model, system_prompt
+        )
+        # Neither started (both failed or came back empty): the primary's
+        # error is the one the turn reports
+        winner = await first_to_start(primary, backup) or primary
+    except BaseException:
+        await primary.close()
+        if backup is not None:
+            await backup.close()
+        raise
+
+    loser = backup if winner is primary else primary
+    hedges_total.inc(intent=intent, outcome=HEDGE_PRIMARY_WON if winner is primary else HEDGE_BACKUP_WON)
+    wasted_tokens_total.inc(prompt_tokens, direction="prompt")
+    wasted_tokens_total.inc(approx_tokens(loser.received_text), direction="completion")
+    await loser.close()
+    return winner
+
+
+async def first_to_start(*replies: BufferedReply) -> BufferedReply | None:
+    """The first reply to produce a token (earlier arguments win ties), or
+    None if every one ended without any."""
+    waiters = {reply: asyncio.ensure_future(reply.ready.wait()) for reply in replies}
+    try:
+        while waiters:
+            await asyncio.wait(waiters.values(), return_when=asyncio.FIRST_COMPLETED)
+            for reply in replies:
+                if reply in waiters and waiters[reply].done():
+                    del waiters[reply]
+                    if reply.first_token_at is not None:
+                        return reply
+        return None
+    finally:
+        for waiter in waiters.values():
+            waiter.cancel()
@@ -0,0 +1,323 @@
+"""
+Background job queue with per-key deduplication.
+
+Used for slow, paid work (e.g. gem crystallization) that must not hold an
+HTTP request open. Jobs are identified by a random job_id for status
+polling and by a dedupe key: submitting a key that already has a queued,
+running or recently finished job returns that job instead of starting a
+new one. A fixed pool of worker tasks caps concurrency.
+
+Jobs run in the process that accepted them, but their state lives in a
+JobStore. With the "supabase" store (Background_Jobs, migration 011) a
+poll can land on any worker, and a unique index on live jobs per key
+stops two workers from starting the same paid job. A queued or running
+job not updated for `stale_seconds` lost its worker (restart, crash) and
+no longer blocks its key. The "memory" store keeps everything in process
+(single-process development).
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+import uuid
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable
+
+from app.core.config import get_settings
+from app.core.metrics import counter, histogram
+from app.core.supabase import get_supabase_client
+
+logger = logging.getLogger(__name__)
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_DONE = "done"
+JOB_FAILED = "failed"
+
+jobs_total = counter(
+    "background_jobs_total",
+    "Background jobs finished, by queue and final status",
+    ("queue", "status"),
+)
+job_seconds = histogram(
+    "background_job_seconds",
+    "Background job run time, by queue",
+    ("queue",),
+)
+
+
+class QueueFullError(Exception):
+    """Raised when the queue already holds its maximum number of pending jobs."""
+
+
+@dataclass
+class Job:
+    job_id: str
+    key: tuple
+    payload: dict
+    status: str = JOB_QUEUED
+    stage: str = JOB_QUEUED
+    result: Any = None
+    error: str | None = None
+    created_at: float = field(default_factory=time.time)
+    updated_at: float = field(default_factory=time.time)
+    # Set by the queue running the job: writes its state to the store
+    _persist: Callable[[Job], Awaitable[None]] | None = field(default=None, repr=False, compare=False)
+
+    async def set_stage(self, stage: str) -> None:
+        self.stage = stage
+        self.updated_at = time.time()
+        if self._persist is not None:
+            await self._persist(self)
+
+    @property
+    def finished(self) -> bool:
+        return self.status in (JOB_DONE, JOB_FAILED)
+
+
+class JobStore(ABC):
+    @abstractmethod
+    def get(self, job_id: str) -> Job | None:
+        ...
+
+    @abstractmethod
+    def find(self, key: tuple) -> Job | None:
+        """Return the live (non-failed, unexpired) job for a dedupe key, if any."""
+
+    @abstractmethod
+    def create(self, job: Job) -> Job:
+        """Record a new job, or return the live job that already holds its key."""
+
+    @abstractmethod
+    def save(self, job: Job) -> None:
+        """Persist the job's status, stage, result and error."""
+
+
+class InMemoryJobStore(JobStore):
+    def __init__(self, retention_seconds: float = 3600):
+        self._retention = retention_seconds
+        self._jobs: dict[str, Job] = {}
+        self._by_key: dict[tuple, str] = {}
+
+    def get(self, job_id: str) -> Job | None:
+        return self._jobs.get(job_id)
+
+    def find(self, key: tuple) -> Job | None:
+        self._prune()
+        job_id = self._by_key.get(key)
+        job = self._jobs.get(job_id) if job_id else None
+        if job is None or job.status == JOB_FAILED:
+            return None
+        return job
+
+    def create(self, job: Job) -> Job:
+        existing = self.find(job.key)
+        if existing:
+            return existing
+        self._jobs[job.job_id] = job
+        self._by_key[job.key] = job.job_id
+        return job
+
+    def save(self, job: Job) -> None:
+        # The queue mutates the stored object itself
+        pass
+
+    def _prune(self) -> None:
+        """Forget finished jobs older than the retention window."""
+        cutoff = time.time() - self._retention
+        expired = [j for j in self._jobs.values() if j.finished and j.updated_at < cutoff]
+        for job in expired:
+            del self._jobs[job.job_id]
+            if self._by_key.get(job.key) == job.job_id:
+                del self._by_key[job.key]
+
+
+class SupabaseJobStore(JobStore):
+    """Background_Jobs table (migration 011), one row per job."""
+
+    TABLE = "Background_Jobs"
+
+    def __init__(self, queue: str, retention_seconds: float = 3600, stale_seconds: float = 900):
+        self.queue = queue
+        self._retention = retention_seconds
+        self._stale = stale_seconds
+
+    @staticmethod
+    def _dedupe_key(key: tuple) -> str:
+        return "|".join(str(part) for part in key)
+
+    @staticmethod
+    def _job(row: dict) -> Job:
+        return Job(
+            job_id=row["job_id"],
+            key=tuple(row["dedupe_key"].split("|")),
+            payload=row.get("payload") or {},
+            status=row["status"],
+            stage=row["stage"],
+            result=row.get("result"),
+            error=row.get("error"),
+            created_at=datetime.fromisoformat(row["created_at"]).timestamp(),
+            updated_at=datetime.fromisoformat(row["updated_at"]).timestamp(),
+        )
+
+    def get(self, job_id: str) -> Job | None:
+        sb = get_supabase_client()
+        result = sb.table(self.TABLE).select("*").eq("job_id", job_id).maybe_single().execute()
+        if not result or not result.data:
+            return None
+        return self._job(result.data)
+
+    def find(self, key: tuple) -> Job | None:
+        sb = get_supabase_client()
+        result = (
+            sb.table(self.TABLE)
+            .select("*")
+            .eq("queue", self.queue)
+            .eq("dedupe_key", self._dedupe_key(key))
+            .neq("status", JOB_FAILED)
+            .order("created_at", desc=True)
+            .limit(1)
+            .execute()
+        )
+        if not result.data:
+            return None
+        job = self._job(result.data[0])
+        if job.finished:
+            return job if job.updated_at >= time.time() - self._retention else None
+        if job.updated_at < time.time() - self._stale:
+            logger.warning("Job %s stalled in %s, abandoning it", job.job_id, job.stage)
+            sb.table(self.TABLE).update(
+                {"status": JOB_FAILED, "error": "abandoned", "updated_at": _now()}
+            ).eq("job_id", job.job_id).in_("status", [JOB_QUEUED, JOB_RUNNING]).execute()
+            return None
+        return job
+
+    def create(self, job: Job) -> Job:
+        sb = get_supabase_client()
+        try:
+            sb.table(self.TABLE).insert({
+                "job_id": job.job_id,
+                "queue": self.queue,
+                "dedupe_key": self._dedupe_key(job.key),
+                "payload": job.payload,
+                "status": job.status,
+                "stage": job.stage,
+            }).execute()
+        except Exception:
+            # Lost the race for the key's live-job slot to another worker
+            existing = self.find(job.key)
+            if existing:
+                return existing
+            raise
+        return job
+
+    def save(self, job: Job) -> None:
+        sb = get_supabase_client()
+        result = job.result.model_dump(mode="json") if hasattr(job.result, "model_dump") else job.result
+        sb.table(self.TABLE).update({
+            "status": job.status,
+            "stage": job.stage,
+            "result": result,
+            "error": job.error,
+            "updated_at": _now(),
+        }).eq("job_id", job.job_id).execute()
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def job_store(queue: str) -> JobStore:
+    """The store for a queue, per JOB_STORE_BACKEND."""
+    settings = get_settings()
+    if settings.JOB_STORE_BACKEND == "supabase":
+        return SupabaseJobStore(queue)
+    if settings.JOB_STORE_BACKEND == "memory":
+        return InMemoryJobStore()
+    raise ValueError(f"Unknown JOB_STORE_BACKEND: {settings.JOB_STORE_BACKEND}")
+
+
+class JobQueue:
+    def __init__(
+        self,
+        runner: Callable[[Job], Awaitable[Any]],
+        name: str = "jobs",
+        max_workers: int = 2,
+        max_pending: int = 100,
+        store: JobStore | None = None,
+    ):
+        self._runner = runner
+        self.name = name
+        self._max_workers = max_workers
+        self._max_pending = max_pending
+        self._store = store or InMemoryJobStore()
+        # Jobs this process has accepted and not finished yet
+        self._pending = 0
+        self._queue: asyncio.Queue[Job] | None = None
+        self._workers: list[asyncio.Task] = []
+
+    async def get(self, job_id: str) -> Job | None:
+        return await asyncio.to_thread(self._store.get, job_id)
+
+    async def find(self, key: tuple) -> Job | None:
+        """Return the live (non-failed, unexpired) job for a dedupe key, if any."""
+        return await asyncio.to_thread(self._store.find, key)
+
+    async def submit(self, key: tuple, payload: dict) -> Job:
+        """Enqueue a job, or return the existing job for the same key."""
+        existing = await self.find(key)
+        if existing:
+            return existing
+
+        if self._pending >= self._max_pending:
+            raise QueueFullError(f"{self._pending} jobs already pending")
+
+        job = Job(job_id=uuid.uuid4().hex, key=key, payload=payload)
+        created = await asyncio.to_thread(self._store.create, job)
+        if created is not job:
+            return created
+
+        self._ensure_workers()
+        job._persist = self._persist
+        self._pending += 1
+        self._queue.put_nowait(job)
+        return job
+
+    async def _persist(self, job: Job) -> None:
+        try:
+            await asyncio.to_thread(self._store.save, job)
+        except Exception as e:
+            logger.warning("Saving job %s (%s) failed: %s", job.job_id, job.stage, e)
+
+    def _ensure_workers(self) -> None:
+        """Start the worker pool lazily inside the running event loop."""
+        if self._queue is None:
+            self._queue = asyncio.Queue()
+        self._workers = [w for w in self._workers if not w.done()]
+        while len(self._workers) < self._max_workers:
+            self._workers.append(asyncio.create_task(self._worker()))
+
+    async def _worker(self) -> None:
+        while True:
+            job = await self._queue.get()
+            job.status = JOB_RUNNING
+            await job.set_stage(JOB_RUNNING)
+            started = time.perf_counter()
+            try:
+                job.result = await self._runner(job)
+                job.status = JOB_DONE
+                await job.set_stage(JOB_DONE)
+            except Exception as e:
+                logger.error("Job %s failed: %s", job.job_id, e, exc_info=True)
+                job.status = JOB_FAILED
+                job.error = str(e)
+                await job.set_stage(JOB_FAILED)
+            finally:
+                self._pending -= 1
+                job_seconds.observe(time.perf_counter() - started, queue=self.name)
+                jobs_total.inc(queue=self.name, status=job.status)
+                self._queue.task_done()
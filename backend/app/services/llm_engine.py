@@ -1,36 +1,53 @@
+import asyncio
 import logging
+from functools import lru_cache
 
-from langchain_openai import ChatOpenAI
-from app.core.router import classify_intent, RouterResult
-from app.core.supabase import get_supabase_client
+from app.core.deadline import TurnDeadline
+from app.core.router import classify_intent, default_route, RouterResult
+from app.core.supabase import get_supabase_client, rpc_seconds
 
 logger = logging.getLogger(__name__)
 
 
 class LLMEngine:
-    def __init__(self):
-        self._models: dict[str, ChatOpenAI] = {}
-
-    def _get_llm(self, model: str, temperature: float = 0.7) -> ChatOpenAI:
-        """Return a cached ChatOpenAI instance for the given model name."""
-        if model not in self._models:
-            self._models[model] = ChatOpenAI(
-                model=model, temperature=temperature, streaming=True
-            )
-        return self._models[model]
-
     async def generate_response(
-        self, user_input: str, user_tier: str, companion_id: str, **kwargs
-    ) -> tuple[ChatOpenAI, list[dict], RouterResult]:
+        self,
+        user_input: str,
+        user_tier: str,
+        companion_id: str,
+        deadline: TurnDeadline | None = None,
+        **kwargs,
+    ) -> tuple[list[dict], RouterResult]:
         """
         Classify intent via Smart Router, select model & k, fetch recent logs.
 
-        Returns (target_llm, recent_history, router_result).
+        Returns (recent_history, router_result). The caller streams the reply
+        through the OpenAI gateway with router_result.model. Under a turn
+        deadline, a slow router falls back to the default intent and slow
+        history to none.
         """
+        router_result = await self.route(user_input, user_tier, deadline)
+
+        history = self.get_recent_chat_history(companion_id, limit=router_result.k)
+        if deadline:
+            recent_history = await deadline.run("recent_history", history, [])
+        else:
+            recent_history = await history
+
+        return recent_history, router_result
 
+    async def route(
+        self, user_input: str, user_tier: str, deadline: TurnDeadline | None = None
+    ) -> RouterResult:
+        """Model and history depth for this message (Smart Router for SOULMATE)."""
         # FREE 유저는 항상 저비용 모델, SOULMATE만 라우팅 수행
         if user_tier == "SOULMATE":
-            router_result = await classify_intent(user_input)
+            if deadline:
+                router_result = await deadline.run(
+                    "router", classify_intent(user_input), default_route("router over budget")
+                )
+            else:
+                router_result = await classify_intent(user_input)
         else:
             router_result = RouterResult(
                 intent="casual_chat",
@@ -39,7 +56,6 @@ class LLMEngine:
                 reason="FREE tier — default to mini",
             )
 
-        target_llm = self._get_llm(router_result.model)
         logger.info(
             "Router → intent=%s  model=%s  k=%d  reason=%s",
             router_result.intent,
@@ -47,12 +63,7 @@ class LLMEngine:
             router_result.k,
             router_result.reason,
         )
-
-        recent_history = await self.get_recent_chat_history(
-            companion_id, limit=router_result.k
-        )
-
-        return target_llm, recent_history, router_result
+        return router_result
 
     async def get_recent_chat_history(
         self, companion_id: str, limit: int = 3
@@ -60,15 +71,21 @@ class LLMEngine:
         """Fetch recent chat history with dynamic limit for context compression."""
         try:
             sb = get_supabase_client()
-            result = sb.rpc(
-                "get_recent_chat_logs",
-                {
-                    "target_companion_id": companion_id,
-                    "msg_count": limit,
-                },
-            ).execute()
+            with rpc_seconds.time(rpc="get_recent_chat_logs"):
+                result = await asyncio.to_thread(sb.rpc(
+                    "get_recent_chat_logs",
+                    {
+                        "target_companion_id": companion_id,
+                        "msg_count": limit,
+                    },
+                ).execute)
             logs = result.data or []
             logs.reverse()
             return logs
         except Exception:
             return []
+
+
+@lru_cache()
+def get_llm_engine() -> LLMEngine:
+    return LLMEngine()
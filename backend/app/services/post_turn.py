@@ -0,0 +1,104 @@
+"""
+Per-companion background scheduler for post-turn checks.
+
+Checks such as the naming ceremony and MBTI discovery used to run inline
+after every reply, paying for counts and LLM calls on each turn. Here each
+check runs off the turn path, at most every `cadence` turns, and backs off
+exponentially (in turns) after a failure or an unpromising result. A
+check that reports DONE never runs again for this actor; whatever it
+produces is handed to `publish` once the companion's current turn is over,
+and if publishing fails the check backs off and runs again.
+"""
+
+import asyncio
+import logging
+from dataclasses import dataclass
+from typing import Awaitable, Callable
+
+logger = logging.getLogger(__name__)
+
+# Outcomes a check reports
+CHECK_DONE = "done"          # finished for good (e.g. already named)
+CHECK_NOT_YET = "not_yet"    # not eligible yet (too few turns); no cost spent
+CHECK_RETRY = "retry"        # ran and failed / scored low; back off
+
+
+@dataclass
+class CheckOutcome:
+    status: str
+    event: dict | None = None
+
+
+@dataclass
+class PostTurnCheck:
+    name: str
+    run: Callable[[], Awaitable[CheckOutcome]]
+    # Scheduling state
+    next_turn: int = 0
+    failures: int = 0
+    done: bool = False
+    task: asyncio.Task | None = None
+
+
+class PostTurnScheduler:
+    def __init__(
+        self,
+        publish: Callable[[CheckOutcome], Awaitable[None]],
+        cadence_turns: int = 3,
+        max_backoff_turns: int = 48,
+    ):
+        self.publish = publish
+        self.cadence_turns = cadence_turns
+        self.max_backoff_turns = max_backoff_turns
+        self.checks: list[PostTurnCheck] = []
+
+    def add(self, name: str, run: Callable[[], Awaitable[CheckOutcome]]) -> None:
+        self.checks.append(PostTurnCheck(name, run))
+
+    def on_turn(self, turn: int) -> None:
+        """Called after every completed turn; starts the checks that are due."""
+        for check in self.checks:
+            if check.done or turn < check.next_turn:
+                continue
+            if check.task is not None and not check.task.done():
+                continue
+            check.task = asyncio.create_task(self._run(check, turn))
+
+    async def _run(self, check: PostTurnCheck, turn: int) -> None:
+        try:
+            outcome = await check.run()
+        except Exception as e:
+            logger.warning("Post-turn check %s failed: %s", check.name, e)
+            outcome = CheckOutcome(CHECK_RETRY)
+
+        if outcome.status == CHECK_DONE:
+            check.done = True
+        elif outcome.status == CHECK_RETRY:
+            self._back_off(check, turn)
+        else:
+            check.next_turn = turn + self.cadence_turns
+
+        if outcome.event:
+            try:
+                await self.publish(outcome)
+            except Exception as e:
+                logger.warning("Publishing %s result failed: %s", check.name, e)
+                # Undelivered: the check has to produce it again
+                check.done = False
+                self._back_off(check, turn)
+
+    def _back_off(self, check: PostTurnCheck, turn: int) -> None:
+        check.failures += 1
+        backoff = min(self.max_backoff_turns, self.cadence_turns * 2 ** check.failures)
+        check.next_turn = turn + backoff
+        logger.info("Post-turn check %s backing off %d turns", check.name, backoff)
+
+    @property
+    def busy(self) -> bool:
+        """Whether any check is running right now."""
+        return any(c.task is not None and not c.task.done() for c in self.checks)
+
+    def close(self) -> None:
+        for check in self.checks:
+            if check.task is not None and not check.task.done():
+                check.task.cancel()
@@ -0,0 +1,90 @@
+"""
+A reply stream read in the background.
+
+The turn normally reads the gateway's chat stream inline. Speculative
+and hedged replies need to open a stream before deciding whether to use
+it: BufferedReply opens and reads it in its own task, holds the content
+until the turn consumes it (or closes it) and tells when the first token
+has arrived.
+"""
+
+import asyncio
+import time
+from typing import AsyncIterator, Awaitable, Callable
+
+_END = object()
+
+
+class BufferedReply:
+    def __init__(self, open_stream: Callable[[], Awaitable[AsyncIterator]], model: str, system_prompt: str):
+        self.model = model
+        self.system_prompt = system_prompt
+        self.started = time.monotonic()
+        self.first_token_at: float | None = None
+        self.failed = False
+        # Set on the first token, or when the stream ends/fails without one
+        self.ready = asyncio.Event()
+        self._received: list[str] = []
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self._task = asyncio.create_task(self._pump(open_stream))
+
+    @property
+    def received_text(self) -> str:
+        return "".join(self._received)
+
+    async def _pump(self, open_stream) -> None:
+        stream = None
+        try:
+            stream = await open_stream()
+            async for chunk in stream:
+                content = chunk.choices[0].delta.content
+                if content:
+                    if self.first_token_at is None:
+                        self.first_token_at = time.monotonic()
+                        self.ready.set()
+                    self._received.append(content)
+                    self._queue.put_nowait(content)
+        except Exception as e:
+            self.failed = True
+            self._queue.put_nowait(e)
+        finally:
+            # Closing the gateway stream releases its limiter slot
+            if stream is not None:
+                await stream.aclose()
+            self._queue.put_nowait(_END)
+            self.ready.set()
+
+    async def wait_ready(self, timeout: float | None = None) -> bool:
+        """Wait for the first token (or the end of the stream); False on timeout."""
+        try:
+            await asyncio.wait_for(self.ready.wait(), timeout)
+        except asyncio.TimeoutError:
+            return False
+        return True
+
+    def _on_first_delivery(self) -> None:
+        pass
+
+    async def contents(self) -> AsyncIterator[str]:
+        """Held, then live, content deltas; re-raises the stream's error."""
+        first = True
+        while True:
+            item = await self._queue.get()
+            if item is _END:
+                return
+            if isinstance(item, Exception):
+                raise item
+            if first:
+                first = False
+                self._on_first_delivery()
+            yield item
+
+    async def close(self) -> None:
+        """Stop reading and close the upstream stream (no-op once it ended)."""
+        if not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                if asyncio.current_task().cancelling():
+                    raise
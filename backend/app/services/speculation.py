@@ -0,0 +1,94 @@
+"""
+Speculative replies for routed turns.
+
+Routed (SOULMATE) turns can't start generating until the smart router
+has answered, so every reply's TTFT includes a classifier round trip.
+With SPECULATIVE_GENERATION on, the turn starts a reply with the default
+intent's model on default-intent context as soon as that context is
+ready, in parallel with the router, and holds its chunks back. When the
+router decides:
+
+  * same model — hit: the held chunks are released and the stream
+    continues, so the reply started up to a router round trip earlier;
+  * another model, but an intent listed in SPECULATIVE_KEEP_INTENTS —
+    kept: as a hit, the speculative model answers this turn;
+  * otherwise — miss: the speculative stream is closed and the turn
+    generates with the routed model; what it consumed is counted as
+    wasted tokens.
+
+If the router answers before the context is ready there is nothing to
+gain and no speculation starts (skipped).
+"""
+
+import time
+from typing import AsyncIterator, Awaitable, Callable
+
+from app.core.metrics import counter, histogram
+from app.core.openai_gateway import approx_tokens
+from app.core.router import RouterResult
+from app.services.reply_stream import BufferedReply
+
+SPECULATION_HIT = "hit"
+SPECULATION_KEPT = "kept"
+SPECULATION_MISS = "miss"
+SPECULATION_SKIPPED = "skipped"
+
+speculations_total = counter(
+    "chat_speculations_total",
+    "Routed turns by speculative reply outcome (hit, kept, miss, skipped)",
+    ("outcome",),
+)
+ttft_saved_seconds = histogram(
+    "chat_speculation_ttft_saved_seconds",
+    "Time to first token saved by speculative replies that were used",
+)
+wasted_tokens_total = counter(
+    "chat_speculation_wasted_tokens_total",
+    "Approximate tokens spent on discarded speculative replies",
+    ("direction",),
+)
+
+
+def parse_keep_intents(value: str) -> frozenset[str]:
+    return frozenset(intent.strip() for intent in value.split(",") if intent.strip())
+
+
+class SpeculativeReply(BufferedReply):
+    """A reply stream opened before routing finished, held until the turn
+    resolves the speculation."""
+
+    def __init__(
+        self,
+        open_stream: Callable[[], Awaitable[AsyncIterator]],
+        model: str,
+        system_prompt: str,
+        prompt_tokens: int,
+    ):
+        super().__init__(open_stream, model, system_prompt)
+        self.prompt_tokens = prompt_tokens
+        self.resolved_at: float | None = None
+
+    def resolve(self, route: RouterResult, keep_intents: frozenset[str]) -> str:
+        """Decide whether this reply answers the turn; returns the outcome.
+        On a miss the caller must discard() it."""
+        self.resolved_at = time.monotonic()
+        if route.model == self.model:
+            outcome = SPECULATION_HIT
+        elif route.intent in keep_intents:
+            outcome = SPECULATION_KEPT
+        else:
+            outcome = SPECULATION_MISS
+        speculations_total.inc(outcome=outcome)
+        return outcome
+
+    def _on_first_delivery(self) -> None:
+        # Without speculation the stream would have opened at resolve time
+        # and taken as long to its first token
+        resolved_at = self.resolved_at or time.monotonic()
+        ttft_saved_seconds.observe(min(resolved_at, self.first_token_at) - self.started)
+
+    async def discard(self) -> None:
+        """Close the upstream stream and count what it consumed as wasted."""
+        wasted_tokens_total.inc(self.prompt_tokens, direction="prompt")
+        wasted_tokens_total.inc(approx_tokens(self.received_text), direction="completion")
+        await self.close()
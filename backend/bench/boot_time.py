@@ -0,0 +1,150 @@
+"""
+Worker boot-to-ready benchmark.
+
+Measures, over fresh interpreters (nothing cached in-process):
+
+  * import: time to `import app.main` (what every worker pays before it
+    can serve),
+  * ready: from spawning `uvicorn app.main:app` to the first 200 from
+    /health (interpreter start + import + lifespan startup),
+  * deferred: time to import the SDKs the app now loads lazily
+    (main.PRELOAD_MODULES) — paid in the background preload thread, or by
+    the first request that needs them when PRELOAD_SDKS is off,
+
+and lists the modules with the largest cumulative import time
+(`python -X importtime`), so a new eager import shows up by name.
+With --max-import-ms / --max-ready-ms it exits 1 when a median exceeds
+the budget, for tracking in CI.
+
+Usage:
+    python -m bench.boot_time [--runs 5] [--top 15] [--max-import-ms 1000] [--max-ready-ms 3000]
+                              [--json results.json]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+import httpx
+
+from bench.ws_load import BACKEND_DIR, free_port
+
+ENV_DEFAULTS = {
+    "OPENAI_API_KEY": "bench",
+    "SUPABASE_URL": "http://localhost",
+    "SUPABASE_SERVICE_ROLE_KEY": "bench",
+}
+IMPORT_SNIPPET = (
+    "import time; t = time.perf_counter(); import app.main; "
+    "print((time.perf_counter() - t) * 1000)"
+)
+DEFERRED_SNIPPET = (
+    "import time; import app.main; t = time.perf_counter(); app.main.preload_sdks(); "
+    "print((time.perf_counter() - t) * 1000)"
+)
+
+
+def child_env() -> dict:
+    return {**ENV_DEFAULTS, **os.environ, "PYTHONPATH": BACKEND_DIR}
+
+
+def run_snippet(snippet: str) -> float:
+    out = subprocess.run(
+        [sys.executable, "-c", snippet], cwd=BACKEND_DIR, env=child_env(),
+        capture_output=True, text=True, check=True,
+    )
+    return float(out.stdout.strip().splitlines()[-1])
+
+
+def time_to_ready(timeout: float = 60.0) -> float:
+    port = free_port()
+    started = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND_DIR, env=child_env(),
+    )
+    try:
+        with httpx.Client(timeout=1.0) as client:
+            while time.perf_counter() - started < timeout:
+                if process.poll() is not None:
+                    raise RuntimeError(f"uvicorn exited with {process.returncode} before becoming ready")
+                try:
+                    if client.get(f"http://127.0.0.1:{port}/health").status_code == 200:
+                        return (time.perf_counter() - started) * 1000
+                except httpx.TransportError:
+                    pass
+                time.sleep(0.01)
+        raise TimeoutError(f"worker not ready after {timeout:.0f}s")
+    finally:
+        process.terminate()
+        try:
+            process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+
+def slowest_imports(top: int) -> list[tuple[str, float]]:
+    """(module, cumulative ms) of the slowest top-level-ish imports."""
+    out = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app.main"], cwd=BACKEND_DIR, env=child_env(),
+        capture_output=True, text=True, check=True,
+    )
+    modules = []
+    for line in out.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        if cumulative.strip().isdigit():
+            modules.append((name.rstrip(), int(cumulative) / 1000))
+    modules.sort(key=lambda m: m[1], reverse=True)
+    return modules[:top]
+
+
+def summarize(samples: list[float]) -> dict:
+    return {"median": statistics.median(samples), "min": min(samples), "max": max(samples)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15, help="slowest imports to list")
+    parser.add_argument("--max-import-ms", type=float, help="fail if the median import time exceeds this")
+    parser.add_argument("--max-ready-ms", type=float, help="fail if the median boot-to-ready time exceeds this")
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args()
+
+    results = {
+        "import_ms": summarize([run_snippet(IMPORT_SNIPPET) for _ in range(args.runs)]),
+        "ready_ms": summarize([time_to_ready() for _ in range(args.runs)]),
+        "deferred_ms": summarize([run_snippet(DEFERRED_SNIPPET) for _ in range(args.runs)]),
+        "slowest_imports": slowest_imports(args.top),
+    }
+
+    for key, label in (("import_ms", "import app.main"), ("ready_ms", "boot to ready"),
+                       ("deferred_ms", "deferred SDKs")):
+        r = results[key]
+        print(f"{label:<16} median={r['median']:8.1f}ms  min={r['min']:8.1f}ms  max={r['max']:8.1f}ms")
+    print("\nslowest imports (cumulative):")
+    for name, ms in results["slowest_imports"]:
+        print(f"  {ms:8.1f}ms  {name}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+    failures = []
+    if args.max_import_ms is not None and results["import_ms"]["median"] > args.max_import_ms:
+        failures.append(f"import {results['import_ms']['median']:.0f}ms > {args.max_import_ms:.0f}ms")
+    if args.max_ready_ms is not None and results["ready_ms"]["median"] > args.max_ready_ms:
+        failures.append(f"ready {results['ready_ms']['median']:.0f}ms > {args.max_ready_ms:.0f}ms")
+    if failures:
+        print("\nOVER BUDGET: " + "; ".join(failures))
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""
+Payload size and latency of the companion REST reads for a multi-year user.
+
+Compares full-history reads against keyset pages, field projection and
+conditional revalidation (If-None-Match → 304). Runs the real endpoint
+code in-process against the in-memory Supabase stand-in, so latency here
+is API-side serialization/transfer cost, not database time.
+
+Usage:
+    python -m bench.companion_reads [--years 5] [--iterations 200]
+"""
+
+import argparse
+import os
+import statistics
+import time
+
+os.environ.setdefault("OPENAI_API_KEY", "bench")
+os.environ.setdefault("SUPABASE_URL", "http://localhost")
+os.environ.setdefault("SUPABASE_SERVICE_ROLE_KEY", "bench")
+
+from fastapi.testclient import TestClient  # noqa: E402
+
+from app.main import app  # noqa: E402
+from bench.fake_supabase import FakeSupabase, install, seed_multi_year_user  # noqa: E402
+
+
+def percentile(samples: list[float], pct: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def measure(client: TestClient, label: str, url: str, iterations: int, revalidate: bool = False):
+    headers = {}
+    if revalidate:
+        headers["If-None-Match"] = client.get(url).headers["etag"]
+
+    timings, size, status = [], 0, None
+    for _ in range(iterations):
+        started = time.perf_counter()
+        response = client.get(url, headers=headers)
+        timings.append((time.perf_counter() - started) * 1000)
+        size, status = len(response.content), response.status_code
+
+    print(
+        f"{label:<42} status={status}  bytes={size:>9,}  "
+        f"p50={statistics.median(timings):7.2f}ms  p99={percentile(timings, 99):7.2f}ms"
+    )
+
+
+def measure_all_pages(client: TestClient, label: str, url: str, iterations: int):
+    """Follow X-Next-Cursor to the end: the cost of re-downloading a full history."""
+    timings, size = [], 0
+    for _ in range(iterations):
+        started, size, next_url = time.perf_counter(), 0, url
+        while next_url:
+            response = client.get(next_url)
+            size += len(response.content)
+            cursor = response.headers.get("x-next-cursor")
+            next_url = f"{url}&cursor={cursor}" if cursor else None
+        timings.append((time.perf_counter() - started) * 1000)
+
+    print(
+        f"{label:<42} status=200  bytes={size:>9,}  "
+        f"p50={statistics.median(timings):7.2f}ms  p99={percentile(timings, 99):7.2f}ms"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--years", type=int, default=5)
+    parser.add_argument("--iterations", type=int, default=200)
+    args = parser.parse_args()
+
+    fake = FakeSupabase()
+    install(fake)
+    user_id, companion_id = seed_multi_year_user(fake, years=args.years)
+    client = TestClient(app)
+    n = args.iterations
+    api = "/api/v1"
+
+    print(f"Multi-year user: {args.years} years, "
+          f"{len(fake.tables['Daily_Emotions'])} daily emotions, "
+          f"{len(fake.tables['User_Inventory'])} gems\n")
+
+    measure(client, "companion (full row)", f"{api}/companions/{companion_id}", n)
+    measure(client, "companion fields=name,tone_style", f"{api}/companions/{companion_id}?fields=name,tone_style", n)
+    measure(client, "companion revalidate (304)", f"{api}/companions/{companion_id}", n, revalidate=True)
+    print()
+    measure_all_pages(client, "emotions full history (all pages)", f"{api}/emotions/{companion_id}?limit=500", max(1, n // 10))
+    measure(client, "emotions first page (limit=100)", f"{api}/emotions/{companion_id}?limit=100", n)
+    measure(client, "emotions page fields=date,color_hex", f"{api}/emotions/{companion_id}?limit=100&fields=date,color_hex", n)
+    measure(client, "emotions revalidate (304)", f"{api}/emotions/{companion_id}?limit=100", n, revalidate=True)
+    print()
+    measure(client, "inventory (limit=500)", f"{api}/inventory/{user_id}?limit=500", n)
+    measure(client, "inventory first page (limit=12)", f"{api}/inventory/{user_id}?limit=12", n)
+    measure(client, "inventory revalidate (304)", f"{api}/inventory/{user_id}?limit=12", n, revalidate=True)
+    print()
+    measure(client, "dashboard (one round trip)", f"{api}/dashboard/{user_id}", n)
+    measure(client, "dashboard revalidate (304)", f"{api}/dashboard/{user_id}", n, revalidate=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,227 @@
+"""
+Deterministic local stand-in for the OpenAI HTTP API.
+
+Serves the endpoints the backend calls (chat completions, streaming or
+not, and embeddings) with configurable first-byte latency, streaming
+token rate and 429 injection, so load tests exercise the real gateway,
+limiter and streaming code without the network or a bill. Randomness
+(latency jitter, which requests get a 429) comes from a seeded RNG, so
+runs with the same seed and request order are reproducible.
+
+Point the backend at it with OPENAI_BASE_URL=http://127.0.0.1:<port>/v1.
+
+Usage:
+    python -m bench.fake_openai [--port 9100] [--latency-ms 300] [--tokens-per-second 40]
+                                [--rate-limit-ratio 0.02] [--seed 1]
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import math
+import random
+import time
+from dataclasses import dataclass
+from functools import lru_cache
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+# Returned by every non-streaming completion: valid JSON for the smart
+# router, the naming classifier and the sentiment check alike
+CLASSIFIER_REPLY = {"intent": "casual_chat", "reason": "fake", "name": "NONE", "score": 0.5}
+REPLY_WORDS = ["오늘", "하루는", "어땠어?", "나는", "네", "얘기를", "듣는", "게", "좋아."]
+
+
+@dataclass
+class FakeOpenAIConfig:
+    latency_ms: float = 300.0        # time to first byte (both modes)
+    jitter_ms: float = 50.0          # uniform ± jitter on latency
+    tokens_per_second: float = 40.0  # streaming rate
+    reply_tokens: int = 60           # streamed tokens when max_tokens allows
+    rate_limit_ratio: float = 0.0    # share of requests answered 429
+    retry_after_ms: int = 200
+    embedding_dims: int = 1536
+    seed: int = 1
+
+
+@lru_cache(maxsize=4096)
+def fake_embedding(text: str, dims: int) -> list[float]:
+    """Deterministic unit vector derived from the text (cached; don't mutate)."""
+    rng = random.Random(hashlib.sha256(text.encode()).digest())
+    vector = [rng.uniform(-1.0, 1.0) for _ in range(dims)]
+    norm = math.sqrt(sum(x * x for x in vector)) or 1.0
+    return [x / norm for x in vector]
+
+
+def completion_chunk(model: str, created: int, delta: dict, finish: str | None = None) -> str:
+    """One SSE event of a streamed chat completion."""
+    payload = {
+        "id": "chatcmpl-fake",
+        "object": "chat.completion.chunk",
+        "created": created,
+        "model": model,
+        "choices": [{"index": 0, "delta": delta, "finish_reason": finish}],
+    }
+    return f"data: {json.dumps(payload, ensure_ascii=False)}\n\n"
+
+
+def usage_chunk(model: str, created: int, usage: dict) -> str:
+    payload = {
+        "id": "chatcmpl-fake",
+        "object": "chat.completion.chunk",
+        "created": created,
+        "model": model,
+        "choices": [],
+        "usage": usage,
+    }
+    return f"data: {json.dumps(payload)}\n\n"
+
+
+def _usage(prompt_tokens: int, completion_tokens: int) -> dict:
+    return {
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": completion_tokens,
+        "total_tokens": prompt_tokens + completion_tokens,
+    }
+
+
+def _prompt_tokens(body: dict) -> int:
+    text = "".join(str(m.get("content", "")) for m in body.get("messages") or [])
+    text += json.dumps(body.get("input", ""))
+    return max(1, len(text) // 3)
+
+
+def create_app(config: FakeOpenAIConfig) -> FastAPI:
+    app = FastAPI(title="fake-openai")
+    rng = random.Random(config.seed)
+    stats = {"requests": 0, "rate_limited": 0, "streams": 0}
+
+    async def first_byte() -> None:
+        jitter = rng.uniform(-config.jitter_ms, config.jitter_ms)
+        await asyncio.sleep(max(0.0, config.latency_ms + jitter) / 1000)
+
+    def rate_limited() -> JSONResponse | None:
+        stats["requests"] += 1
+        if rng.random() >= config.rate_limit_ratio:
+            return None
+        stats["rate_limited"] += 1
+        return JSONResponse(
+            {"error": {"message": "Rate limit reached (fake)", "type": "requests", "code": "rate_limit_exceeded"}},
+            status_code=429,
+            headers={
+                "retry-after-ms": str(config.retry_after_ms),
+                "x-ratelimit-remaining-requests": "0",
+                "x-ratelimit-reset-requests": f"{config.retry_after_ms}ms",
+            },
+        )
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        if (limited := rate_limited()) is not None:
+            return limited
+        await first_byte()
+
+        model = body.get("model", "gpt-4o-mini")
+        prompt_tokens = _prompt_tokens(body)
+        created = int(time.time())
+
+        if not body.get("stream"):
+            content = json.dumps(CLASSIFIER_REPLY)
+            return {
+                "id": "chatcmpl-fake",
+                "object": "chat.completion",
+                "created": created,
+                "model": model,
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": content},
+                    "finish_reason": "stop",
+                }],
+                "usage": _usage(prompt_tokens, len(content) // 3),
+            }
+
+        stats["streams"] += 1
+        tokens = min(config.reply_tokens, body.get("max_tokens") or config.reply_tokens)
+        include_usage = (body.get("stream_options") or {}).get("include_usage")
+
+        def chunk(delta: dict, finish: str | None = None) -> str:
+            return completion_chunk(model, created, delta, finish)
+
+        async def events():
+            yield chunk({"role": "assistant", "content": ""})
+            interval = 1.0 / config.tokens_per_second if config.tokens_per_second > 0 else 0.0
+            for i in range(tokens):
+                if interval:
+                    await asyncio.sleep(interval)
+                yield chunk({"content": REPLY_WORDS[i % len(REPLY_WORDS)] + " "})
+            yield chunk({}, "stop")
+            if include_usage:
+                yield usage_chunk(model, created, _usage(prompt_tokens, tokens))
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    @app.post("/v1/embeddings")
+    async def embeddings(request: Request):
+        body = await request.json()
+        if (limited := rate_limited()) is not None:
+            return limited
+        await first_byte()
+        inputs = body.get("input")
+        inputs = inputs if isinstance(inputs, list) else [inputs]
+        return {
+            "object": "list",
+            "data": [
+                {"object": "embedding", "index": i, "embedding": fake_embedding(str(text), config.embedding_dims)}
+                for i, text in enumerate(inputs)
+            ],
+            "model": body.get("model", "text-embedding-3-small"),
+            "usage": {"prompt_tokens": _prompt_tokens(body), "total_tokens": _prompt_tokens(body)},
+        }
+
+    @app.get("/stats")
+    async def get_stats():
+        return stats
+
+    return app
+
+
+def add_arguments(parser: argparse.ArgumentParser) -> None:
+    defaults = FakeOpenAIConfig()
+    parser.add_argument("--latency-ms", type=float, default=defaults.latency_ms)
+    parser.add_argument("--jitter-ms", type=float, default=defaults.jitter_ms)
+    parser.add_argument("--tokens-per-second", type=float, default=defaults.tokens_per_second)
+    parser.add_argument("--reply-tokens", type=int, default=defaults.reply_tokens)
+    parser.add_argument("--rate-limit-ratio", type=float, default=defaults.rate_limit_ratio)
+    parser.add_argument("--embedding-dims", type=int, default=defaults.embedding_dims)
+    parser.add_argument("--seed", type=int, default=defaults.seed)
+
+
+def config_from_args(args: argparse.Namespace) -> FakeOpenAIConfig:
+    return FakeOpenAIConfig(
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        tokens_per_second=args.tokens_per_second,
+        reply_tokens=args.reply_tokens,
+        rate_limit_ratio=args.rate_limit_ratio,
+        embedding_dims=args.embedding_dims,
+        seed=args.seed,
+    )
+
+
+def main():
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9100)
+    add_arguments(parser)
+    args = parser.parse_args()
+    uvicorn.run(create_app(config_from_args(args)), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
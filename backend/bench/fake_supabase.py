@@ -0,0 +1,580 @@
+"""
+In-memory stand-in for the subset of supabase-py used by the backend.
+
+Implements the PostgREST query-builder chain (select/insert/upsert/update,
+eq/gt/lt/in_/or_ filters, order/limit, single/maybe_single, exact counts)
+and the SQL RPCs from migrations/ over plain Python lists, so benchmarks
+can drive the real endpoint code without a database.
+
+    fake = FakeSupabase()
+    install(fake)          # patch get_supabase_client in every loaded app/cron module
+"""
+
+from __future__ import annotations
+
+import math
+import re
+import sys
+import threading
+import uuid
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, Callable
+
+# Primary key and generated-column defaults per table
+TABLE_KEYS: dict[str, tuple[str, ...]] = {
+    "Companions": ("companion_id",),
+    "Chat_Logs": ("log_id",),
+    "Daily_Emotions": ("date", "companion_id"),
+    "Monthly_Emotions": ("companion_id", "month"),
+    "User_Inventory": ("item_id",),
+    "Subscriptions": ("user_id",),
+    "Gem_Staging": ("companion_id", "month"),
+    "Cache_Generations": ("key",),
+    "Cron_Watermarks": ("job",),
+    "Analysis_Retries": ("companion_id", "day"),
+    "Background_Jobs": ("job_id",),
+}
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+TABLE_DEFAULTS: dict[str, dict[str, Callable[[], Any]]] = {
+    "Companions": {
+        "companion_id": lambda: str(uuid.uuid4()),
+        "summary": lambda: "",
+        "active_traits": dict,
+        "timezone": lambda: "UTC",
+        "created_at": _now,
+    },
+    "Chat_Logs": {"timestamp": _now},
+    "Daily_Emotions": {"created_at": _now},
+    "User_Inventory": {"item_id": lambda: str(uuid.uuid4()), "acquired_at": _now},
+    "Subscriptions": {"plan_type": lambda: "FREE", "is_active": lambda: True},
+    "Gem_Staging": {"created_at": _now},
+    "Background_Jobs": {"created_at": _now, "updated_at": _now},
+}
+
+
+@dataclass
+class FakeResponse:
+    data: Any
+    count: int | None = None
+
+
+class FakeAPIError(Exception):
+    pass
+
+
+def _coerce(stored: Any, raw: Any) -> Any:
+    """Coerce a filter value to the type of the stored column value."""
+    if isinstance(raw, str) and len(raw) >= 2 and raw[0] == raw[-1] == '"':
+        raw = raw[1:-1]
+    if isinstance(stored, bool):
+        return str(raw).lower() == "true"
+    if isinstance(stored, (int, float)):
+        return float(raw)
+    return str(raw) if raw is not None else None
+
+
+def _compare(stored: Any, op: str, raw: Any) -> bool:
+    if op == "is":
+        return stored is None if str(raw).lower() == "null" else stored == _coerce(stored, raw)
+    if stored is None:
+        return False
+    if op == "in":
+        return str(stored) in {str(v) for v in raw}
+    value = _coerce(stored, raw)
+    stored = float(stored) if isinstance(stored, (int, float)) and not isinstance(stored, bool) else stored
+    if not isinstance(stored, (int, float, bool)):
+        stored = str(stored)
+    return {
+        "eq": lambda: stored == value,
+        "neq": lambda: stored != value,
+        "gt": lambda: stored > value,
+        "gte": lambda: stored >= value,
+        "lt": lambda: stored < value,
+        "lte": lambda: stored <= value,
+    }[op]()
+
+
+def _split_top_level(expr: str) -> list[str]:
+    parts, depth, buf, quoted = [], 0, "", False
+    for ch in expr:
+        if ch == '"':
+            quoted = not quoted
+        if not quoted and ch == "(":
+            depth += 1
+        elif not quoted and ch == ")":
+            depth -= 1
+        if ch == "," and depth == 0 and not quoted:
+            parts.append(buf)
+            buf = ""
+        else:
+            buf += ch
+    if buf:
+        parts.append(buf)
+    return parts
+
+
+def _parse_logic(expr: str, conjunction: str) -> Callable[[dict], bool]:
+    """Parse a PostgREST or=(...)/and(...) filter tree into a row predicate."""
+    terms = []
+    for part in _split_top_level(expr):
+        match = re.fullmatch(r"(and|or)\((.*)\)", part)
+        if match:
+            terms.append(_parse_logic(match.group(2), match.group(1)))
+            continue
+        column, op, value = part.split(".", 2)
+        terms.append(lambda row, c=column, o=op, v=value: _compare(row.get(c), o, v))
+    combine = all if conjunction == "and" else any
+    return lambda row: combine(term(row) for term in terms)
+
+
+class FakeQuery:
+    def __init__(self, db: "FakeSupabase", table: str):
+        self.db = db
+        self.table = table
+        self.action = "select"
+        self.columns: list[str] | None = None
+        self.count_mode: str | None = None
+        self.payload: Any = None
+        self.on_conflict: tuple[str, ...] | None = None
+        self.ignore_duplicates = False
+        self.predicates: list[Callable[[dict], bool]] = []
+        self.orders: list[tuple[str, bool]] = []
+        self.row_limit: int | None = None
+        self.single_mode: str | None = None
+
+    # ── Actions ──
+    def select(self, columns: str = "*", count: str | None = None) -> "FakeQuery":
+        self.columns = None if columns.strip() == "*" else [c.strip() for c in columns.split(",")]
+        self.count_mode = count
+        return self
+
+    def insert(self, rows) -> "FakeQuery":
+        self.action, self.payload = "insert", rows
+        return self
+
+    def upsert(self, rows, on_conflict: str = "", ignore_duplicates: bool = False) -> "FakeQuery":
+        self.action, self.payload = "upsert", rows
+        self.on_conflict = tuple(c.strip() for c in on_conflict.split(",")) if on_conflict else None
+        self.ignore_duplicates = ignore_duplicates
+        return self
+
+    def update(self, values: dict) -> "FakeQuery":
+        self.action, self.payload = "update", values
+        return self
+
+    def delete(self) -> "FakeQuery":
+        self.action = "delete"
+        return self
+
+    # ── Filters ──
+    def _filter(self, column: str, op: str, value) -> "FakeQuery":
+        self.predicates.append(lambda row: _compare(row.get(column), op, value))
+        return self
+
+    def eq(self, column, value):
+        return self._filter(column, "eq", value)
+
+    def neq(self, column, value):
+        return self._filter(column, "neq", value)
+
+    def gt(self, column, value):
+        return self._filter(column, "gt", value)
+
+    def gte(self, column, value):
+        return self._filter(column, "gte", value)
+
+    def lt(self, column, value):
+        return self._filter(column, "lt", value)
+
+    def lte(self, column, value):
+        return self._filter(column, "lte", value)
+
+    def in_(self, column, values):
+        return self._filter(column, "in", list(values))
+
+    def is_(self, column, value):
+        return self._filter(column, "is", value)
+
+    def or_(self, filters: str) -> "FakeQuery":
+        self.predicates.append(_parse_logic(filters, "or"))
+        return self
+
+    # ── Modifiers ──
+    def order(self, column: str, desc: bool = False, **_) -> "FakeQuery":
+        self.orders.append((column, desc))
+        return self
+
+    def limit(self, size: int) -> "FakeQuery":
+        self.row_limit = size
+        return self
+
+    def single(self) -> "FakeQuery":
+        self.single_mode = "single"
+        return self
+
+    def maybe_single(self) -> "FakeQuery":
+        self.single_mode = "maybe_single"
+        return self
+
+    # ── Execution ──
+    def _project(self, row: dict) -> dict:
+        if self.columns is None:
+            return dict(row)
+        return {c: row.get(c) for c in self.columns}
+
+    def execute(self):
+        with self.db.lock:
+            self.db.calls[f"{self.action}:{self.table}"] += 1
+            rows = self.db.tables.setdefault(self.table, [])
+            if self.action == "select":
+                return self._execute_select(rows)
+            if self.action in ("insert", "upsert"):
+                return self._execute_write(rows)
+            matched = [r for r in rows if all(p(r) for p in self.predicates)]
+            if self.action == "update":
+                for row in matched:
+                    row.update(self.payload)
+            else:
+                self.db.tables[self.table] = [r for r in rows if r not in matched]
+            return FakeResponse(data=[dict(r) for r in matched])
+
+    def _execute_select(self, rows: list[dict]):
+        matched = [r for r in rows if all(p(r) for p in self.predicates)]
+        for column, desc in reversed(self.orders):
+            matched.sort(key=lambda r: (r.get(column) is None, r.get(column)), reverse=desc)
+        total = len(matched)
+        if self.row_limit is not None:
+            matched = matched[: self.row_limit]
+        data = [self._project(r) for r in matched]
+        count = total if self.count_mode == "exact" else None
+        if self.single_mode:
+            if not data:
+                if self.single_mode == "maybe_single":
+                    return None
+                raise FakeAPIError("JSON object requested, multiple (or no) rows returned")
+            return FakeResponse(data=data[0], count=count)
+        return FakeResponse(data=data, count=count)
+
+    def _execute_write(self, rows: list[dict]):
+        payload = self.payload if isinstance(self.payload, list) else [self.payload]
+        keys = self.on_conflict or TABLE_KEYS.get(self.table, ())
+        written = []
+        for item in payload:
+            row = self.db.with_defaults(self.table, item)
+            existing = None
+            if self.action == "upsert" and keys:
+                existing = next(
+                    (r for r in rows if all(str(r.get(k)) == str(row.get(k)) for k in keys)),
+                    None,
+                )
+            if existing is not None:
+                if self.ignore_duplicates:
+                    continue
+                existing.update(item)
+                written.append(dict(existing))
+            else:
+                rows.append(row)
+                written.append(dict(row))
+        return FakeResponse(data=written)
+
+
+class FakeRPC:
+    def __init__(self, db: "FakeSupabase", name: str, params: dict):
+        self.db, self.name, self.params = db, name, params
+
+    def execute(self):
+        handler = self.db.rpcs.get(self.name)
+        if handler is None:
+            raise FakeAPIError(f"Could not find the function public.{self.name}")
+        with self.db.lock:
+            self.db.calls[f"rpc:{self.name}"] += 1
+            return FakeResponse(data=handler(self.db, self.params))
+
+
+class _CallCounter(dict):
+    def __missing__(self, key):
+        return 0
+
+
+class FakeSupabase:
+    def __init__(self):
+        self.tables: dict[str, list[dict]] = {}
+        self.lock = threading.RLock()
+        self.calls: dict[str, int] = _CallCounter()
+        self._log_seq = 0
+        self.rpcs: dict[str, Callable[["FakeSupabase", dict], Any]] = {
+            "match_chat_logs": rpc_match_chat_logs,
+            "match_chat_logs_v2": rpc_match_chat_logs_v2,
+            "get_recent_chat_logs": rpc_get_recent_chat_logs,
+            "upsert_daily_emotion_with_rollup": rpc_upsert_daily_emotion_with_rollup,
+            "cache_generation": rpc_cache_generation,
+            "bump_cache_generation": rpc_bump_cache_generation,
+        }
+
+    def table(self, name: str) -> FakeQuery:
+        return FakeQuery(self, name)
+
+    def from_(self, name: str) -> FakeQuery:
+        return FakeQuery(self, name)
+
+    def rpc(self, name: str, params: dict | None = None) -> FakeRPC:
+        return FakeRPC(self, name, params or {})
+
+    def with_defaults(self, table: str, item: dict) -> dict:
+        row = {name: make() for name, make in TABLE_DEFAULTS.get(table, {}).items()}
+        row.update(item)
+        if table == "Chat_Logs" and "log_id" not in item:
+            self._log_seq += 1
+            row["log_id"] = self._log_seq
+        return row
+
+    def seed(self, table: str, rows: list[dict]) -> None:
+        """Bulk-load rows, applying column defaults."""
+        with self.lock:
+            target = self.tables.setdefault(table, [])
+            target.extend(self.with_defaults(table, r) for r in rows)
+
+
+# ── RPCs (mirrors of migrations/*.sql) ──
+def _cosine(a: list[float], b: list[float]) -> float:
+    dot = sum(x * y for x, y in zip(a, b))
+    norm = math.sqrt(sum(x * x for x in a)) * math.sqrt(sum(y * y for y in b))
+    return dot / norm if norm else 0.0
+
+
+def _logs_for(db: FakeSupabase, companion_id: str) -> list[dict]:
+    return [r for r in db.tables.get("Chat_Logs", []) if str(r.get("companion_id")) == str(companion_id)]
+
+
+def rpc_match_chat_logs(db: FakeSupabase, params: dict) -> list[dict]:
+    query = params["query_embedding"]
+    scored = [
+        {
+            "log_id": r["log_id"],
+            "companion_id": r["companion_id"],
+            "sender": r["sender"],
+            "message": r["message"],
+            "similarity": _cosine(r["embedding"], query),
+        }
+        for r in _logs_for(db, params["target_companion_id"])
+        if r.get("embedding")
+    ]
+    scored.sort(key=lambda r: r["similarity"], reverse=True)
+    return scored[: params.get("match_count", 5)]
+
+
+def rpc_match_chat_logs_v2(db: FakeSupabase, params: dict) -> list[dict]:
+    query = params["query_embedding"]
+    now = datetime.now(timezone.utc)
+    scored = []
+    for r in _logs_for(db, params["target_companion_id"]):
+        if not r.get("embedding"):
+            continue
+        similarity = _cosine(r["embedding"], query)
+        age_days = (now - datetime.fromisoformat(r["timestamp"])).total_seconds() / 86400.0
+        scored.append({
+            "log_id": r["log_id"],
+            "companion_id": r["companion_id"],
+            "sender": r["sender"],
+            "message": r["message"],
+            "similarity": similarity,
+            "created_at": r["timestamp"],
+            "final_score": similarity * (0.7 + 0.3 * math.exp(-age_days / 30.0)),
+        })
+    scored.sort(key=lambda r: r["final_score"], reverse=True)
+    return scored[: params.get("match_count", 8)]
+
+
+def rpc_get_recent_chat_logs(db: FakeSupabase, params: dict) -> list[dict]:
+    logs = sorted(_logs_for(db, params["target_companion_id"]), key=lambda r: r["timestamp"], reverse=True)
+    return [
+        {
+            "log_id": r["log_id"],
+            "companion_id": r["companion_id"],
+            "sender": r["sender"],
+            "message": r["message"],
+            "created_at": r["timestamp"],
+        }
+        for r in logs[: params.get("msg_count", 6)]
+    ]
+
+
+def rpc_upsert_daily_emotion_with_rollup(db: FakeSupabase, params: dict) -> None:
+    companion_id = params["target_companion_id"]
+    day = params["target_date"]
+    month = day[:7] + "-01"
+    daily = db.tables.setdefault("Daily_Emotions", [])
+    monthly = db.tables.setdefault("Monthly_Emotions", [])
+
+    rollup = next((r for r in monthly if r["companion_id"] == companion_id and r["month"] == month), None)
+    if rollup is None:
+        rollup = {
+            "companion_id": companion_id, "month": month, "emotion_counts": {},
+            "color_counts": {}, "day_count": 0, "version": 0,
+        }
+        monthly.append(rollup)
+
+    def bump(counts: dict, key, delta: int) -> None:
+        if key is None:
+            return
+        counts[key] = counts.get(key, 0) + delta
+        if counts[key] <= 0:
+            del counts[key]
+
+    old = next((r for r in daily if r["companion_id"] == companion_id and r["date"] == day), None)
+    if old:
+        bump(rollup["emotion_counts"], old.get("primary_emotion"), -1)
+        bump(rollup["color_counts"], old.get("color_hex"), -1)
+    else:
+        rollup["day_count"] += 1
+        old = db.with_defaults("Daily_Emotions", {"date": day, "companion_id": companion_id})
+        daily.append(old)
+    bump(rollup["emotion_counts"], params.get("new_primary_emotion"), 1)
+    bump(rollup["color_counts"], params.get("new_color_hex"), 1)
+    old.update({
+        "primary_emotion": params.get("new_primary_emotion"),
+        "color_hex": params.get("new_color_hex"),
+        "summary_text": params.get("new_summary_text"),
+        "key_quote": params.get("new_key_quote"),
+    })
+
+    def top(counts: dict):
+        return min(counts, key=lambda k: (-counts[k], k)) if counts else None
+
+    rollup.update({
+        "dominant_emotion": top(rollup["emotion_counts"]),
+        "dominant_color": top(rollup["color_counts"]),
+        "version": rollup["version"] + 1,
+        "updated_at": _now(),
+    })
+    return None
+
+
+def _next_cache_generation(db: FakeSupabase) -> int:
+    return max((r["generation"] for r in db.tables.get("Cache_Generations", [])), default=0) + 1
+
+
+def rpc_cache_generation(db: FakeSupabase, params: dict) -> int:
+    rows = db.tables.setdefault("Cache_Generations", [])
+    row = next((r for r in rows if r["key"] == params["p_key"]), None)
+    if row is None:
+        row = {"key": params["p_key"], "generation": _next_cache_generation(db)}
+        rows.append(row)
+    return row["generation"]
+
+
+def rpc_bump_cache_generation(db: FakeSupabase, params: dict) -> int:
+    rows = db.tables.setdefault("Cache_Generations", [])
+    generation = _next_cache_generation(db)
+    row = next((r for r in rows if r["key"] == params["p_key"]), None)
+    if row is None:
+        rows.append({"key": params["p_key"], "generation": generation})
+    else:
+        row["generation"] = generation
+    return generation
+
+
+def install(fake: FakeSupabase, prefixes: tuple[str, ...] = ("app.", "cron.")) -> None:
+    """Point get_supabase_client at the fake in every loaded backend module."""
+    # copy() snapshots atomically; the SDK preload thread may be importing
+    for name, module in sys.modules.copy().items():
+        if name.startswith(prefixes) and hasattr(module, "get_supabase_client"):
+            module.get_supabase_client = lambda: fake
+
+
+# ── Synthetic data ──
+def seed_multi_year_user(
+    fake: FakeSupabase, years: int = 5, gems_per_year: int = 12
+) -> tuple[str, str]:
+    """Seed one long-lived user: a companion with `years` of daily emotions and monthly gems.
+
+    Returns (user_id, companion_id).
+    """
+    user_id, companion_id = str(uuid.uuid4()), str(uuid.uuid4())
+    fake.seed("Companions", [{
+        "companion_id": companion_id,
+        "user_id": user_id,
+        "name": "별",
+        "relationship_type": "friend",
+        "tone_style": "INFP",
+        "summary": "사용자는 회사 일로 자주 지치지만 주말엔 산책을 좋아한다. " * 12,
+        "active_traits": {"voice_pack": True, "theme": "aurora"},
+    }])
+
+    emotions = [("기쁨", "#4CAF50"), ("슬픔", "#2196F3"), ("불안", "#9C27B0"), ("스트레스", "#F44336")]
+    today = date.today()
+    fake.seed("Daily_Emotions", [
+        {
+            "date": str(today - timedelta(days=i)),
+            "companion_id": companion_id,
+            "primary_emotion": emotions[i % 4][0],
+            "color_hex": emotions[i % 4][1],
+            "summary_text": "오늘은 친구와 오래 이야기를 나누며 마음이 한결 가벼워진 하루였다.",
+            "key_quote": "너랑 얘기하면 마음이 편해져.",
+        }
+        for i in range(365 * years)
+    ])
+
+    base_url = "http://localhost:8000/api/v1/media/gems/" + "0" * 64
+    fake.seed("User_Inventory", [
+        {
+            "user_id": user_id,
+            "item_type": "MEMORY_GEM",
+            "image_url": f"{base_url}.png",
+            "image_variants": {
+                "original": f"{base_url}.png",
+                "thumb": {"webp": f"{base_url}_256.webp", "avif": f"{base_url}_256.avif"},
+                "medium": {"webp": f"{base_url}_512.webp", "avif": f"{base_url}_512.avif"},
+            },
+            "metadata": {
+                "emotion": emotions[i % 4][0],
+                "color_hex": emotions[i % 4][1],
+                "dalle_prompt": "A high-end 3D render of a luminous jewelry gem, cinematic lighting. " * 4,
+                "source_days": 30,
+            },
+            "acquired_at": (datetime.now(timezone.utc) - timedelta(days=30 * i)).isoformat(),
+        }
+        for i in range(gems_per_year * years)
+    ])
+    return user_id, companion_id
+
+
+def load_user_ids(index: int) -> tuple[str, str]:
+    """(user_id, companion_id) of the index-th load-test user; stable across processes."""
+    return (
+        str(uuid.uuid5(uuid.NAMESPACE_URL, f"load-user-{index}")),
+        str(uuid.uuid5(uuid.NAMESPACE_URL, f"load-companion-{index}")),
+    )
+
+
+def seed_load_users(fake: FakeSupabase, users: int, tier: str = "SOULMATE") -> list[str]:
+    """Seed `users` named companions (one per user) for load tests.
+
+    IDs come from load_user_ids, so every worker process seeded with the
+    same count agrees on them. Returns the companion ids.
+    """
+    companion_ids = []
+    for i in range(users):
+        user_id, companion_id = load_user_ids(i)
+        fake.seed("Companions", [{
+            "companion_id": companion_id,
+            "user_id": user_id,
+            "name": "별",
+            "relationship_type": "friend",
+            "tone_style": "INFP",
+            "summary": "사용자는 회사 일로 자주 지치지만 주말엔 산책을 좋아한다.",
+        }])
+        fake.seed("Subscriptions", [{"user_id": user_id, "plan_type": tier}])
+        # Enough history that the greeting is skipped and retrieval has work to do
+        fake.seed("Chat_Logs", [
+            {"companion_id": companion_id, "sender": sender, "message": message}
+            for sender, message in [("AI", "안녕! 오늘 하루는 어땠어?"), ("USER", "좀 피곤했어")] * 5
+        ])
+        companion_ids.append(companion_id)
+    return companion_ids
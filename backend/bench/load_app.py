@@ -0,0 +1,31 @@
+"""
+ASGI entry point for load tests: the real `app.main:app` backed by the
+in-memory Supabase stand-in, seeded with LOAD_USERS companions.
+
+Each uvicorn worker imports this module and seeds the same companions
+(IDs are deterministic), so a multi-worker run needs no shared database.
+OpenAI is reached through OPENAI_BASE_URL (see bench/fake_openai.py).
+
+    LOAD_USERS=200 OPENAI_BASE_URL=http://127.0.0.1:9100/v1 \\
+        uvicorn bench.load_app:app --port 8100 --workers 2
+"""
+
+import os
+
+os.environ.setdefault("OPENAI_API_KEY", "bench")
+os.environ.setdefault("SUPABASE_URL", "http://localhost")
+os.environ.setdefault("SUPABASE_SERVICE_ROLE_KEY", "bench")
+os.environ.setdefault("SESSION_STATE_BACKEND", "memory")
+
+from app.main import app  # noqa: E402
+from bench.fake_supabase import FakeSupabase, install, seed_load_users  # noqa: E402
+
+fake = FakeSupabase()
+install(fake)
+seed_load_users(
+    fake,
+    int(os.environ.get("LOAD_USERS", "100")),
+    tier=os.environ.get("LOAD_TIER", "SOULMATE"),
+)
+
+__all__ = ["app"]
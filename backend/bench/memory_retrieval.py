@@ -0,0 +1,267 @@
+"""
+Retrieval benchmark for the Chat_Logs memory RPCs on Postgres + pgvector.
+
+Runs match_chat_logs, match_chat_logs_v2 and get_recent_chat_logs (the
+functions from migrations/, called exactly as the backend calls them,
+with its match counts) against every scale companion loaded by
+bench/memory_dataset.py, once per index configuration. For each
+configuration it reports index build time and on-disk size; for each
+function and scale, latency percentiles, rows returned and recall@k
+against exact search.
+
+Exact results are computed once per query, before any index exists, with
+index scans disabled — ground truth doesn't depend on the configuration.
+Query vectors are stored embeddings of the companion's own history with
+noise added (a new message about a recurring subject).
+
+Configurations (`--configs`, comma-separated):
+    none                 no secondary index: sequential scans
+    ivfflat              migration 001's index (lists=--ivf-lists, probes=--ivf-probes)
+    btree                (companion_id, timestamp DESC)
+    btree+ivfflat        both
+    btree+hnsw           btree + hnsw (m, ef_construction, ef_search from flags)
+    btree+hnsw-iterative btree+hnsw with hnsw.iterative_scan=relaxed_order (pgvector ≥ 0.8)
+
+Drops and recreates indexes on Chat_Logs: run it only against the scratch
+database the generator loaded.
+
+Usage:
+    python -m bench.memory_retrieval [--dsn ...] [--configs none,ivfflat,btree,btree+hnsw]
+                                     [--queries 50] [--warmup 5] [--json results.json]
+"""
+
+import argparse
+import json
+import os
+import random
+import statistics
+import time
+from dataclasses import dataclass, field
+
+from bench.memory_dataset import DEFAULT_DSN, SCALE_COMPANION_PREFIX, connect, vector_literal
+
+# The backend's calls: chat.py searches v2 with top_k=8 (v1 is its fallback
+# with the same k), llm_engine.py fetches recent history with the router's k
+FUNCTIONS = {
+    "match_chat_logs": ("SELECT log_id FROM match_chat_logs(%s::vector, %s, %s)", 8),
+    "match_chat_logs_v2": ("SELECT log_id FROM match_chat_logs_v2(%s::vector, %s, %s)", 8),
+    "get_recent_chat_logs": ("SELECT log_id FROM get_recent_chat_logs(%s, %s)", 10),
+}
+EXACT_SETTINGS = {"enable_indexscan": "off", "enable_bitmapscan": "off"}
+
+
+@dataclass
+class IndexConfig:
+    name: str
+    statements: list[str]
+    settings: dict[str, str] = field(default_factory=dict)
+
+
+def index_configs(args: argparse.Namespace) -> dict[str, IndexConfig]:
+    btree = (
+        "CREATE INDEX bench_chat_logs_companion_ts "
+        'ON public."Chat_Logs" (companion_id, timestamp DESC)'
+    )
+    ivfflat = (
+        "CREATE INDEX bench_chat_logs_ivfflat ON public.\"Chat_Logs\" "
+        f"USING ivfflat (embedding vector_cosine_ops) WITH (lists = {args.ivf_lists})"
+    )
+    hnsw = (
+        "CREATE INDEX bench_chat_logs_hnsw ON public.\"Chat_Logs\" "
+        f"USING hnsw (embedding vector_cosine_ops) WITH (m = {args.hnsw_m}, ef_construction = {args.hnsw_ef_construction})"
+    )
+    ivf_settings = {"ivfflat.probes": str(args.ivf_probes)}
+    hnsw_settings = {"hnsw.ef_search": str(args.hnsw_ef_search)}
+    configs = [
+        IndexConfig("none", []),
+        IndexConfig("ivfflat", [ivfflat], ivf_settings),
+        IndexConfig("btree", [btree]),
+        IndexConfig("btree+ivfflat", [btree, ivfflat], ivf_settings),
+        IndexConfig("btree+hnsw", [btree, hnsw], hnsw_settings),
+        IndexConfig(
+            "btree+hnsw-iterative", [btree, hnsw],
+            {**hnsw_settings, "hnsw.iterative_scan": "relaxed_order"},
+        ),
+    ]
+    return {config.name: config for config in configs}
+
+
+def percentile(samples: list[float], pct: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+# ── Database helpers ──
+def apply_settings(conn, settings: dict[str, str]) -> None:
+    conn.execute("RESET ALL")
+    for name, value in settings.items():
+        conn.execute("SELECT set_config(%s, %s, false)", (name, value))
+
+
+def drop_secondary_indexes(conn) -> None:
+    rows = conn.execute(
+        "SELECT i.relname FROM pg_index x "
+        "JOIN pg_class i ON i.oid = x.indexrelid "
+        "WHERE x.indrelid = 'public.\"Chat_Logs\"'::regclass AND NOT x.indisprimary"
+    ).fetchall()
+    for (name,) in rows:
+        conn.execute(f'DROP INDEX public."{name}"')
+
+
+def build_indexes(conn, config: IndexConfig, maintenance_work_mem: str) -> list[dict]:
+    """Create the configuration's indexes; returns build time and size of each."""
+    drop_secondary_indexes(conn)
+    conn.execute("SELECT set_config('maintenance_work_mem', %s, false)", (maintenance_work_mem,))
+    built = []
+    for statement in config.statements:
+        name = statement.split()[2]
+        started = time.perf_counter()
+        conn.execute(statement)
+        seconds = time.perf_counter() - started
+        size = conn.execute("SELECT pg_relation_size(%s::regclass)", (f"public.{name}",)).fetchone()[0]
+        built.append({"index": name, "build_seconds": seconds, "size_mb": size / 2**20})
+    conn.execute('ANALYZE public."Chat_Logs"')
+    return built
+
+
+def scale_companions(conn) -> list[tuple[str, int]]:
+    """(companion_id, messages) of the generator's scale companions, smallest first."""
+    rows = conn.execute(
+        'SELECT c.companion_id::text, count(l.log_id) FROM public."Companions" c '
+        'JOIN public."Chat_Logs" l ON l.companion_id = c.companion_id '
+        "WHERE c.name LIKE %s GROUP BY c.companion_id ORDER BY 2",
+        (SCALE_COMPANION_PREFIX + "%",),
+    ).fetchall()
+    return [(companion_id, count) for companion_id, count in rows]
+
+
+def query_vectors(conn, companion_id: str, count: int, rng: random.Random, noise: float) -> list[str]:
+    rows = conn.execute(
+        'SELECT embedding::text FROM public."Chat_Logs" '
+        "WHERE companion_id = %s AND embedding IS NOT NULL ORDER BY random() LIMIT %s",
+        (companion_id, count),
+    ).fetchall()
+    vectors = []
+    for (text,) in rows:
+        vector = json.loads(text)
+        sigma = noise / len(vector) ** 0.5
+        vectors.append(vector_literal([x + rng.gauss(0.0, sigma) for x in vector]))
+    return vectors
+
+
+def call(conn, function: str, companion_id: str, vector: str) -> list[int]:
+    sql, k = FUNCTIONS[function]
+    params = (companion_id, k) if function == "get_recent_chat_logs" else (vector, companion_id, k)
+    return [row[0] for row in conn.execute(sql, params).fetchall()]
+
+
+# ── Measurement ──
+def exact_results(conn, workload: dict[str, list[str]]) -> dict:
+    """Ground truth per (function, companion, query index), by sequential scan."""
+    drop_secondary_indexes(conn)
+    apply_settings(conn, EXACT_SETTINGS)
+    truth = {}
+    for function in FUNCTIONS:
+        for companion_id, vectors in workload.items():
+            for i, vector in enumerate(vectors):
+                truth[function, companion_id, i] = call(conn, function, companion_id, vector)
+    return truth
+
+
+def measure(conn, config: IndexConfig, workload: dict[str, list[str]], truth: dict, warmup: int) -> list[dict]:
+    apply_settings(conn, config.settings)
+    results = []
+    for function in FUNCTIONS:
+        k = FUNCTIONS[function][1]
+        for companion_id, vectors in workload.items():
+            for vector in vectors[:warmup]:
+                call(conn, function, companion_id, vector)
+            timings, recalls, returned = [], [], []
+            for i, vector in enumerate(vectors):
+                started = time.perf_counter()
+                ids = call(conn, function, companion_id, vector)
+                timings.append((time.perf_counter() - started) * 1000)
+                expected = truth[function, companion_id, i]
+                returned.append(len(ids))
+                if expected:
+                    recalls.append(len(set(ids) & set(expected)) / min(k, len(expected)))
+            results.append({
+                "config": config.name,
+                "function": function,
+                "companion_id": companion_id,
+                "p50_ms": statistics.median(timings),
+                "p95_ms": percentile(timings, 95),
+                "p99_ms": percentile(timings, 99),
+                "recall": statistics.fmean(recalls) if recalls else 1.0,
+                "rows": statistics.fmean(returned),
+            })
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--dsn", default=os.environ.get("BENCH_DATABASE_URL", DEFAULT_DSN))
+    parser.add_argument("--configs", default="none,ivfflat,btree,btree+ivfflat,btree+hnsw")
+    parser.add_argument("--queries", type=int, default=50, help="query vectors per scale companion")
+    parser.add_argument("--warmup", type=int, default=5)
+    parser.add_argument("--query-noise", type=float, default=0.3, help="noise added to sampled query vectors")
+    parser.add_argument("--ivf-lists", type=int, default=100, help="migration 001 uses 100")
+    parser.add_argument("--ivf-probes", type=int, default=1, help="pgvector default is 1")
+    parser.add_argument("--hnsw-m", type=int, default=16)
+    parser.add_argument("--hnsw-ef-construction", type=int, default=64)
+    parser.add_argument("--hnsw-ef-search", type=int, default=40)
+    parser.add_argument("--maintenance-work-mem", default="1GB")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json", help="also write all results to this file")
+    args = parser.parse_args()
+
+    configs = index_configs(args)
+    selected = [name for name in args.configs.split(",") if name]
+    unknown = [name for name in selected if name not in configs]
+    if unknown:
+        parser.error(f"unknown configs: {', '.join(unknown)} (choose from {', '.join(configs)})")
+
+    rng = random.Random(args.seed)
+    with connect(args.dsn) as conn:
+        companions = scale_companions(conn)
+        if not companions:
+            raise SystemExit("No scale companions found; load them with python -m bench.memory_dataset first")
+        table_rows = conn.execute('SELECT count(*) FROM public."Chat_Logs"').fetchone()[0]
+        scale_of = dict(companions)
+        print(f"Chat_Logs: {table_rows:,} rows; scales: {', '.join(f'{n:,}' for _, n in companions)}")
+
+        workload = {
+            companion_id: query_vectors(conn, companion_id, args.queries, rng, args.query_noise)
+            for companion_id, _ in companions
+        }
+        print("Computing exact results...")
+        truth = exact_results(conn, workload)
+
+        report = {"table_rows": table_rows, "args": vars(args), "configs": []}
+        for name in selected:
+            config = configs[name]
+            indexes = build_indexes(conn, config, args.maintenance_work_mem)
+            results = measure(conn, config, workload, truth, args.warmup)
+            report["configs"].append({"config": name, "settings": config.settings, "indexes": indexes, "results": results})
+
+            print(f"\n== {name} {config.settings or ''}")
+            for index in indexes:
+                print(f"  {index['index']:<32} build={index['build_seconds']:8.1f}s  size={index['size_mb']:9.1f}MB")
+            for r in results:
+                print(
+                    f"  {r['function']:<22} {scale_of[r['companion_id']]:>9,} msgs  "
+                    f"p50={r['p50_ms']:8.2f}ms  p95={r['p95_ms']:8.2f}ms  p99={r['p99_ms']:8.2f}ms  "
+                    f"recall={r['recall']:.3f}  rows={r['rows']:.1f}"
+                )
+        apply_settings(conn, {})
+        drop_secondary_indexes(conn)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
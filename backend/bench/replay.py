@@ -0,0 +1,375 @@
+"""
+Replay recorded chat sessions as a latency / upstream-call regression check.
+
+Fixtures are WebSocket sessions captured with SESSION_RECORD_DIR (see
+app/core/session_recorder.py): the starting companion state, the client
+messages and the upstream responses. Each one is rebuilt in the in-memory
+Supabase stand-in and its client messages are sent again, one turn at a
+time, through the real /api/v1/ws pipeline with OpenAI answered from the
+recording (zero latency by default, so timings measure our own code).
+Admission limits are lifted; turns are replayed sequentially, so a
+recorded barge-in replays as two whole turns.
+
+`check` compares per-stage mean timings and OpenAI calls per call site
+with a baseline and exits 1 on a regression, so it can gate CI. Timings
+are machine-dependent: create the baseline on the machine that runs the
+check (`check --update-baseline`).
+
+Usage:
+    python -m bench.replay run [FIXTURE ...]
+    python -m bench.replay check [--threshold 0.5] [--min-delta-ms 5] [--repeat 5]
+    python -m bench.replay check --update-baseline
+"""
+
+import argparse
+import asyncio
+import glob
+import json
+import logging
+import os
+import statistics
+import sys
+import time
+import uuid
+from collections import defaultdict, deque
+from datetime import date, datetime, timedelta, timezone
+
+os.environ.setdefault("OPENAI_API_KEY", "bench")
+os.environ.setdefault("SUPABASE_URL", "http://localhost")
+os.environ.setdefault("SUPABASE_SERVICE_ROLE_KEY", "bench")
+os.environ.setdefault("SESSION_STATE_BACKEND", "memory")
+os.environ.pop("SESSION_RECORD_DIR", None)
+
+import httpx  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+
+from app.core import admission as admission_module  # noqa: E402
+from app.core.metrics import Histogram, registered_metrics  # noqa: E402
+from app.core.openai_gateway import get_openai_gateway  # noqa: E402
+from app.core.session_recorder import upstream_key  # noqa: E402
+from app.core.session_state import get_session_store  # noqa: E402
+from app.main import app  # noqa: E402
+from app.services.companion_actor import companion_registry  # noqa: E402
+from bench.fake_openai import CLASSIFIER_REPLY, completion_chunk, fake_embedding, usage_chunk  # noqa: E402
+from bench.fake_supabase import FakeSupabase, install  # noqa: E402
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+FIXTURES_DIR = os.path.join(BENCH_DIR, "fixtures", "sessions")
+BASELINE_PATH = os.path.join(BENCH_DIR, "fixtures", "replay_baseline.json")
+
+# Histograms whose per-label means are compared (seconds in, ms out)
+TIMED_HISTOGRAMS = ("chat_stage_seconds", "chat_ttft_seconds", "chat_persist_seconds", "supabase_rpc_seconds")
+DEFAULT_EMBEDDING_DIMS = 1536
+
+
+# ── Seeding ──
+def seed_fixture(fake: FakeSupabase, seed: dict, embedding_dims: int) -> str:
+    """Rebuild a fixture's starting state under fresh IDs. Returns the companion id."""
+    user_id, companion_id = str(uuid.uuid4()), str(uuid.uuid4())
+    companion = {k: v for k, v in seed["companion"].items() if v is not None}
+    fake.seed("Companions", [{**companion, "companion_id": companion_id, "user_id": user_id}])
+    fake.seed("Subscriptions", [{"user_id": user_id, "plan_type": seed["tier"]}])
+
+    history = seed["history"]
+    # Older AI turns beyond the captured history only matter as a count
+    filler = max(0, seed["ai_turns"] - sum(1 for row in history if row["sender"] == "AI"))
+    rows = [{"sender": "AI", "message": "…"} for _ in range(filler)]
+    rows += [
+        {**row, "embedding": fake_embedding(row["message"], embedding_dims)}
+        for row in history
+    ]
+    start = datetime.now(timezone.utc) - timedelta(seconds=len(rows))
+    fake.seed("Chat_Logs", [
+        {**row, "companion_id": companion_id, "timestamp": (start + timedelta(seconds=i)).isoformat()}
+        for i, row in enumerate(rows)
+    ])
+
+    fake.seed("Daily_Emotions", [
+        {
+            **{k: v for k, v in row.items() if k != "days_ago"},
+            "companion_id": companion_id,
+            "date": str(date.today() - timedelta(days=row["days_ago"])),
+        }
+        for row in seed.get("emotions", [])
+    ])
+    if seed.get("naming_state"):
+        get_session_store().set("naming", companion_id, seed["naming_state"])
+    return companion_id
+
+
+# ── Mocked upstream ──
+class ReplayUpstream:
+    """Answers OpenAI requests from a recording, matched by upstream_key in
+    recorded order. Requests with no recorded answer get a generic one and
+    are counted as unmatched."""
+
+    def __init__(self, entries: list[dict], recorded_latency: bool = False):
+        self.queues: dict[str, deque] = defaultdict(deque)
+        for entry in entries:
+            self.queues[entry["key"]].append(entry)
+        self.recorded_latency = recorded_latency
+        self.unmatched = 0
+
+    def embedding_dims(self) -> int:
+        for queue in self.queues.values():
+            for entry in queue:
+                if entry.get("embedding_dims"):
+                    return entry["embedding_dims"]
+        return DEFAULT_EMBEDDING_DIMS
+
+    async def handle(self, request: httpx.Request) -> httpx.Response:
+        body = json.loads(request.content or b"{}")
+        queue = self.queues.get(upstream_key(request.url.path, body))
+        if queue:
+            entry = queue.popleft()
+        else:
+            self.unmatched += 1
+            entry = {"status": 200}
+        if self.recorded_latency and entry.get("latency_ms"):
+            await asyncio.sleep(entry["latency_ms"] / 1000)
+        return self.respond(request, body, entry)
+
+    @staticmethod
+    def respond(request: httpx.Request, body: dict, entry: dict) -> httpx.Response:
+        model = body.get("model", "")
+        status = entry.get("status", 200)
+        if status >= 400:
+            return httpx.Response(
+                status,
+                json={"error": {"message": "replayed error", "type": "replay", "code": None}},
+                headers=entry.get("headers", {}),
+            )
+
+        if request.url.path.endswith("/embeddings"):
+            inputs = body.get("input")
+            inputs = inputs if isinstance(inputs, list) else [inputs]
+            dims = entry.get("embedding_dims") or DEFAULT_EMBEDDING_DIMS
+            return httpx.Response(200, json={
+                "object": "list",
+                "data": [
+                    {"object": "embedding", "index": i, "embedding": fake_embedding(str(text), dims)}
+                    for i, text in enumerate(inputs)
+                ],
+                "model": model,
+                "usage": entry.get("usage") or {"prompt_tokens": 0, "total_tokens": 0},
+            })
+
+        created = int(time.time())
+        if body.get("stream"):
+            content = entry.get("content", "…")
+            pieces = max(1, entry.get("chunks") or 1)
+            size = max(1, -(-len(content) // pieces))
+            events = [completion_chunk(model, created, {"role": "assistant", "content": ""})]
+            events += [
+                completion_chunk(model, created, {"content": content[i:i + size]})
+                for i in range(0, len(content), size)
+            ]
+            events.append(completion_chunk(model, created, {}, "stop"))
+            if (body.get("stream_options") or {}).get("include_usage") and entry.get("usage"):
+                events.append(usage_chunk(model, created, entry["usage"]))
+            events.append("data: [DONE]\n\n")
+            return httpx.Response(
+                200, content="".join(events).encode(), headers={"content-type": "text/event-stream"}
+            )
+
+        return httpx.Response(200, json={
+            "id": "chatcmpl-replay",
+            "object": "chat.completion",
+            "created": created,
+            "model": model,
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": entry.get("content", json.dumps(CLASSIFIER_REPLY))},
+                "finish_reason": "stop",
+            }],
+            "usage": entry.get("usage") or {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+        })
+
+
+# ── Measurement ──
+def _histogram_totals() -> dict[str, tuple[float, int]]:
+    totals = {}
+    for metric in registered_metrics():
+        if isinstance(metric, Histogram) and metric.name in TIMED_HISTOGRAMS:
+            for key, series in metric.series().items():
+                label = ",".join(f"{n}={v}" for n, v in zip(metric.labels, key))
+                totals[f"{metric.name}{{{label}}}"] = (series[-1], sum(series[:-1]))
+    return totals
+
+
+def _upstream_calls() -> dict[str, int]:
+    return {site: usage["calls"] for site, usage in get_openai_gateway().usage.snapshot().items()}
+
+
+def _wait_until_idle(companion_id: str, timeout: float = 10.0) -> None:
+    """Wait for the turn's tail (AI embedding + save) and any post-turn
+    checks it started; the app runs on the TestClient's loop thread."""
+    deadline = time.monotonic() + timeout
+    quiet = 0
+    while time.monotonic() < deadline and quiet < 2:
+        actor = companion_registry.get(companion_id)
+        busy = actor is not None and (actor.turn_lock.locked() or (actor.scheduler and actor.scheduler.busy))
+        quiet = 0 if busy else quiet + 1
+        time.sleep(0.01)
+
+
+def replay_fixture(client: TestClient, fixture: dict, recorded_latency: bool = False) -> dict:
+    fake = FakeSupabase()
+    install(fake)
+    upstream = ReplayUpstream(fixture["upstream"], recorded_latency)
+    companion_id = seed_fixture(fake, fixture["seed"], upstream.embedding_dims())
+    get_openai_gateway().http_client._transport = httpx.MockTransport(upstream.handle)
+
+    hist_before, calls_before = _histogram_totals(), _upstream_calls()
+    turn_ms = []
+    with client.websocket_connect(f"/api/v1/ws/{companion_id}") as ws:
+        for frame in fixture["frames"]:
+            if frame["dir"] != "client":
+                continue
+            data = frame["data"]
+            started = time.perf_counter()
+            ws.send_text(json.dumps(data, ensure_ascii=False) if isinstance(data, dict) else str(data))
+            while True:
+                message = ws.receive_json()
+                if message.get("type") == "end" or "error" in message or (
+                    message.get("type") == "rate_limited" and message.get("dropped")
+                ):
+                    break
+            turn_ms.append((time.perf_counter() - started) * 1000)
+            _wait_until_idle(companion_id)
+    _wait_until_idle(companion_id)
+
+    timings = {}
+    for name, (total, count) in _histogram_totals().items():
+        before_total, before_count = hist_before.get(name, (0.0, 0))
+        if count > before_count:
+            timings[name] = 1000 * (total - before_total) / (count - before_count)
+    calls_after = _upstream_calls()
+    calls = {
+        site: n - calls_before.get(site, 0)
+        for site, n in calls_after.items()
+        if n - calls_before.get(site, 0)
+    }
+    return {
+        "turns": len(turn_ms),
+        "turn_ms": statistics.fmean(turn_ms) if turn_ms else 0.0,
+        "timings_ms": timings,
+        "calls": calls,
+        "unmatched_upstream": upstream.unmatched,
+    }
+
+
+def replay_repeated(client: TestClient, fixture: dict, repeat: int, recorded_latency: bool) -> dict:
+    """Median timings over `repeat` runs; call counts from the first run."""
+    runs = [replay_fixture(client, fixture, recorded_latency) for _ in range(repeat)]
+    result = runs[0]
+    result["turn_ms"] = statistics.median(r["turn_ms"] for r in runs)
+    result["timings_ms"] = {
+        name: statistics.median(r["timings_ms"].get(name, 0.0) for r in runs)
+        for name in result["timings_ms"]
+    }
+    return result
+
+
+# ── Comparison ──
+def compare(name: str, current: dict, baseline: dict, threshold: float, min_delta_ms: float, calls_threshold: float) -> list[str]:
+    problems = []
+    for metric, value in sorted(current["timings_ms"].items()):
+        base = baseline["timings_ms"].get(metric)
+        if base is None:
+            continue
+        if value > base * (1 + threshold) and value - base > min_delta_ms:
+            problems.append(f"{name}: {metric} {base:.2f}ms -> {value:.2f}ms")
+    for site, count in sorted(current["calls"].items()):
+        base = baseline["calls"].get(site, 0)
+        if count > base * (1 + calls_threshold):
+            problems.append(f"{name}: OpenAI calls at {site} {base} -> {count}")
+    if current["unmatched_upstream"] > baseline.get("unmatched_upstream", 0):
+        problems.append(
+            f"{name}: {current['unmatched_upstream']} upstream calls not in the recording "
+            f"(baseline {baseline.get('unmatched_upstream', 0)})"
+        )
+    return problems
+
+
+def load_fixtures(paths: list[str]) -> dict[str, dict]:
+    paths = paths or sorted(glob.glob(os.path.join(FIXTURES_DIR, "*.json")))
+    fixtures = {}
+    for path in paths:
+        with open(path, encoding="utf-8") as f:
+            fixtures[os.path.splitext(os.path.basename(path))[0]] = json.load(f)
+    return fixtures
+
+
+def print_result(name: str, result: dict) -> None:
+    calls = ", ".join(f"{site}={n}" for site, n in sorted(result["calls"].items()))
+    print(f"{name}: {result['turns']} turns, turn={result['turn_ms']:.1f}ms, "
+          f"unmatched_upstream={result['unmatched_upstream']}")
+    print(f"  calls: {calls}")
+    for metric, value in sorted(result["timings_ms"].items()):
+        print(f"  {metric:<64} {value:8.2f}ms")
+
+
+def lift_admission_limits() -> None:
+    unlimited = admission_module.TierLimits(
+        messages_per_minute=1e9, message_burst=10**9, tokens_per_minute=1e12
+    )
+    for tier in admission_module.TIER_LIMITS:
+        admission_module.TIER_LIMITS[tier] = unlimited
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    sub = parser.add_subparsers(dest="command", required=True)
+    run = sub.add_parser("run", help="replay fixtures and print their measurements")
+    run.add_argument("fixtures", nargs="*", help=f"fixture files (default: {FIXTURES_DIR}/*.json)")
+    check = sub.add_parser("check", help="compare against the baseline; exit 1 on regression")
+    check.add_argument("fixtures", nargs="*")
+    check.add_argument("--baseline", default=BASELINE_PATH)
+    check.add_argument("--threshold", type=float, default=0.5, help="allowed relative timing increase")
+    check.add_argument("--min-delta-ms", type=float, default=5.0, help="ignore timing increases below this")
+    check.add_argument("--calls-threshold", type=float, default=0.0, help="allowed relative call increase")
+    check.add_argument("--update-baseline", action="store_true")
+    for p in (run, check):
+        p.add_argument("--repeat", type=int, default=5)
+        p.add_argument("--recorded-latency", action="store_true", help="answer with the recorded upstream latency")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.ERROR)
+    fixtures = load_fixtures(args.fixtures)
+    if not fixtures:
+        sys.exit(f"No fixtures found in {FIXTURES_DIR}")
+    lift_admission_limits()
+
+    results = {}
+    with TestClient(app) as client:
+        for name, fixture in fixtures.items():
+            results[name] = replay_repeated(client, fixture, args.repeat, args.recorded_latency)
+            print_result(name, results[name])
+
+    if args.command == "run":
+        return
+    if args.update_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+        print(f"\nBaseline written to {args.baseline}")
+        return
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    problems = []
+    for name, result in results.items():
+        if name not in baseline:
+            print(f"\n{name}: no baseline, skipped")
+            continue
+        problems += compare(name, result, baseline[name], args.threshold, args.min_delta_ms, args.calls_threshold)
+    if problems:
+        print("\nREGRESSIONS:")
+        for problem in problems:
+            print(f"  {problem}")
+        sys.exit(1)
+    print("\nNo regressions.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+"""
+Intent-router backends compared: prompt size and classification latency.
+
+For each backend in app/core/router.py (ROUTER_BACKENDS) it reports
+
+  * prompt tokens per classification (tiktoken's o200k_base when its
+    encoding is available locally, else the gateway's approximation;
+    the native backend's count includes its JSON schema),
+  * first-call latency (builds the chain / imports LangChain),
+  * steady-state latency percentiles and client CPU per call.
+
+By default the calls go to the fake OpenAI server (bench/fake_openai.py)
+with zero latency, so the timings are the backends' own client-side
+overhead. With --live they go to the real API (OPENAI_API_KEY) and
+intent agreement with a small labelled message set is reported too, plus
+the native backend's prompt tokens as billed (LangChain calls bypass the
+gateway's usage ledger).
+
+Usage:
+    python -m bench.router_backends [--calls 200] [--live]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+os.environ.setdefault("OPENAI_API_KEY", "bench")
+os.environ.setdefault("SUPABASE_URL", "http://localhost")
+os.environ.setdefault("SUPABASE_SERVICE_ROLE_KEY", "bench")
+
+from app.core import router  # noqa: E402
+from app.core.config import get_settings  # noqa: E402
+from app.core.openai_gateway import approx_tokens, get_openai_gateway  # noqa: E402
+from bench.ws_load import BACKEND_DIR, free_port, percentile, wait_until_up  # noqa: E402
+
+LABELLED_MESSAGES = [
+    ("요즘 회사 때문에 너무 힘들어서 그냥 다 그만두고 싶어", "deep_emotional"),
+    ("엄마랑 크게 싸웠는데 내가 잘못한 건지 모르겠어", "deep_emotional"),
+    ("아무한테도 말 못 했는데 요즘 밤마다 울어", "deep_emotional"),
+    ("안녕! 뭐 해?", "casual_chat"),
+    ("ㅋㅋㅋ 그거 완전 웃기다", "casual_chat"),
+    ("오늘 점심 떡볶이 먹었어", "casual_chat"),
+    ("지난번에 내가 말했던 강아지 이름 기억나?", "memory_recall"),
+    ("전에 얘기했던 그 여행 계획 어떻게 됐더라", "memory_recall"),
+    ("그때 네가 추천해준 노래 제목이 뭐였지?", "memory_recall"),
+    ("서울에서 부산까지 KTX로 얼마나 걸려?", "simple_question"),
+    ("오늘 무슨 요일이야?", "simple_question"),
+    ("MBTI에서 I랑 E 차이가 뭐야?", "simple_question"),
+]
+
+
+# ── Prompt size ──
+def _token_counter():
+    try:
+        import tiktoken
+
+        encoding = tiktoken.get_encoding("o200k_base")
+        return lambda text: len(encoding.encode(text)), "tiktoken o200k_base"
+    except Exception:
+        return approx_tokens, "approx (chars/3)"
+
+
+def prompt_texts(backend: str, message: str) -> list[str]:
+    if backend == "native":
+        texts = [m["content"] for m in router.native_messages(message)]
+        return texts + [json.dumps(router.NATIVE_RESPONSE_FORMAT["json_schema"]["schema"])]
+    if backend == "langchain":
+        prompt, _ = router.langchain_prompt()
+        return [m.content for m in prompt.format_messages(input=message)]
+    raise ValueError(f"No prompt renderer for backend {backend}")
+
+
+# ── Latency ──
+async def measure_backend(backend: str, calls: int, live: bool) -> dict:
+    classify = router.ROUTER_BACKENDS[backend]
+    usage = get_openai_gateway().usage
+
+    started = time.perf_counter()
+    await classify(LABELLED_MESSAGES[0][0])
+    first_ms = (time.perf_counter() - started) * 1000
+
+    timings, agreed = [], 0
+    cpu_started = time.process_time()
+    for i in range(calls):
+        message, expected = LABELLED_MESSAGES[i % len(LABELLED_MESSAGES)]
+        started = time.perf_counter()
+        result = await classify(message)
+        timings.append((time.perf_counter() - started) * 1000)
+        agreed += result.get("intent") == expected
+    cpu_ms = (time.process_time() - cpu_started) * 1000 / calls
+
+    result = {
+        "first_call_ms": first_ms,
+        "p50_ms": statistics.median(timings),
+        "p90_ms": percentile(timings, 90),
+        "p99_ms": percentile(timings, 99),
+        "cpu_ms_per_call": cpu_ms,
+    }
+    if live:
+        result["agreement"] = agreed / calls
+        site = usage.sites.get("router.classify")
+        if backend == "native" and site is not None and site.calls:
+            result["api_prompt_tokens_per_call"] = site.prompt_tokens / site.calls
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--calls", type=int, default=200, help="classifications per backend")
+    parser.add_argument("--backends", default=",".join(router.ROUTER_BACKENDS))
+    parser.add_argument("--live", action="store_true", help="call the real OpenAI API (costs money)")
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args()
+    backends = [b for b in args.backends.split(",") if b]
+
+    count_tokens, tokenizer = _token_counter()
+    results: dict[str, dict] = {}
+    for backend in backends:
+        per_message = [
+            sum(count_tokens(text) for text in prompt_texts(backend, message))
+            for message, _ in LABELLED_MESSAGES
+        ]
+        results[backend] = {"prompt_tokens": statistics.fmean(per_message)}
+
+    fake_openai = None
+    if not args.live:
+        port = free_port()
+        fake_openai = subprocess.Popen(
+            [sys.executable, "-m", "bench.fake_openai", "--port", str(port), "--latency-ms", "0", "--jitter-ms", "0"],
+            cwd=BACKEND_DIR, env={**os.environ, "PYTHONPATH": BACKEND_DIR},
+        )
+        os.environ["OPENAI_BASE_URL"] = f"http://127.0.0.1:{port}/v1"
+        get_settings.cache_clear()
+    try:
+        if fake_openai is not None:
+            wait_until_up(f"{os.environ['OPENAI_BASE_URL'].removesuffix('/v1')}/stats", fake_openai)
+        for backend in backends:
+            # Fresh gateway (and chain) per event loop
+            get_openai_gateway.cache_clear()
+            router._chain = None
+            results[backend].update(asyncio.run(measure_backend(backend, args.calls, args.live)))
+    finally:
+        if fake_openai is not None:
+            fake_openai.terminate()
+            fake_openai.wait(timeout=10)
+
+    print(f"{'upstream: ' + ('OpenAI API' if args.live else 'fake (0ms)')}   tokens: {tokenizer}")
+    for backend, r in results.items():
+        line = (
+            f"{backend:<10} prompt={r['prompt_tokens']:6.1f} tok  first={r['first_call_ms']:7.1f}ms  "
+            f"p50={r['p50_ms']:7.2f}ms  p90={r['p90_ms']:7.2f}ms  p99={r['p99_ms']:7.2f}ms  "
+            f"cpu={r['cpu_ms_per_call']:5.2f}ms/call"
+        )
+        if "agreement" in r:
+            line += f"  agreement={r['agreement']:.0%}"
+        if "api_prompt_tokens_per_call" in r:
+            line += f"  api_prompt={r['api_prompt_tokens_per_call']:.0f} tok"
+        print(line)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
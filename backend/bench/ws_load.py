@@ -0,0 +1,305 @@
+"""
+WebSocket load test: how many concurrent companions one worker sustains.
+
+Starts the fake OpenAI server (bench/fake_openai.py) and the backend
+(bench/load_app.py: real app, in-memory Supabase) as subprocesses, then
+drives N simulated users through /api/v1/ws/{companion_id}. Each user
+connects, sends `--turns` messages with a think time between them and
+waits for each reply to finish. Reports turns/sec, time to first token
+and end-to-end latency percentiles, rate-limited/errored turns, and CPU
+and peak RSS per worker process (from /proc, Linux only).
+
+Usage:
+    python -m bench.ws_load [--users 50] [--turns 5] [--think-ms 2000] [--workers 1]
+                            [--latency-ms 300] [--tokens-per-second 40] [--rate-limit-ratio 0]
+                            [--json results.json]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from dataclasses import asdict, dataclass, field
+
+import httpx
+from websockets.asyncio.client import connect
+
+from bench.fake_openai import add_arguments as add_fake_openai_arguments
+from bench.fake_supabase import load_user_ids
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+USER_MESSAGES = [
+    "오늘 회사에서 좀 힘들었어",
+    "점심에 뭐 먹을지 고민이야",
+    "주말에 산책 갈까 생각 중이야",
+    "요즘 잠을 잘 못 자",
+    "친구랑 오랜만에 통화했어",
+]
+
+
+def percentile(samples: list[float], pct: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+# ── Results ──
+@dataclass
+class LoadResult:
+    users: int
+    turns_per_user: int
+    workers: int
+    duration: float = 0.0
+    turns: int = 0
+    rate_limited: int = 0
+    shed: int = 0
+    errors: int = 0
+    ttft_ms: list[float] = field(default_factory=list)
+    e2e_ms: list[float] = field(default_factory=list)
+    worker_resources: list[dict] = field(default_factory=list)
+    upstream: dict = field(default_factory=dict)
+
+    def summary(self) -> dict:
+        data = asdict(self)
+        data.pop("ttft_ms")
+        data.pop("e2e_ms")
+        data["turns_per_second"] = self.turns / self.duration if self.duration else 0.0
+        for name, samples in (("ttft_ms", self.ttft_ms), ("e2e_ms", self.e2e_ms)):
+            data[name] = {
+                "p50": percentile(samples, 50),
+                "p90": percentile(samples, 90),
+                "p99": percentile(samples, 99),
+                "mean": statistics.fmean(samples) if samples else 0.0,
+            }
+        return data
+
+    def report(self) -> str:
+        s = self.summary()
+        lines = [
+            f"users={self.users} turns/user={self.turns_per_user} workers={self.workers} "
+            f"duration={self.duration:.1f}s",
+            f"turns={self.turns}  turns/sec={s['turns_per_second']:.2f}  "
+            f"rate_limited={self.rate_limited}  shed={self.shed}  errors={self.errors}",
+            "TTFT  p50={p50:7.1f}ms  p90={p90:7.1f}ms  p99={p99:7.1f}ms".format(**s["ttft_ms"]),
+            "E2E   p50={p50:7.1f}ms  p90={p90:7.1f}ms  p99={p99:7.1f}ms".format(**s["e2e_ms"]),
+        ]
+        for r in self.worker_resources:
+            lines.append(f"worker pid={r['pid']}  cpu={r['cpu_percent']:5.1f}%  peak_rss={r['peak_rss_mb']:.0f}MB")
+        if self.upstream:
+            lines.append(f"fake OpenAI: {self.upstream}")
+        return "\n".join(lines)
+
+
+# ── Worker resource sampling (/proc) ──
+class ResourceSampler:
+    def __init__(self, root_pid: int, interval: float = 0.5):
+        self.root_pid = root_pid
+        self.interval = interval
+        self.peak_rss: dict[int, int] = {}
+        self.cpu_start: dict[int, float] = {}
+        self.cpu_last: dict[int, float] = {}
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._started = 0.0
+
+    def worker_pids(self) -> list[int]:
+        """uvicorn runs in the root process with one worker, in its children with several."""
+        try:
+            with open(f"/proc/{self.root_pid}/task/{self.root_pid}/children") as f:
+                children = [int(pid) for pid in f.read().split()]
+        except OSError:
+            children = []
+        return children or [self.root_pid]
+
+    @staticmethod
+    def read(pid: int) -> tuple[float, int] | None:
+        """(cpu seconds, rss bytes) of a process."""
+        try:
+            with open(f"/proc/{pid}/stat") as f:
+                fields = f.read().rsplit(")", 1)[1].split()
+        except OSError:
+            return None
+        ticks = os.sysconf("SC_CLK_TCK")
+        cpu = (int(fields[11]) + int(fields[12])) / ticks  # utime + stime
+        rss = int(fields[21]) * os.sysconf("SC_PAGE_SIZE")
+        return cpu, rss
+
+    def _sample(self) -> None:
+        for pid in self.worker_pids():
+            stat = self.read(pid)
+            if stat is None:
+                continue
+            cpu, rss = stat
+            self.cpu_start.setdefault(pid, cpu)
+            self.cpu_last[pid] = cpu
+            self.peak_rss[pid] = max(self.peak_rss.get(pid, 0), rss)
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            self._sample()
+
+    def start(self) -> None:
+        if not os.path.exists("/proc"):
+            return
+        self._started = time.monotonic()
+        self._sample()
+        self._thread.start()
+
+    def stop(self) -> list[dict]:
+        if not self._thread.is_alive():
+            return []
+        self._stop.set()
+        self._thread.join()
+        self._sample()
+        elapsed = max(1e-9, time.monotonic() - self._started)
+        return [
+            {
+                "pid": pid,
+                "cpu_percent": 100 * (self.cpu_last[pid] - self.cpu_start[pid]) / elapsed,
+                "peak_rss_mb": self.peak_rss[pid] / 2**20,
+            }
+            for pid in sorted(self.cpu_last)
+        ]
+
+
+# ── Simulated users ──
+async def run_user(
+    index: int, base_url: str, args: argparse.Namespace, result: LoadResult, rng: random.Random
+) -> None:
+    _, companion_id = load_user_ids(index)
+    think = args.think_ms / 1000
+    # Spread connections over the ramp-up so they don't arrive as one burst
+    await asyncio.sleep(args.ramp_seconds * index / max(1, args.users))
+    try:
+        async with connect(f"{base_url}/api/v1/ws/{companion_id}", max_size=None) as ws:
+            for turn in range(args.turns):
+                message = USER_MESSAGES[(index + turn) % len(USER_MESSAGES)]
+                sent = time.perf_counter()
+                await ws.send(json.dumps({"message": message, "user_name": "민지"}))
+                first_token = None
+                while True:
+                    frame = json.loads(await asyncio.wait_for(ws.recv(), args.turn_timeout))
+                    kind = frame.get("type")
+                    if kind == "stream" and first_token is None:
+                        first_token = time.perf_counter()
+                    elif kind == "rate_limited":
+                        result.rate_limited += 1
+                        if frame.get("dropped"):
+                            result.shed += 1
+                            break
+                    elif kind == "end":
+                        done = time.perf_counter()
+                        result.turns += 1
+                        if first_token is not None:
+                            result.ttft_ms.append((first_token - sent) * 1000)
+                        result.e2e_ms.append((done - sent) * 1000)
+                        break
+                    elif "error" in frame:
+                        raise RuntimeError(frame["error"])
+                await asyncio.sleep(think * rng.uniform(0.5, 1.5))
+    except Exception as e:
+        result.errors += 1
+        if args.verbose:
+            print(f"  user {index}: {type(e).__name__}: {e}", file=sys.stderr)
+
+
+async def drive(base_url: str, args: argparse.Namespace, result: LoadResult) -> None:
+    rng = random.Random(args.seed)
+    started = time.perf_counter()
+    await asyncio.gather(*(
+        run_user(i, base_url, args, result, random.Random(rng.random())) for i in range(args.users)
+    ))
+    result.duration = time.perf_counter() - started
+
+
+def wait_until_up(url: str, process: subprocess.Popen, timeout: float = 30.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"{url} exited with {process.returncode} before starting")
+        try:
+            httpx.get(url, timeout=1.0)
+            return
+        except httpx.TransportError:
+            time.sleep(0.2)
+    raise TimeoutError(f"{url} did not come up in {timeout:.0f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--turns", type=int, default=5, help="messages per user")
+    parser.add_argument("--think-ms", type=float, default=2000, help="mean pause between a reply and the next message")
+    parser.add_argument("--ramp-seconds", type=float, default=5.0)
+    parser.add_argument("--turn-timeout", type=float, default=60.0)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--tier", default="SOULMATE", help="subscription tier of the seeded users")
+    parser.add_argument("--json", help="also write the summary to this file")
+    parser.add_argument("--verbose", action="store_true")
+    add_fake_openai_arguments(parser)
+    args = parser.parse_args()
+
+    openai_port, app_port = free_port(), free_port()
+    fake_args = [
+        "--latency-ms", str(args.latency_ms), "--jitter-ms", str(args.jitter_ms),
+        "--tokens-per-second", str(args.tokens_per_second), "--reply-tokens", str(args.reply_tokens),
+        "--rate-limit-ratio", str(args.rate_limit_ratio), "--embedding-dims", str(args.embedding_dims),
+        "--seed", str(args.seed),
+    ]
+    env = {
+        **os.environ,
+        "PYTHONPATH": BACKEND_DIR,
+        "LOAD_USERS": str(args.users),
+        "LOAD_TIER": args.tier,
+        "OPENAI_BASE_URL": f"http://127.0.0.1:{openai_port}/v1",
+    }
+    fake_openai = subprocess.Popen(
+        [sys.executable, "-m", "bench.fake_openai", "--port", str(openai_port), *fake_args],
+        cwd=BACKEND_DIR, env=env,
+    )
+    backend = subprocess.Popen(
+        [
+            sys.executable, "-m", "uvicorn", "bench.load_app:app",
+            "--port", str(app_port), "--workers", str(args.workers), "--log-level", "warning",
+        ],
+        cwd=BACKEND_DIR, env=env,
+    )
+    result = LoadResult(users=args.users, turns_per_user=args.turns, workers=args.workers)
+    try:
+        wait_until_up(f"http://127.0.0.1:{openai_port}/stats", fake_openai)
+        wait_until_up(f"http://127.0.0.1:{app_port}/health", backend)
+        sampler = ResourceSampler(backend.pid)
+        sampler.start()
+        asyncio.run(drive(f"ws://127.0.0.1:{app_port}", args, result))
+        result.worker_resources = sampler.stop()
+        result.upstream = httpx.get(f"http://127.0.0.1:{openai_port}/stats").json()
+    finally:
+        for process in (backend, fake_openai):
+            process.terminate()
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+
+    print(result.report())
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(result.summary(), f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -5,48 +5,141 @@ Fetches yesterday's chat logs for every companion,
 sends them to gpt-4o-mini (JSON mode) for emotional analysis,
 and upserts results into the Daily_Emotions table.
 
+"Yesterday" is the companion's local calendar day (Companions.timezone).
+In continuous mode the job runs in small scheduled slices and processes
+each timezone cohort shortly after its local midnight, so the LLM and
+database load is spread over 24 hours instead of one UTC-midnight spike.
+The end of the last completed slice is persisted (Cron_Watermarks,
+migration 010): a restart catches up slice by slice from there, and
+companion days that failed are retried in later slices with backoff
+(Analysis_Retries).
+
 Usage:
-    python -m cron.daily_analysis
+    python -m cron.daily_analysis                 # one-shot, everyone's local yesterday
+    python -m cron.daily_analysis --continuous    # rolling per-timezone slices
+    python -m cron.daily_analysis --continuous --metrics-port 9101   # + Prometheus /metrics
 """
 
+import argparse
 import asyncio
 import json
-from datetime import date, timedelta
-
-from openai import AsyncOpenAI
+import time
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta, timezone
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError, available_timezones
 
+from app.core.cache import invalidate_companion, invalidate_emotions
 from app.core.config import get_settings
+from app.core.metrics import counter, histogram, start_metrics_server
+from app.core.openai_gateway import get_openai_gateway
 from app.core.supabase import get_supabase_client
 from app.core.prompts import ANALYST_PROMPT, SUMMARY_PROMPT
 
 settings = get_settings()
-openai_client = AsyncOpenAI(api_key=settings.OPENAI_API_KEY)
+
+DEFAULT_TIMEZONE = "UTC"
+WATERMARK_JOB = "daily_analysis"
+
+companions_total = counter(
+    "cron_companions_total",
+    "Companions processed by the daily analysis, by outcome (analyzed / skipped / failed / abandoned)",
+    ("outcome",),
+)
+companion_seconds = histogram(
+    "cron_companion_seconds",
+    "Time to analyze and summarize one companion's day",
+)
+cohort_lag_seconds = histogram(
+    "cron_cohort_lag_seconds",
+    "Delay from a cohort's local midnight to the start of its analysis",
+    buckets=(60, 300, 900, 1800, 3600, 7200, 14400, 43200, 86400),
+)
+
+
+# ── Local day windows ──
+def get_zone(tz_name: str | None) -> ZoneInfo:
+    """Resolve an IANA timezone name, falling back to UTC for unknown values."""
+    try:
+        return ZoneInfo(tz_name or DEFAULT_TIMEZONE)
+    except (ZoneInfoNotFoundError, ValueError):
+        return ZoneInfo(DEFAULT_TIMEZONE)
+
+
+def local_yesterday(tz_name: str | None, now: datetime | None = None) -> date:
+    """Return yesterday's calendar date in the given timezone."""
+    now = now or datetime.now(timezone.utc)
+    return now.astimezone(get_zone(tz_name)).date() - timedelta(days=1)
+
+
+def day_window(day: date, tz_name: str | None) -> tuple[str, str]:
+    """Return the UTC [start, end) ISO bounds of a local calendar day."""
+    zone = get_zone(tz_name)
+    start = datetime.combine(day, datetime.min.time(), tzinfo=zone)
+    end = datetime.combine(day + timedelta(days=1), datetime.min.time(), tzinfo=zone)
+    return (
+        start.astimezone(timezone.utc).isoformat(),
+        end.astimezone(timezone.utc).isoformat(),
+    )
+
+
+def last_local_midnight(tz_name: str, now: datetime) -> datetime:
+    """Return the most recent local midnight (as an aware UTC datetime) at or before now."""
+    zone = get_zone(tz_name)
+    local_now = now.astimezone(zone)
+    midnight = datetime.combine(local_now.date(), datetime.min.time(), tzinfo=zone)
+    return midnight.astimezone(timezone.utc)
+
+
+def timezones_due(slice_start: datetime, slice_end: datetime) -> dict[str, datetime]:
+    """Return {timezone: local midnight (UTC)} for cohorts whose midnight fell in (start, end]."""
+    due = {}
+    for tz_name in available_timezones():
+        midnight = last_local_midnight(tz_name, slice_end)
+        if slice_start < midnight <= slice_end:
+            due[tz_name] = midnight
+    return due
 
 
-def fetch_yesterdays_logs(companion_id: str) -> list[dict]:
-    """Fetch all chat logs from yesterday for a given companion."""
+# ── Data access ──
+def fetch_yesterdays_logs(
+    companion_id: str, tz_name: str = DEFAULT_TIMEZONE, day: date | None = None
+) -> list[dict]:
+    """Fetch all chat logs from the companion's local yesterday (or a given local day)."""
     sb = get_supabase_client()
-    yesterday = date.today() - timedelta(days=1)
-    start = f"{yesterday}T00:00:00+00:00"
-    end = f"{yesterday}T23:59:59+00:00"
+    day = day or local_yesterday(tz_name)
+    start, end = day_window(day, tz_name)
 
     result = (
         sb.table("Chat_Logs")
         .select("sender, message, timestamp")
         .eq("companion_id", companion_id)
         .gte("timestamp", start)
-        .lte("timestamp", end)
+        .lt("timestamp", end)
         .order("timestamp")
         .execute()
     )
     return result.data or []
 
 
-def get_all_companion_ids() -> list[str]:
-    """Return all companion IDs from the database."""
+def get_all_companions() -> list[dict]:
+    """Return every companion's id and timezone."""
     sb = get_supabase_client()
-    result = sb.table("Companions").select("companion_id").execute()
-    return [row["companion_id"] for row in (result.data or [])]
+    result = sb.table("Companions").select("companion_id, timezone").execute()
+    return result.data or []
+
+
+def get_companions_in_timezones(tz_names: list[str]) -> list[dict]:
+    """Return companion ids and timezones for the given timezone cohorts."""
+    if not tz_names:
+        return []
+    sb = get_supabase_client()
+    result = (
+        sb.table("Companions")
+        .select("companion_id, timezone")
+        .in_("timezone", tz_names)
+        .execute()
+    )
+    return result.data or []
 
 
 async def analyze_emotions(logs: list[dict]) -> dict:
@@ -55,7 +148,8 @@ async def analyze_emotions(logs: list[dict]) -> dict:
         f"[{log['sender']}] {log['message']}" for log in logs
     )
 
-    response = await openai_client.chat.completions.create(
+    response = await get_openai_gateway().chat(
+        "cron.analysis",
         model="gpt-4o-mini",
         response_format={"type": "json_object"},
         messages=[
@@ -67,21 +161,29 @@ async def analyze_emotions(logs: list[dict]) -> dict:
     return json.loads(response.choices[0].message.content)
 
 
-def upsert_daily_emotion(companion_id: str, analysis: dict) -> None:
-    """Upsert the emotional analysis into Daily_Emotions."""
-    sb = get_supabase_client()
-    yesterday = date.today() - timedelta(days=1)
-
-    row = {
-        "date": str(yesterday),
-        "companion_id": companion_id,
-        "primary_emotion": analysis.get("primary_emotion", ""),
-        "color_hex": analysis.get("color_hex", "#808080"),
-        "summary_text": analysis.get("summary_text", ""),
-        "key_quote": analysis.get("key_quote", ""),
-    }
+def upsert_daily_emotion(
+    companion_id: str, analysis: dict, day: date | None = None
+) -> None:
+    """Upsert the emotional analysis into Daily_Emotions for the given local day.
 
-    sb.table("Daily_Emotions").upsert(row).execute()
+    Goes through the upsert_daily_emotion_with_rollup RPC, which applies the
+    change to the Monthly_Emotions rollup in the same transaction.
+    """
+    sb = get_supabase_client()
+    day = day or local_yesterday(DEFAULT_TIMEZONE)
+
+    sb.rpc(
+        "upsert_daily_emotion_with_rollup",
+        {
+            "target_companion_id": companion_id,
+            "target_date": str(day),
+            "new_primary_emotion": analysis.get("primary_emotion", ""),
+            "new_color_hex": analysis.get("color_hex", "#808080"),
+            "new_summary_text": analysis.get("summary_text", ""),
+            "new_key_quote": analysis.get("key_quote", ""),
+        },
+    ).execute()
+    invalidate_emotions(companion_id)
 
 
 def fetch_current_summary(companion_id: str) -> str:
@@ -112,7 +214,8 @@ async def generate_rolling_summary(
         todays_logs=logs_text,
     )
 
-    response = await openai_client.chat.completions.create(
+    response = await get_openai_gateway().chat(
+        "cron.summary",
         model="gpt-4o-mini",
         messages=[{"role": "user", "content": prompt}],
         max_tokens=300,
@@ -126,32 +229,292 @@ def update_companion_summary(companion_id: str, new_summary: str) -> None:
     sb.table("Companions").update({"summary": new_summary}).eq(
         "companion_id", companion_id
     ).execute()
+    invalidate_companion(companion_id)
+
+
+# ── Progress (migration 010) ──
+def load_watermark() -> datetime | None:
+    """End of the last slice the continuous job completed, if any."""
+    sb = get_supabase_client()
+    result = (
+        sb.table("Cron_Watermarks")
+        .select("watermark")
+        .eq("job", WATERMARK_JOB)
+        .maybe_single()
+        .execute()
+    )
+    if not result or not result.data:
+        return None
+    return datetime.fromisoformat(result.data["watermark"])
+
+
+def save_watermark(moment: datetime) -> None:
+    sb = get_supabase_client()
+    sb.table("Cron_Watermarks").upsert(
+        {"job": WATERMARK_JOB, "watermark": moment.isoformat(),
+         "updated_at": datetime.now(timezone.utc).isoformat()},
+        on_conflict="job",
+    ).execute()
+
+
+def fetch_due_retries(now: datetime) -> list[dict]:
+    sb = get_supabase_client()
+    result = (
+        sb.table("Analysis_Retries")
+        .select("companion_id, day, timezone, attempts")
+        .lte("next_attempt_at", now.isoformat())
+        .order("next_attempt_at")
+        .execute()
+    )
+    return result.data or []
+
+
+def schedule_retry(cid: str, tz_name: str, day: date, attempts: int, error: Exception, base: timedelta) -> None:
+    """Queue a failed companion day for a later slice (base, 2x, 4x... later),
+    or give up on it after ANALYSIS_MAX_ATTEMPTS."""
+    sb = get_supabase_client()
+    if attempts >= settings.ANALYSIS_MAX_ATTEMPTS:
+        companions_total.inc(outcome="abandoned")
+        print(f"  [{cid}] Giving up on {day} after {attempts} attempts: {error}")
+        clear_retry(cid, day)
+        return
+    sb.table("Analysis_Retries").upsert(
+        {
+            "companion_id": cid,
+            "day": day.isoformat(),
+            "timezone": tz_name,
+            "attempts": attempts,
+            "next_attempt_at": (datetime.now(timezone.utc) + base * 2 ** (attempts - 1)).isoformat(),
+            "last_error": str(error)[:500],
+        },
+        on_conflict="companion_id,day",
+    ).execute()
+
+
+def clear_retry(cid: str, day: date) -> None:
+    sb = get_supabase_client()
+    sb.table("Analysis_Retries").delete().eq("companion_id", cid).eq("day", day.isoformat()).execute()
+
+
+async def analyze_companion(cid: str, tz_name: str, day: date) -> bool:
+    """Analyze one companion's local day. Returns False if there were no logs."""
+    try:
+        with companion_seconds.time():
+            analyzed = await _analyze_companion(cid, tz_name, day)
+    except Exception:
+        companions_total.inc(outcome="failed")
+        raise
+    companions_total.inc(outcome="analyzed" if analyzed else "skipped")
+    return analyzed
+
+
+async def _analyze_companion(cid: str, tz_name: str, day: date) -> bool:
+    logs = fetch_yesterdays_logs(cid, tz_name, day)
+    if not logs:
+        print(f"  [{cid}] No logs on {day} ({tz_name}), skipping.")
+        return False
+
+    print(f"  [{cid}] Analyzing {len(logs)} messages from {day} ({tz_name})...")
+    analysis = await analyze_emotions(logs)
+    upsert_daily_emotion(cid, analysis, day)
+    print(f"  [{cid}] Done -> {analysis.get('primary_emotion')} {analysis.get('color_hex')}")
+
+    # Rolling summary generation
+    current_summary = fetch_current_summary(cid)
+    new_summary = await generate_rolling_summary(current_summary, analysis, logs)
+    update_companion_summary(cid, new_summary)
+    print(f"  [{cid}] Summary updated ({len(new_summary)} chars)")
+    return True
 
 
 async def run_daily_analysis():
-    """Main entry point: analyze all companions."""
-    companion_ids = get_all_companion_ids()
-    print(f"[Daily Analysis] Processing {len(companion_ids)} companions...")
-
-    for cid in companion_ids:
-        logs = fetch_yesterdays_logs(cid)
-        if not logs:
-            print(f"  [{cid}] No logs yesterday, skipping.")
+    """One-shot entry point: analyze every companion's local yesterday."""
+    companions = get_all_companions()
+    print(f"[Daily Analysis] Processing {len(companions)} companions...")
+
+    for row in companions:
+        tz_name = row.get("timezone") or DEFAULT_TIMEZONE
+        await analyze_companion(row["companion_id"], tz_name, local_yesterday(tz_name))
+
+    print("[Daily Analysis] Complete.")
+
+
+# ── Continuous (rolling slice) mode ──
+@dataclass
+class SliceStats:
+    """Per-slice throughput and queue-lag metrics.
+
+    Lag is measured from a cohort's local midnight (the moment its day
+    became analyzable) to the moment each companion's analysis started.
+    """
+    slice_start: datetime
+    slice_end: datetime
+    cohorts: int = 0
+    companions: int = 0
+    analyzed: int = 0
+    skipped: int = 0
+    failed: int = 0
+    retried: int = 0
+    lags: list[float] = field(default_factory=list)
+    duration: float = 0.0
+
+    def lag_percentile(self, pct: float) -> float:
+        if not self.lags:
+            return 0.0
+        ordered = sorted(self.lags)
+        idx = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+        return ordered[idx]
+
+    def report(self) -> str:
+        return (
+            f"[Slice {self.slice_start:%H:%M}-{self.slice_end:%H:%M} UTC] "
+            f"cohorts={self.cohorts} companions={self.companions} "
+            f"analyzed={self.analyzed} skipped={self.skipped} failed={self.failed} retried={self.retried} "
+            f"lag_p50={self.lag_percentile(50):.0f}s lag_max={self.lag_percentile(100):.0f}s "
+            f"duration={self.duration:.1f}s"
+        )
+
+
+async def run_slice(slice_start: datetime, slice_end: datetime) -> SliceStats:
+    """Analyze every timezone cohort whose local midnight fell in (slice_start, slice_end],
+    then the failed companion days that are due for a retry. Failures are
+    queued for a later slice."""
+    stats = SliceStats(slice_start=slice_start, slice_end=slice_end)
+    started = time.monotonic()
+    retry_base = slice_end - slice_start
+
+    due = timezones_due(slice_start, slice_end)
+    companions = get_companions_in_timezones(sorted(due))
+    stats.cohorts = len({row["timezone"] for row in companions})
+    stats.companions = len(companions)
+
+    for row in companions:
+        cid, tz_name = row["companion_id"], row["timezone"]
+        midnight = due[tz_name]
+        # Local midnight starts a new day; the day to analyze is the one that just ended
+        day = midnight.astimezone(get_zone(tz_name)).date() - timedelta(days=1)
+        lag = (datetime.now(timezone.utc) - midnight).total_seconds()
+        stats.lags.append(lag)
+        cohort_lag_seconds.observe(lag)
+        await _run_companion(stats, cid, tz_name, day, 0, retry_base)
+
+    try:
+        retries = fetch_due_retries(datetime.now(timezone.utc))
+    except Exception as e:
+        print(f"  Could not read analysis retries: {e}")
+        retries = []
+    for row in retries:
+        stats.retried += 1
+        await _run_companion(
+            stats, row["companion_id"], row["timezone"], date.fromisoformat(str(row["day"])[:10]),
+            row["attempts"], retry_base,
+        )
+
+    stats.duration = time.monotonic() - started
+    return stats
+
+
+async def _run_companion(
+    stats: SliceStats, cid: str, tz_name: str, day: date, attempts: int, retry_base: timedelta
+) -> None:
+    """Analyze one companion day; attempts > 0 means it is a retry."""
+    try:
+        if await analyze_companion(cid, tz_name, day):
+            stats.analyzed += 1
+        else:
+            stats.skipped += 1
+    except Exception as e:
+        stats.failed += 1
+        print(f"  [{cid}] Analysis failed: {e}")
+        try:
+            schedule_retry(cid, tz_name, day, attempts + 1, e, retry_base)
+        except Exception as queue_error:
+            print(f"  [{cid}] Could not queue a retry for {day}: {queue_error}")
+        return
+    if attempts:
+        try:
+            clear_retry(cid, day)
+        except Exception as e:
+            print(f"  [{cid}] Could not clear the retry for {day}: {e}")
+
+
+def floor_to_slice(moment: datetime, slice_minutes: int) -> datetime:
+    """Round an aware datetime down to the nearest slice boundary."""
+    slice_seconds = slice_minutes * 60
+    epoch = int(moment.timestamp()) // slice_seconds * slice_seconds
+    return datetime.fromtimestamp(epoch, tz=timezone.utc)
+
+
+async def run_continuous(slice_minutes: int):
+    """Run forever, processing each timezone cohort shortly after its local midnight.
+
+    Slices are contiguous and start from the persisted watermark: after an
+    overrun or downtime the job catches up one slice at a time (a slice
+    longer than a day would miss cohorts' earlier midnights), going back at
+    most ANALYSIS_MAX_CATCHUP_DAYS.
+    """
+    print(f"[Daily Analysis] Continuous mode, {slice_minutes}-minute slices.")
+    step = timedelta(minutes=slice_minutes)
+    now_floor = floor_to_slice(datetime.now(timezone.utc), slice_minutes)
+    try:
+        last_end = load_watermark()
+    except Exception as e:
+        print(f"[Daily Analysis] Could not read the watermark, starting from now: {e}")
+        last_end = None
+    if last_end is None:
+        last_end = now_floor
+    oldest = now_floor - timedelta(days=settings.ANALYSIS_MAX_CATCHUP_DAYS)
+    if last_end < oldest:
+        print(f"[Daily Analysis] Watermark {last_end:%Y-%m-%d %H:%M} is too old, catching up from {oldest:%Y-%m-%d %H:%M}.")
+        last_end = oldest
+    elif last_end < now_floor:
+        print(f"[Daily Analysis] Catching up from {last_end:%Y-%m-%d %H:%M} UTC.")
+
+    while True:
+        slice_end = min(floor_to_slice(datetime.now(timezone.utc), slice_minutes), last_end + step)
+        if slice_end <= last_end:
+            wait = (last_end + step - datetime.now(timezone.utc)).total_seconds()
+            await asyncio.sleep(max(wait, 0))
             continue
 
-        print(f"  [{cid}] Analyzing {len(logs)} messages...")
-        analysis = await analyze_emotions(logs)
-        upsert_daily_emotion(cid, analysis)
-        print(f"  [{cid}] Done -> {analysis.get('primary_emotion')} {analysis.get('color_hex')}")
+        stats = await run_slice(last_end, slice_end)
+        print(stats.report())
+        last_end = slice_end
+        try:
+            save_watermark(last_end)
+        except Exception as e:
+            print(f"[Daily Analysis] Could not save the watermark: {e}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Daily emotional analysis")
+    parser.add_argument(
+        "--continuous",
+        action="store_true",
+        help="run in rolling per-timezone slices instead of a one-shot batch",
+    )
+    parser.add_argument(
+        "--slice-minutes",
+        type=int,
+        default=settings.ANALYSIS_SLICE_MINUTES,
+        help="slice length in continuous mode",
+    )
+    parser.add_argument(
+        "--metrics-port",
+        type=int,
+        default=None,
+        help="serve Prometheus metrics on this port while running",
+    )
+    args = parser.parse_args()
 
-        # Rolling summary generation
-        current_summary = fetch_current_summary(cid)
-        new_summary = await generate_rolling_summary(current_summary, analysis, logs)
-        update_companion_summary(cid, new_summary)
-        print(f"  [{cid}] Summary updated ({len(new_summary)} chars)")
+    if args.metrics_port:
+        start_metrics_server(args.metrics_port)
 
-    print("[Daily Analysis] Complete.")
+    if args.continuous:
+        asyncio.run(run_continuous(args.slice_minutes))
+    else:
+        asyncio.run(run_daily_analysis())
 
 
 if __name__ == "__main__":
-    asyncio.run(run_daily_analysis())
+    main()
@@ -0,0 +1,124 @@
+"""
+Month-End Pre-Crystallization Batch.
+
+Runs off-peak after the month's final daily analysis (i.e. once the last
+timezone cohort has passed midnight on the 1st). For every companion with
+emotions in the month it precomputes the dominant emotion/color and the
+gpt-4o DALL-E prompt — and optionally the image — into Gem_Staging, so
+POST /store/crystallize can serve a ready result instantly. Each staged
+row carries a fingerprint of the month's Monthly_Emotions rollup;
+crystallize regenerates only if the daily data changed since, and marks
+the row consumed once it has made it into a gem (never re-staged).
+
+Usage:
+    python -m cron.precrystallize                    # previous month, prompts only
+    python -m cron.precrystallize --with-images      # also generate + store images
+    python -m cron.precrystallize --month 2026-09
+"""
+
+import argparse
+import asyncio
+from datetime import date, datetime, timedelta, timezone
+
+from app.core.supabase import get_supabase_client
+from app.services.crystallizer import (
+    generate_dalle_prompt,
+    generate_gem_image,
+    get_monthly_emotions,
+    get_monthly_rollup,
+    get_staged_gem,
+    month_start_date,
+    rollup_fingerprint,
+    save_staged_gem,
+)
+from app.services.gem_images import persist_gem_image
+
+
+def previous_month() -> str:
+    last_month_end = date.today().replace(day=1) - timedelta(days=1)
+    return last_month_end.strftime("%Y-%m")
+
+
+def get_eligible_companion_ids(month: str) -> list[str]:
+    """Return companions with a non-empty Monthly_Emotions rollup for the month."""
+    sb = get_supabase_client()
+    result = (
+        sb.table("Monthly_Emotions")
+        .select("companion_id")
+        .eq("month", month_start_date(month))
+        .gt("day_count", 0)
+        .execute()
+    )
+    return [row["companion_id"] for row in (result.data or [])]
+
+
+async def precrystallize_companion(cid: str, month: str, with_images: bool) -> str:
+    """Stage one companion's gem. Returns "staged", "fresh", "consumed" or "empty"."""
+    rollup = get_monthly_rollup(cid, month)
+    if not rollup or not rollup["day_count"]:
+        return "empty"
+
+    fingerprint = rollup_fingerprint(rollup)
+    staged = get_staged_gem(cid, month)
+    if staged and staged.get("consumed_at"):
+        # Already crystallized from the staged result
+        return "consumed"
+    if staged and staged["fingerprint"] == fingerprint and (staged.get("image_url") or not with_images):
+        return "fresh"
+
+    emotions = get_monthly_emotions(cid, month)
+    dalle_prompt, emotion, color = await generate_dalle_prompt(emotions, rollup)
+    row = {
+        "fingerprint": fingerprint,
+        "dominant_emotion": emotion,
+        "dominant_color": color,
+        "dalle_prompt": dalle_prompt,
+        "source_days": rollup["day_count"],
+        "image_url": None,
+        "image_variants": None,
+        "created_at": datetime.now(timezone.utc).isoformat(),
+    }
+
+    if with_images:
+        # Only stage images that were persisted; DALL-E URLs expire
+        image_variants = await persist_gem_image(await generate_gem_image(dalle_prompt))
+        if image_variants:
+            row["image_url"] = image_variants["original"]
+            row["image_variants"] = image_variants
+
+    save_staged_gem(cid, month, row)
+    return "staged"
+
+
+async def run_precrystallize(month: str, with_images: bool):
+    companion_ids = get_eligible_companion_ids(month)
+    print(f"[Pre-Crystallize] {month}: {len(companion_ids)} companions (images={with_images})...")
+
+    counts = {"staged": 0, "fresh": 0, "consumed": 0, "empty": 0, "failed": 0}
+    for cid in companion_ids:
+        try:
+            outcome = await precrystallize_companion(cid, month, with_images)
+        except Exception as e:
+            outcome = "failed"
+            print(f"  [{cid}] Failed: {e}")
+        counts[outcome] += 1
+        if outcome == "staged":
+            print(f"  [{cid}] Staged.")
+
+    print(f"[Pre-Crystallize] Complete: {counts}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Month-end gem pre-crystallization")
+    parser.add_argument("--month", default=None, help="YYYY-MM (default: previous month)")
+    parser.add_argument(
+        "--with-images",
+        action="store_true",
+        help="also generate and store the DALL-E image (paid)",
+    )
+    args = parser.parse_args()
+    asyncio.run(run_precrystallize(args.month or previous_month(), args.with_images))
+
+
+if __name__ == "__main__":
+    main()
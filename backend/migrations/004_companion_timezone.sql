@@ -0,0 +1,15 @@
+-- Migration 004: Per-companion timezone for daily emotion analysis
+-- Run this in Supabase SQL Editor after 003_improved_search.sql
+
+-- IANA timezone name (e.g. 'Asia/Seoul') used to define the user's local day.
+-- The daily analysis cron processes each timezone cohort shortly after its local midnight.
+ALTER TABLE public."Companions"
+    ADD COLUMN IF NOT EXISTS timezone VARCHAR(64) DEFAULT 'UTC';
+
+UPDATE public."Companions" SET timezone = 'UTC' WHERE timezone IS NULL;
+
+ALTER TABLE public."Companions" ALTER COLUMN timezone SET NOT NULL;
+
+-- Cohort lookup: "all companions whose local midnight just passed"
+CREATE INDEX IF NOT EXISTS idx_companions_timezone
+ON public."Companions" (timezone);
@@ -0,0 +1,7 @@
+-- Migration 005: Persisted gem image variants
+-- Run this in Supabase SQL Editor after 004_companion_timezone.sql
+
+-- Content-addressed URLs of the stored original and pre-rendered sizes:
+-- {"original": url, "thumb": {"webp": url, "avif": url}, "medium": {...}, "sha256": hex}
+ALTER TABLE public."User_Inventory"
+    ADD COLUMN IF NOT EXISTS image_variants JSONB;
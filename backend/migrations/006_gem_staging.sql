@@ -0,0 +1,18 @@
+-- Migration 006: Staging table for month-end pre-crystallized gems
+-- Run this in Supabase SQL Editor after 005_inventory_image_variants.sql
+
+-- Filled off-peak by cron/precrystallize.py; read by POST /store/crystallize.
+-- fingerprint = SHA-256 of the source emotion data the result was derived from.
+CREATE TABLE IF NOT EXISTS public."Gem_Staging" (
+    companion_id UUID REFERENCES public."Companions"(companion_id) ON DELETE CASCADE,
+    month VARCHAR(7) NOT NULL,            -- 'YYYY-MM'
+    fingerprint VARCHAR(64) NOT NULL,
+    dominant_emotion VARCHAR(50),
+    dominant_color VARCHAR(7),
+    dalle_prompt TEXT NOT NULL,
+    source_days INT,
+    image_url TEXT,
+    image_variants JSONB,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT timezone('utc'::text, now()),
+    PRIMARY KEY (companion_id, month)
+);
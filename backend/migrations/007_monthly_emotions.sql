@@ -0,0 +1,154 @@
+-- Migration 007: Incrementally maintained monthly emotion rollup
+-- Run this in Supabase SQL Editor after 006_gem_staging.sql
+
+-- One row per (companion, month). Calendar and crystallize reads cost O(months)
+-- instead of O(days), and dominant values are computed in the database.
+CREATE TABLE IF NOT EXISTS public."Monthly_Emotions" (
+    companion_id UUID REFERENCES public."Companions"(companion_id) ON DELETE CASCADE,
+    month DATE NOT NULL,                      -- first day of the month
+    emotion_counts JSONB NOT NULL DEFAULT '{}',
+    color_counts JSONB NOT NULL DEFAULT '{}',
+    dominant_emotion VARCHAR(50),
+    dominant_color VARCHAR(7),
+    day_count INT NOT NULL DEFAULT 0,
+    version BIGINT NOT NULL DEFAULT 0,        -- bumped on every daily upsert in the month
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT timezone('utc'::text, now()),
+    PRIMARY KEY (companion_id, month)
+);
+
+-- Most frequent key of a {key: count} object (ties broken alphabetically)
+CREATE OR REPLACE FUNCTION _jsonb_top_key(counts JSONB)
+RETURNS TEXT
+LANGUAGE sql
+IMMUTABLE
+AS $$
+    SELECT key
+    FROM jsonb_each_text(counts)
+    WHERE value::INT > 0
+    ORDER BY value::INT DESC, key ASC
+    LIMIT 1;
+$$;
+
+-- Add delta (+1 / -1) to one key of a {key: count} object, dropping zero counts
+CREATE OR REPLACE FUNCTION _jsonb_bump(counts JSONB, k TEXT, delta INT)
+RETURNS JSONB
+LANGUAGE sql
+IMMUTABLE
+AS $$
+    SELECT CASE
+        WHEN k IS NULL THEN counts
+        WHEN COALESCE((counts ->> k)::INT, 0) + delta <= 0 THEN counts - k
+        ELSE counts || jsonb_build_object(k, COALESCE((counts ->> k)::INT, 0) + delta)
+    END;
+$$;
+
+-- Upsert one Daily_Emotions row and apply the change to the monthly rollup
+-- in the same transaction. Re-running a day replaces its previous contribution.
+CREATE OR REPLACE FUNCTION upsert_daily_emotion_with_rollup(
+    target_companion_id UUID,
+    target_date DATE,
+    new_primary_emotion VARCHAR(50),
+    new_color_hex VARCHAR(7),
+    new_summary_text TEXT,
+    new_key_quote TEXT
+)
+RETURNS VOID
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    old_row public."Daily_Emotions"%ROWTYPE;
+    target_month DATE := date_trunc('month', target_date)::DATE;
+    rollup public."Monthly_Emotions"%ROWTYPE;
+BEGIN
+    INSERT INTO public."Monthly_Emotions" (companion_id, month)
+    VALUES (target_companion_id, target_month)
+    ON CONFLICT (companion_id, month) DO NOTHING;
+
+    -- Lock the rollup row first so concurrent upserts for the month serialize
+    SELECT * INTO rollup
+    FROM public."Monthly_Emotions"
+    WHERE companion_id = target_companion_id AND month = target_month
+    FOR UPDATE;
+
+    SELECT * INTO old_row
+    FROM public."Daily_Emotions"
+    WHERE companion_id = target_companion_id AND date = target_date;
+
+    IF FOUND THEN
+        rollup.emotion_counts := _jsonb_bump(rollup.emotion_counts, old_row.primary_emotion, -1);
+        rollup.color_counts := _jsonb_bump(rollup.color_counts, old_row.color_hex, -1);
+    ELSE
+        rollup.day_count := rollup.day_count + 1;
+    END IF;
+
+    rollup.emotion_counts := _jsonb_bump(rollup.emotion_counts, new_primary_emotion, 1);
+    rollup.color_counts := _jsonb_bump(rollup.color_counts, new_color_hex, 1);
+
+    INSERT INTO public."Daily_Emotions"
+        (date, companion_id, primary_emotion, color_hex, summary_text, key_quote)
+    VALUES
+        (target_date, target_companion_id, new_primary_emotion, new_color_hex, new_summary_text, new_key_quote)
+    ON CONFLICT (date, companion_id) DO UPDATE SET
+        primary_emotion = EXCLUDED.primary_emotion,
+        color_hex = EXCLUDED.color_hex,
+        summary_text = EXCLUDED.summary_text,
+        key_quote = EXCLUDED.key_quote;
+
+    UPDATE public."Monthly_Emotions" SET
+        emotion_counts = rollup.emotion_counts,
+        color_counts = rollup.color_counts,
+        dominant_emotion = _jsonb_top_key(rollup.emotion_counts),
+        dominant_color = _jsonb_top_key(rollup.color_counts),
+        day_count = rollup.day_count,
+        version = rollup.version + 1,
+        updated_at = timezone('utc'::text, now())
+    WHERE companion_id = target_companion_id AND month = target_month;
+END;
+$$;
+
+-- Backfill from existing daily rows
+WITH days AS (
+    SELECT companion_id, date_trunc('month', date)::DATE AS month, COUNT(*) AS day_count
+    FROM public."Daily_Emotions"
+    GROUP BY 1, 2
+),
+emotions AS (
+    SELECT companion_id, date_trunc('month', date)::DATE AS month, primary_emotion, COUNT(*) AS n
+    FROM public."Daily_Emotions"
+    WHERE primary_emotion IS NOT NULL
+    GROUP BY 1, 2, 3
+),
+colors AS (
+    SELECT companion_id, date_trunc('month', date)::DATE AS month, color_hex, COUNT(*) AS n
+    FROM public."Daily_Emotions"
+    WHERE color_hex IS NOT NULL
+    GROUP BY 1, 2, 3
+),
+counts AS (
+    SELECT
+        d.companion_id,
+        d.month,
+        d.day_count,
+        COALESCE((
+            SELECT jsonb_object_agg(e.primary_emotion, e.n) FROM emotions e
+            WHERE e.companion_id = d.companion_id AND e.month = d.month
+        ), '{}') AS emotion_counts,
+        COALESCE((
+            SELECT jsonb_object_agg(c.color_hex, c.n) FROM colors c
+            WHERE c.companion_id = d.companion_id AND c.month = d.month
+        ), '{}') AS color_counts
+    FROM days d
+)
+INSERT INTO public."Monthly_Emotions"
+    (companion_id, month, emotion_counts, color_counts, dominant_emotion, dominant_color, day_count, version)
+SELECT
+    companion_id,
+    month,
+    emotion_counts,
+    color_counts,
+    _jsonb_top_key(emotion_counts),
+    _jsonb_top_key(color_counts),
+    day_count,
+    1
+FROM counts
+ON CONFLICT (companion_id, month) DO NOTHING;
@@ -0,0 +1,14 @@
+-- Migration 008: Shared per-companion conversational state
+-- Run this in Supabase SQL Editor after 007_monthly_emotions.sql
+
+-- Backs app/core/session_state.py (e.g. scope 'naming', key = companion_id),
+-- so ceremony state survives reconnects to another worker or node.
+-- version is bumped on every write; compare-and-set updates are guarded by it.
+CREATE TABLE IF NOT EXISTS public."Session_State" (
+    scope VARCHAR(50) NOT NULL,
+    key VARCHAR(100) NOT NULL,
+    value JSONB,
+    version BIGINT NOT NULL DEFAULT 1,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT timezone('utc'::text, now()),
+    PRIMARY KEY (scope, key)
+);
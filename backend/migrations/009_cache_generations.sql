@@ -0,0 +1,46 @@
+-- Migration 009: Shared response-cache generations
+-- Run this in Supabase SQL Editor after 008_session_state.sql
+
+-- Backs the "supabase" CACHE_BACKEND (app/core/cache.py). Every worker keeps
+-- response bodies in process, keyed by the resource's generation read from
+-- here, so an invalidation from any worker or the cron orphans all copies.
+-- Generations come from one sequence and are never reused.
+CREATE SEQUENCE IF NOT EXISTS public.cache_generation_seq;
+
+CREATE TABLE IF NOT EXISTS public."Cache_Generations" (
+    key VARCHAR(200) PRIMARY KEY,
+    generation BIGINT NOT NULL,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT timezone('utc'::text, now())
+);
+
+-- Current generation of a key, assigning a fresh one if it has none
+CREATE OR REPLACE FUNCTION cache_generation(p_key VARCHAR)
+RETURNS BIGINT
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    current BIGINT;
+BEGIN
+    SELECT generation INTO current FROM public."Cache_Generations" WHERE key = p_key;
+    IF FOUND THEN
+        RETURN current;
+    END IF;
+    INSERT INTO public."Cache_Generations" (key, generation)
+    VALUES (p_key, nextval('public.cache_generation_seq'))
+    ON CONFLICT (key) DO NOTHING;
+    SELECT generation INTO current FROM public."Cache_Generations" WHERE key = p_key;
+    RETURN current;
+END;
+$$;
+
+-- Move a key to a new generation (invalidation)
+CREATE OR REPLACE FUNCTION bump_cache_generation(p_key VARCHAR)
+RETURNS BIGINT
+LANGUAGE sql
+AS $$
+    INSERT INTO public."Cache_Generations" (key, generation, updated_at)
+    VALUES (p_key, nextval('public.cache_generation_seq'), timezone('utc'::text, now()))
+    ON CONFLICT (key) DO UPDATE
+        SET generation = EXCLUDED.generation, updated_at = EXCLUDED.updated_at
+    RETURNING generation;
+$$;
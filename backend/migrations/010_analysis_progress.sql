@@ -0,0 +1,25 @@
+-- Migration 010: Daily analysis progress and retries
+-- Run this in Supabase SQL Editor after 009_cache_generations.sql
+
+-- End of the last slice the continuous daily analysis completed, per job, so
+-- a restarted cron catches up on every cohort whose midnight passed while
+-- it was down (cron/daily_analysis.py).
+CREATE TABLE IF NOT EXISTS public."Cron_Watermarks" (
+    job VARCHAR(50) PRIMARY KEY,
+    watermark TIMESTAMP WITH TIME ZONE NOT NULL,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT timezone('utc'::text, now())
+);
+
+-- Companion days whose analysis failed, retried in later slices with backoff
+CREATE TABLE IF NOT EXISTS public."Analysis_Retries" (
+    companion_id UUID REFERENCES public."Companions"(companion_id) ON DELETE CASCADE,
+    day DATE NOT NULL,                        -- the companion's local day to analyze
+    timezone VARCHAR(64) NOT NULL,
+    attempts INT NOT NULL DEFAULT 1,
+    next_attempt_at TIMESTAMP WITH TIME ZONE NOT NULL,
+    last_error TEXT,
+    PRIMARY KEY (companion_id, day)
+);
+
+CREATE INDEX IF NOT EXISTS idx_analysis_retries_due
+    ON public."Analysis_Retries" (next_attempt_at);
@@ -0,0 +1,27 @@
+-- Migration 011: Shared background job state
+-- Run this in Supabase SQL Editor after 010_analysis_progress.sql
+
+-- Backs the "supabase" JOB_STORE_BACKEND (app/services/job_queue.py): jobs
+-- run in the worker that accepted them, but any worker can answer a status
+-- poll or find the live job for a dedupe key, e.g. (companion_id, month).
+CREATE TABLE IF NOT EXISTS public."Background_Jobs" (
+    job_id VARCHAR(32) PRIMARY KEY,
+    queue VARCHAR(50) NOT NULL,
+    dedupe_key VARCHAR(200) NOT NULL,
+    payload JSONB,
+    status VARCHAR(20) NOT NULL DEFAULT 'queued',   -- queued | running | done | failed
+    stage VARCHAR(50) NOT NULL DEFAULT 'queued',
+    result JSONB,
+    error TEXT,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT timezone('utc'::text, now()),
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT timezone('utc'::text, now())
+);
+
+-- At most one queued or running job per key: a second worker's insert
+-- fails, so two workers never start the same paid job
+CREATE UNIQUE INDEX IF NOT EXISTS idx_background_jobs_live
+    ON public."Background_Jobs" (queue, dedupe_key)
+    WHERE status IN ('queued', 'running');
+
+CREATE INDEX IF NOT EXISTS idx_background_jobs_key
+    ON public."Background_Jobs" (queue, dedupe_key, created_at DESC);
@@ -0,0 +1,8 @@
+-- Migration 012: Mark staged gems once crystallized
+-- Run this in Supabase SQL Editor after 011_background_jobs.sql
+
+-- Set by POST /store/crystallize when it turns a staged result into an
+-- inventory gem. A consumed row is never served again (a later crystallize
+-- for the month generates a new gem) nor re-staged by cron/precrystallize.py.
+ALTER TABLE public."Gem_Staging"
+    ADD COLUMN IF NOT EXISTS consumed_at TIMESTAMP WITH TIME ZONE;
@@ -1,9 +1,11 @@
 "use client";
 
-import { useEffect } from "react";
+import { useEffect, useState } from "react";
 import { useRouter } from "next/navigation";
 import Link from "next/link";
 import { useCompanionStore } from "@/lib/store";
+import { fetchDashboard } from "@/lib/api";
+import type { Dashboard } from "@/lib/api";
 import EmotionCalendar from "@/components/EmotionCalendar";
 import GemCollection from "@/components/GemCollection";
 
@@ -12,6 +14,8 @@ export default function LogPage() {
   const companionId = useCompanionStore((s) => s.companionId);
   const companionName = useCompanionStore((s) => s.companionName);
   const userId = useCompanionStore((s) => s.userId);
+  // undefined while loading, null if the aggregate call failed (widgets fetch on their own)
+  const [dashboard, setDashboard] = useState<Dashboard | null | undefined>(undefined);
 
   useEffect(() => {
     if (!companionId) {
@@ -19,7 +23,22 @@ export default function LogPage() {
     }
   }, [companionId, router]);
 
-  if (!companionId || !userId) return null;
+  useEffect(() => {
+    if (!userId) return;
+    // The calendar opens on the client's current month
+    const now = new Date();
+    const month = `${now.getFullYear()}-${String(now.getMonth() + 1).padStart(2, "0")}`;
+    fetchDashboard(userId, month)
+      .then(setDashboard)
+      .catch((err) => {
+        console.error(err);
+        setDashboard(null);
+      });
+  }, [userId]);
+
+  if (!companionId || !userId || dashboard === undefined) return null;
+
+  const companion = dashboard?.companions.find((c) => c.companion_id === companionId);
 
   return (
     <div className="min-h-screen noise-bg">
@@ -47,7 +66,7 @@ export default function LogPage() {
         </div>
 
         {/* Calendar */}
-        <EmotionCalendar companionId={companionId} />
+        <EmotionCalendar companionId={companionId} initialEmotions={companion?.emotions} />
 
         {/* Divider */}
         <div className="flex items-center gap-4">
@@ -57,7 +76,11 @@ export default function LogPage() {
         </div>
 
         {/* Gems */}
-        <GemCollection userId={userId} companionId={companionId} />
+        <GemCollection
+          userId={userId}
+          companionId={companionId}
+          initialItems={dashboard?.inventory}
+        />
       </div>
     </div>
   );
@@ -70,6 +70,7 @@ export default function RitualPage() {
         name: "???",
         relationship_type: "friend",
         tone_style: tone,
+        timezone: Intl.DateTimeFormat().resolvedOptions().timeZone,
       });
 
       setCompanion(companion.companion_id, companion.name, userId);
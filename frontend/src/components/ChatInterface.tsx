@@ -70,7 +70,16 @@ export default function ChatInterface({
     ws.onmessage = (event) => {
       if (cancelled) return;
 
-      let data: { type?: string; content?: string; error?: string; intent?: string; emotion_color?: string | null };
+      let data: {
+        type?: string;
+        content?: string;
+        error?: string;
+        intent?: string;
+        emotion_color?: string | null;
+        reason?: string;
+        dropped?: boolean;
+        retry_after?: number;
+      };
       try {
         data = JSON.parse(event.data);
       } catch {
@@ -152,6 +161,20 @@ export default function ChatInterface({
             intent: "announcement",
           },
         ]);
+      } else if (data.type === "rate_limited") {
+        // Admission control: message dropped (queue full) or held back (bucket empty)
+        setMessages((prev) => [
+          ...prev,
+          {
+            id: `rate-limited-${Date.now()}`,
+            sender: "AI" as const,
+            text: data.dropped
+              ? "메시지가 너무 빨라요. 잠시 후 다시 보내 주세요."
+              : "조금만 천천히 이야기해요. 곧 답할게요.",
+            isStreaming: false,
+            intent: "rate_limited",
+          },
+        ]);
       } else if (data.type === "end") {
         const streamId = streamingIdRef.current;
         if (streamId) {
@@ -7,6 +7,8 @@ import { fetchEmotions } from "@/lib/api";
 
 interface EmotionCalendarProps {
   companionId: string;
+  // Current month's emotions, if the parent already loaded them
+  initialEmotions?: DailyEmotion[];
 }
 
 function getDaysInMonth(year: number, month: number) {
@@ -23,19 +25,26 @@ const MONTHS = [
   "July", "August", "September", "October", "November", "December",
 ];
 
-export default function EmotionCalendar({ companionId }: EmotionCalendarProps) {
-  const [emotions, setEmotions] = useState<DailyEmotion[]>([]);
+export default function EmotionCalendar({ companionId, initialEmotions }: EmotionCalendarProps) {
+  const [emotions, setEmotions] = useState<DailyEmotion[]>(initialEmotions ?? []);
   const [selected, setSelected] = useState<DailyEmotion | null>(null);
 
   const now = new Date();
   const [year, setYear] = useState(now.getFullYear());
   const [month, setMonth] = useState(now.getMonth());
 
+  // Only fetch the displayed month
   useEffect(() => {
-    fetchEmotions(companionId)
+    if (initialEmotions && year === now.getFullYear() && month === now.getMonth()) {
+      setEmotions(initialEmotions);
+      return;
+    }
+    const m = String(month + 1).padStart(2, "0");
+    const lastDay = String(getDaysInMonth(year, month)).padStart(2, "0");
+    fetchEmotions(companionId, { start: `${year}-${m}-01`, end: `${year}-${m}-${lastDay}` })
       .then(setEmotions)
       .catch(console.error);
-  }, [companionId]);
+  }, [companionId, initialEmotions, year, month]);
 
   const emotionMap = useMemo(() => {
     const map: Record<string, DailyEmotion> = {};
@@ -2,24 +2,57 @@
 
 import { useEffect, useState } from "react";
 import { motion, AnimatePresence } from "framer-motion";
-import type { InventoryItem } from "@/lib/api";
+import type { ImageVariant, InventoryItem } from "@/lib/api";
 import { fetchInventory, crystallize } from "@/lib/api";
 
+function GemImage({
+  src,
+  variant,
+  alt,
+  className,
+}: {
+  src: string;
+  variant?: ImageVariant;
+  alt: string;
+  className: string;
+}) {
+  if (!variant) {
+    // eslint-disable-next-line @next/next/no-img-element
+    return <img src={src} alt={alt} className={className} loading="lazy" />;
+  }
+  return (
+    <picture>
+      <source srcSet={variant.avif} type="image/avif" />
+      <source srcSet={variant.webp} type="image/webp" />
+      {/* eslint-disable-next-line @next/next/no-img-element */}
+      <img src={variant.webp} alt={alt} className={className} loading="lazy" />
+    </picture>
+  );
+}
+
 interface GemCollectionProps {
   userId: string;
   companionId: string;
+  // First inventory page, if the parent already loaded it
+  initialItems?: InventoryItem[];
 }
 
-export default function GemCollection({ userId, companionId }: GemCollectionProps) {
-  const [items, setItems] = useState<InventoryItem[]>([]);
+const onlyGems = (items: InventoryItem[]) => items.filter((i) => i.item_type === "MEMORY_GEM");
+
+export default function GemCollection({ userId, companionId, initialItems }: GemCollectionProps) {
+  const [items, setItems] = useState<InventoryItem[]>(onlyGems(initialItems ?? []));
   const [selected, setSelected] = useState<InventoryItem | null>(null);
   const [isGenerating, setIsGenerating] = useState(false);
 
   useEffect(() => {
+    if (initialItems) {
+      setItems(onlyGems(initialItems));
+      return;
+    }
     fetchInventory(userId)
-      .then((data) => setItems(data.filter((i) => i.item_type === "MEMORY_GEM")))
+      .then((data) => setItems(onlyGems(data)))
       .catch(console.error);
-  }, [userId]);
+  }, [userId, initialItems]);
 
   const handleCrystallize = async () => {
     if (isGenerating) return;
@@ -28,7 +61,7 @@ export default function GemCollection({ userId, companionId }: GemCollectionProp
       const result = await crystallize(companionId, userId);
       // Refetch inventory
       const data = await fetchInventory(userId);
-      setItems(data.filter((i) => i.item_type === "MEMORY_GEM"));
+      setItems(onlyGems(data));
       // Select the new gem
       const newGem = data.find((i) => i.item_id === result.item_id);
       if (newGem) setSelected(newGem);
@@ -81,9 +114,9 @@ export default function GemCollection({ userId, companionId }: GemCollectionProp
               className="group relative aspect-square rounded-2xl overflow-hidden bg-surface border border-white/[0.06] hover:border-accent/20 transition-all"
             >
               {item.image_url && (
-                // eslint-disable-next-line @next/next/no-img-element
-                <img
+                <GemImage
                   src={item.image_url}
+                  variant={item.image_variants?.thumb}
                   alt="Memory Gem"
                   className="w-full h-full object-cover"
                 />
@@ -117,9 +150,9 @@ export default function GemCollection({ userId, companionId }: GemCollectionProp
               className="max-w-md w-full rounded-3xl overflow-hidden bg-surface border border-white/[0.08]"
             >
               {selected.image_url && (
-                // eslint-disable-next-line @next/next/no-img-element
-                <img
+                <GemImage
                   src={selected.image_url}
+                  variant={selected.image_variants?.medium}
                   alt="Memory Gem Detail"
                   className="w-full aspect-square object-cover"
                 />
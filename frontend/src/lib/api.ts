@@ -5,6 +5,7 @@ export interface CreateCompanionPayload {
   name: string;
   relationship_type: string;
   tone_style: string;
+  timezone?: string;
 }
 
 export async function createCompanion(payload: CreateCompanionPayload) {
@@ -26,17 +27,54 @@ export interface DailyEmotion {
   key_quote: string | null;
 }
 
-export async function fetchEmotions(companionId: string): Promise<DailyEmotion[]> {
-  const res = await fetch(`${API_URL}/emotions/${companionId}`);
+export async function fetchEmotions(
+  companionId: string,
+  range?: { start: string; end: string },
+): Promise<DailyEmotion[]> {
+  const query = range ? `?start=${range.start}&end=${range.end}` : "";
+  const res = await fetch(`${API_URL}/emotions/${companionId}${query}`);
   if (!res.ok) throw new Error(`Fetch emotions failed: ${res.status}`);
   return res.json();
 }
 
+export interface MonthlyEmotion {
+  month: string;
+  emotion_counts: Record<string, number>;
+  color_counts: Record<string, number>;
+  dominant_emotion: string | null;
+  dominant_color: string | null;
+  day_count: number;
+  updated_at: string;
+}
+
+export async function fetchMonthlyEmotions(
+  companionId: string,
+  range?: { start: string; end: string },
+): Promise<MonthlyEmotion[]> {
+  const query = range ? `?start=${range.start}&end=${range.end}` : "";
+  const res = await fetch(`${API_URL}/emotions/${companionId}/monthly${query}`);
+  if (!res.ok) throw new Error(`Fetch monthly emotions failed: ${res.status}`);
+  return res.json();
+}
+
+export interface ImageVariant {
+  webp: string;
+  avif: string;
+}
+
+export interface ImageVariants {
+  original: string;
+  thumb: ImageVariant;
+  medium: ImageVariant;
+  sha256: string;
+}
+
 export interface InventoryItem {
   item_id: string;
   user_id: string;
   item_type: string | null;
   image_url: string | null;
+  image_variants: ImageVariants | null;
   metadata: Record<string, unknown> | null;
   acquired_at: string;
 }
@@ -47,6 +85,43 @@ export async function fetchInventory(userId: string): Promise<InventoryItem[]> {
   return res.json();
 }
 
+export interface DashboardCompanion {
+  companion_id: string;
+  user_id: string;
+  name: string | null;
+  relationship_type: string | null;
+  tone_style: string | null;
+  timezone: string;
+  created_at: string;
+  emotions: DailyEmotion[];
+}
+
+export interface Dashboard {
+  companions: DashboardCompanion[];
+  inventory: InventoryItem[];
+  inventory_next_cursor: string | null;
+  month: string;
+}
+
+// Companions, this month's emotions and the first gem page in one request
+export async function fetchDashboard(userId: string, month?: string): Promise<Dashboard> {
+  const query = month ? `?month=${month}` : "";
+  const res = await fetch(`${API_URL}/dashboard/${userId}${query}`);
+  if (!res.ok) throw new Error(`Fetch dashboard failed: ${res.status}`);
+  return res.json();
+}
+
+export interface CrystallizeJob {
+  job_id: string;
+  status: "queued" | "running" | "done" | "failed";
+  stage: string;
+  month: string;
+  result: { item_id: string; image_url: string; emotion: string; color_hex: string } | null;
+  error: string | null;
+}
+
+const CRYSTALLIZE_POLL_MS = 2000;
+
 export async function crystallize(companionId: string, userId: string) {
   const res = await fetch(`${API_URL}/store/crystallize`, {
     method: "POST",
@@ -54,5 +129,17 @@ export async function crystallize(companionId: string, userId: string) {
     body: JSON.stringify({ companion_id: companionId, user_id: userId }),
   });
   if (!res.ok) throw new Error(`Crystallize failed: ${res.status}`);
-  return res.json();
+  let job: CrystallizeJob = await res.json();
+
+  // Generation runs in the background; poll until the job settles
+  while (job.status === "queued" || job.status === "running") {
+    await new Promise((resolve) => setTimeout(resolve, CRYSTALLIZE_POLL_MS));
+    const poll = await fetch(`${API_URL}/store/crystallize/${job.job_id}`);
+    if (!poll.ok) throw new Error(`Crystallize status failed: ${poll.status}`);
+    job = await poll.json();
+  }
+  if (job.status === "failed" || !job.result) {
+    throw new Error(`Crystallize failed: ${job.error ?? "unknown error"}`);
+  }
+  return job.result;
 }